@@ -0,0 +1,226 @@
+import time
+import logging
+
+from collections import deque
+from typing import Any, Callable, Dict, List
+
+from pytlm import compile_comparison
+
+logger = logging.getLogger("Alarms")
+
+# ----------------------------------------------------------------------
+# AlarmRule - threshold with hysteresis and hold-off
+# ----------------------------------------------------------------------
+#
+# A rule raises when the comparison against threshold holds, and only
+# clears once the value is back past the threshold by more than
+# hysteresis (so 90% with a hysteresis of 5 raises at >= 90 and clears
+# below 85).  With a hold-off, either transition only happens once the
+# new condition has lasted hold_off seconds.
+#
+
+_RAISING = {"GT": 1, ">": 1, "GTE": 1, ">=": 1,
+            "LT": -1, "<": -1, "LTE": -1, "<=": -1}
+
+
+class AlarmRule:
+
+    def __init__(self, key: str, threshold: float, comparison: str = ">=", **kwargs) :
+
+        self.key        = key
+        self.threshold  = threshold
+        self.comparison = comparison
+
+        self.name       = kwargs.get("name",       key)
+        self.level      = kwargs.get("level",      2)       # 1 warning, 2 critical
+        self.hysteresis = kwargs.get("hysteresis", 0.0)
+        self.hold_off   = kwargs.get("hold_off",   0.0)
+
+        direction = _RAISING.get(comparison, 0)
+
+        self.raises = compile_comparison(comparison, threshold)
+        self.holds  = compile_comparison(comparison, threshold - direction * self.hysteresis)
+
+        self.active  = False
+        self.value   = None
+        self.pending = None         # time the opposite condition was first seen
+
+    def evaluate(self, value, now: float) -> bool:
+
+        # True when the rule changed state.
+
+        self.value = value
+
+        wanted = self.holds(value) if self.active else self.raises(value)
+
+        if wanted == self.active :
+            self.pending = None
+            return False
+
+        if self.hold_off > 0 :
+
+            if self.pending is None :
+                self.pending = now
+
+            if now - self.pending < self.hold_off :
+                return False
+
+        self.pending = None
+        self.active  = wanted
+
+        return True
+
+# ----------------------------------------------------------------------
+# AlarmEngine
+# ----------------------------------------------------------------------
+#
+# Rules are evaluated when the data changes, once per model update and
+# only for the keys in that update (attach the engine to a DataModel),
+# never on paint.  Transitions are passed to the listeners, recorded in
+# a bounded history and pushed to the bound widgets with set_alarm(level),
+# so widgets only repaint when an alarm state actually changes.
+#
+# History entries are (time.time(), rule name, key, value, level) tuples,
+# level 0 meaning the alarm cleared.
+#
+
+class AlarmEngine:
+
+    def __init__(self, **kwargs) :
+
+        #
+        #  kwargs :
+        #
+        #    history     transitions kept (default: 1000)
+        #    clock       monotonic time source (default: time.monotonic)
+        #
+
+        self.clock     = kwargs.get("clock", time.monotonic)
+
+        self.rules: Dict[str, List[AlarmRule]] = {}
+        self.targets   = {}             # key -> [widget, ...]
+        self.listeners: List[Callable[[tuple], Any]] = []
+
+        self.history   = deque(maxlen=kwargs.get("history", 1000))
+
+        # Rules waiting for a hold-off to expire, checked on system ticks.
+        self.waiting   = set()
+
+    def add_rule(self, rule: AlarmRule) -> AlarmRule:
+        self.rules.setdefault(rule.key, []).append(rule)
+        return rule
+
+    def remove_rule(self, rule: AlarmRule) -> None:
+
+        rules = self.rules.get(rule.key, [])
+
+        if rule in rules :
+            rules.remove(rule)
+
+        if not rules :
+            self.rules.pop(rule.key, None)
+
+        self.waiting.discard(rule)
+
+    def bind(self, key: str, widget) -> None:
+
+        # widget.set_alarm(level) on every change of the highest active level.
+
+        self.targets.setdefault(key, []).append(widget)
+        widget.set_alarm(self.level(key))
+
+    def on_transition(self, listener: Callable[[tuple], Any]) -> None:
+        self.listeners.append(listener)
+
+    def level(self, key: str) -> int:
+        return max((r.level for r in self.rules.get(key, ()) if r.active), default=0)
+
+    def active(self) -> List[AlarmRule]:
+        return [r for rules in self.rules.values() for r in rules if r.active]
+
+    # ---- evaluation -------------------------------------------------------
+
+    def evaluate(self, changed: dict) -> List[tuple]:
+
+        now    = self.clock()
+        events = []
+        keys   = set()
+
+        rules = self.rules
+
+        for key, value in changed.items() :
+
+            for rule in rules.get(key, ()) :
+
+                if rule.evaluate(value, now) :
+                    events.append(self.record(rule))
+                    keys.add(key)
+
+                if rule.pending is not None :
+                    self.waiting.add(rule)
+                else :
+                    self.waiting.discard(rule)
+
+        self.notify(events, keys)
+
+        return events
+
+    def check_pending(self) -> None:
+
+        # Hold-offs expire without new data, re-evaluate the last values.
+
+        if not self.waiting :
+            return
+
+        now    = self.clock()
+        events = []
+        keys   = set()
+
+        for rule in list(self.waiting) :
+
+            if rule.evaluate(rule.value, now) :
+                events.append(self.record(rule))
+                keys.add(rule.key)
+
+            if rule.pending is None :
+                self.waiting.discard(rule)
+
+        self.notify(events, keys)
+
+    def record(self, rule: AlarmRule) -> tuple:
+
+        event = (time.time(), rule.name, rule.key, rule.value, rule.level if rule.active else 0)
+
+        self.history.append(event)
+
+        logger.info("Alarm %s %s (%s = %s)", rule.name,
+                    "raised" if rule.active else "cleared", rule.key, rule.value)
+
+        return event
+
+    def notify(self, events: List[tuple], keys) -> None:
+
+        for key in keys :
+            level = self.level(key)
+            for widget in self.targets.get(key, ()) :
+                widget.set_alarm(level)
+
+        for event in events :
+            for listener in self.listeners :
+                listener(event)
+
+    # ---- wiring -----------------------------------------------------------
+
+    def attach(self, model, wm=None) -> None:
+
+        #
+        #  Evaluate on every update of model (a data_model.DataModel), and
+        #  check hold-offs on the system tick of wm, if given.
+        #
+
+        model.observe(self.evaluate)
+
+        self.evaluate({key: model.get(key) for key in self.rules if model.get(key) is not None})
+
+        if wm is not None :
+            wm.add_tick_handler(self.check_pending)
@@ -0,0 +1,487 @@
+import os
+import sys
+import json
+import stat
+import time
+import curses
+import socket
+import logging
+import argparse
+import selectors
+
+from typing import Callable, List, Optional
+
+import pytlm
+
+from pytlm import WindowManager
+from headless import MemoryBackend, HeadlessScreen
+
+logger = logging.getLogger("Daemon")
+
+# Ctrl-] detaches a client (like telnet).
+_DETACH = 29
+
+# ----------------------------------------------------------------------
+# Protocol
+# ----------------------------------------------------------------------
+#
+# Newline separated JSON messages over a unix stream socket.
+#
+#   client -> daemon   {"size": [width, height]}     on attach and resize
+#                      {"key": code}
+#                      {"mouse": [x, y, bstate]}
+#
+#   daemon -> client   {"pairs": [[pair, fg, bg], ...]}   new colour pairs
+#                      {"rows": [[y, x, [[attr, text], ...]], ...]}
+#
+# A row update only spans the changed cells of a row (first to last
+# difference), as runs of one attribute, cropped to the client size.
+# Both ends use the same curses key codes, attributes and pair encoding.
+#
+
+def default_socket_path() -> str:
+    base = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    return os.path.join(base, f"pytlm-{os.getuid()}.sock")
+
+
+def encode_row(y: int, text: str, attrs: tuple, old: Optional[tuple], width: int) -> Optional[list]:
+
+    # [y, x, runs] for the cells of a row that differ from old, or None.
+
+    text  = text[:width]
+    attrs = attrs[:width]
+
+    first = 0
+    last  = len(text)
+
+    if old is not None :
+
+        (old_text, old_attrs) = old
+
+        while first < last and text[first] == old_text[first] and attrs[first] == old_attrs[first] :
+            first += 1
+
+        if first == last :
+            return None
+
+        while text[last - 1] == old_text[last - 1] and attrs[last - 1] == old_attrs[last - 1] :
+            last -= 1
+
+    runs  = []
+    start = first
+
+    for x in range(first + 1, last + 1) :
+        if x == last or attrs[x] != attrs[start] :
+            runs.append([attrs[start], text[start:x]])
+            start = x
+
+    return [y, first, runs]
+
+# ----------------------------------------------------------------------
+# Daemon
+# ----------------------------------------------------------------------
+#
+# Runs a WindowManager on the headless backend: the widget tree, the
+# sampling and the history live in the daemon, which outlives any
+# terminal.  Every frame the composed screen is diffed against what each
+# client last received.  A new client gets the whole screen, so attaching
+# (or reattaching) is immediate.  Keys and mouse events of all clients go
+# to the same WindowManager.
+#
+# The virtual screen takes the size of the largest client attached.
+#
+
+class Client:
+
+    def __init__(self, sock: socket.socket) :
+
+        self.sock   = sock
+        self.rbuf   = b""
+        self.wbuf   = bytearray()
+
+        self.width  = 0
+        self.height = 0
+
+        self.rows   = None          # rows last sent, None: send everything
+        self.pairs  = 0             # colour pairs sent
+
+
+class Daemon:
+
+    def __init__(self, build: Callable[[WindowManager], None], path: Optional[str] = None, **kwargs) :
+
+        #
+        #  kwargs :
+        #
+        #    width, height   screen size with no client (default: 80 x 24)
+        #    frame_rate      frames per second (default: 20)
+        #    max_backlog     bytes queued for a slow client before its
+        #                    updates are dropped and resent whole (default: 1 MiB)
+        #
+
+        self.path        = path or default_socket_path()
+        self.frame_rate  = kwargs.get("frame_rate",  20)
+        self.max_backlog = kwargs.get("max_backlog", 1 << 20)
+
+        self.backend = MemoryBackend(kwargs.get("width", 80), kwargs.get("height", 24))
+
+        pytlm.set_backend(self.backend)
+        pytlm.set_unicode_borders(True)
+
+        self.screen  = HeadlessScreen(self.backend)
+        self.wm      = WindowManager(self.screen)
+
+        self.clients: List[Client] = []
+        self.selector = selectors.DefaultSelector()
+        self.listener = None
+        self.running  = False
+
+        build(self.wm)
+
+    # ---- sockets ----------------------------------------------------------
+
+    def listen(self) -> None:
+
+        # A stale socket of ours is replaced, anything else is left alone.
+        try :
+            st = os.lstat(self.path)
+        except FileNotFoundError :
+            pass
+        else :
+            if st.st_uid != os.getuid() or not stat.S_ISSOCK(st.st_mode) :
+                raise PermissionError(f"{self.path} exists and is not a socket of this user")
+            os.unlink(self.path)
+
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        # Created for the owner only (a chmod after bind leaves a window
+        # in which other users could connect and send keys).
+        umask = os.umask(0o077)
+
+        try :
+            self.listener.bind(self.path)
+        finally :
+            os.umask(umask)
+
+        self.listener.listen(8)
+        self.listener.setblocking(False)
+
+        self.selector.register(self.listener, selectors.EVENT_READ)
+
+    def accept(self) -> None:
+
+        (sock, _) = self.listener.accept()
+        sock.setblocking(False)
+
+        client = Client(sock)
+
+        self.clients.append(client)
+        self.selector.register(sock, selectors.EVENT_READ, client)
+
+        logger.info("Client attached (%d)", len(self.clients))
+
+    def drop(self, client: Client) -> None:
+
+        self.selector.unregister(client.sock)
+        client.sock.close()
+
+        self.clients.remove(client)
+        self.fit_screen()
+
+        logger.info("Client detached (%d)", len(self.clients))
+
+    def receive(self, client: Client) -> None:
+
+        try :
+            data = client.sock.recv(65536)
+        except BlockingIOError :
+            return
+        except OSError :
+            data = b""
+
+        if not data :
+            self.drop(client)
+            return
+
+        lines = (client.rbuf + data).split(b"\n")
+        client.rbuf = lines.pop()
+
+        for line in lines :
+
+            # A malformed message is dropped, the client and the daemon go on.
+            try :
+                self.handle_message(client, json.loads(line))
+            except (ValueError, TypeError, AttributeError) as e :
+                logger.debug("Bad message from a client : %r (%s)", line[:80], e)
+
+    def handle_message(self, client: Client, message: dict) -> None:
+
+        if not isinstance(message, dict) :
+            raise TypeError("message is not an object")
+
+        if "key" in message :
+            self.screen.push_key(int(message["key"]))
+
+        elif "mouse" in message :
+            (x, y, bstate) = (int(v) for v in message["mouse"])
+            self.screen.push_mouse(x, y, bstate)
+
+        elif "size" in message :
+
+            (width, height) = (int(v) for v in message["size"])
+
+            if width <= 0 or height <= 0 :
+                raise ValueError("empty size")
+
+            (client.width, client.height) = (width, height)
+            client.rows = None
+            self.fit_screen()
+
+    def fit_screen(self) -> None:
+
+        sizes  = [(c.width, c.height) for c in self.clients if c.width]
+
+        if not sizes :
+            return
+
+        width  = max(w for w, _ in sizes)
+        height = max(h for _, h in sizes)
+
+        if (width, height) != (self.backend.width, self.backend.height) :
+            self.screen.resize(width, height)
+
+    # ---- updates ----------------------------------------------------------
+
+    def update(self, client: Client, rows: list, pairs: list) -> None:
+
+        if not client.width :
+            return
+
+        # Pairs are always sent, rows refer to them.
+        if client.pairs < len(pairs) :
+            self.queue(client, {"pairs": pairs[client.pairs:]})
+            client.pairs = len(pairs)
+
+        # A client too far behind skips frames (its backlog still drains),
+        # then gets everything again.
+        if len(client.wbuf) > self.max_backlog :
+            client.rows = None
+
+        else :
+
+            old     = client.rows or [None] * len(rows)
+            changed = []
+
+            for y, row in enumerate(rows[:client.height]) :
+
+                diff = encode_row(y, row[0], row[1], old[y] if y < len(old) else None, client.width)
+
+                if diff is not None :
+                    changed.append(diff)
+
+            client.rows = rows
+
+            if changed :
+                self.queue(client, {"rows": changed})
+
+        self.flush(client)
+
+    @staticmethod
+    def queue(client: Client, message: dict) -> None:
+        client.wbuf += json.dumps(message, separators=(",", ":"), ensure_ascii=False).encode() + b"\n"
+
+    def flush(self, client: Client) -> None:
+
+        if not client.wbuf :
+            return
+
+        try :
+            sent = client.sock.send(client.wbuf)
+            del client.wbuf[:sent]
+        except BlockingIOError :
+            pass
+        except OSError :
+            self.drop(client)
+
+    def run_frame(self) -> None:
+
+        for key, _ in self.selector.select(timeout=0) :
+            if key.data is None :
+                self.accept()
+            else :
+                self.receive(key.data)
+
+        self.wm.run_frame()
+
+        rows  = self.backend.rows()
+        pairs = [[n, fg, bg] for n, (fg, bg) in sorted(self.backend.pairs.items())]
+
+        for client in list(self.clients) :
+            self.update(client, rows, pairs)
+
+    def serve_forever(self) -> None:
+
+        self.listen()
+        self.running = True
+
+        target = 1.0 / self.frame_rate
+
+        try :
+            while self.running :
+
+                start = time.monotonic()
+
+                self.run_frame()
+
+                # Sleep, but wake up for input.
+                remaining = target - (time.monotonic() - start)
+
+                if remaining > 0 :
+                    self.selector.select(timeout=remaining)
+
+        finally :
+            self.close()
+
+    def close(self) -> None:
+
+        for client in list(self.clients) :
+            self.drop(client)
+
+        self.wm.output.close()
+
+        if self.listener is not None :
+            self.selector.unregister(self.listener)
+            self.listener.close()
+            self.listener = None
+
+            try :
+                os.unlink(self.path)
+            except OSError :
+                pass
+
+# ----------------------------------------------------------------------
+# attach - the terminal client
+# ----------------------------------------------------------------------
+
+def attach(path: Optional[str] = None) -> None:
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(path or default_socket_path())
+
+    def send(message: dict) -> None:
+        sock.sendall(json.dumps(message).encode() + b"\n")
+
+    def run(scr) :
+
+        scr.nodelay(True)
+        curses.use_default_colors()
+        curses.curs_set(0)
+        curses.mousemask(curses.ALL_MOUSE_EVENTS | curses.REPORT_MOUSE_POSITION)
+        curses.mouseinterval(0)
+
+        (height, width) = scr.getmaxyx()
+        send({"size": [width, height]})
+
+        selector = selectors.DefaultSelector()
+        selector.register(sock, selectors.EVENT_READ)
+        selector.register(sys.stdin, selectors.EVENT_READ)
+
+        rbuf = b""
+
+        while True :
+
+            selector.select(timeout=0.5)
+
+            key = scr.getch()
+
+            while key != -1 :
+
+                if key == _DETACH :
+                    return
+
+                if key == curses.KEY_RESIZE :
+                    (height, width) = scr.getmaxyx()
+                    scr.erase()
+                    send({"size": [width, height]})
+
+                elif key == curses.KEY_MOUSE :
+                    try :
+                        (_, x, y, _, bstate) = curses.getmouse()
+                        send({"mouse": [x, y, bstate]})
+                    except curses.error :
+                        pass
+
+                else :
+                    send({"key": key})
+
+                key = scr.getch()
+
+            try :
+                data = sock.recv(1 << 20, socket.MSG_DONTWAIT)
+            except BlockingIOError :
+                continue
+
+            if not data :
+                return
+
+            lines = (rbuf + data).split(b"\n")
+            rbuf  = lines.pop()
+
+            for line in lines :
+
+                try :
+                    message = json.loads(line)
+
+                    for pair, fg, bg in message.get("pairs", ()) :
+                        curses.init_pair(pair, fg, bg)
+
+                    for y, x, runs in message.get("rows", ()) :
+                        for attr, text in runs :
+                            try :
+                                scr.addstr(y, x, text, attr)
+                            except curses.error :
+                                pass
+                            x += len(text)
+
+                # Skip what cannot be understood (and init_pair out of range).
+                except (ValueError, TypeError, AttributeError, curses.error) :
+                    continue
+
+            scr.refresh()
+
+    try :
+        curses.wrapper(run)
+    finally :
+        sock.close()
+
+# ----------------------------------------------------------------------
+# Command line
+# ----------------------------------------------------------------------
+#
+#   python daemon.py serve dashboard.yaml [--socket PATH]
+#   python daemon.py attach [--socket PATH]
+#
+
+def main(argv: Optional[List[str]] = None) -> None:
+
+    parser = argparse.ArgumentParser(description="Headless dashboard daemon")
+    parser.add_argument("command", choices=("serve", "attach"))
+    parser.add_argument("dashboard", nargs="?")
+    parser.add_argument("--socket", default=None)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "attach" :
+        attach(args.socket)
+        return
+
+    if not args.dashboard :
+        parser.error("serve needs a dashboard file")
+
+    from dashboard import build_dashboard
+
+    Daemon(lambda wm: build_dashboard(wm, args.dashboard), args.socket).serve_forever()
+
+
+if __name__ == "__main__" :
+    main()
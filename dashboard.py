@@ -0,0 +1,333 @@
+import os
+import json
+import marshal
+import hashlib
+import inspect
+import functools
+import logging
+import tempfile
+
+from typing import List, Optional
+
+from pytlm import Window
+from pytlm import WindowManager
+from pytlm import RowLayout
+from pytlm import ColumnLayout
+from pytlm import GridLayout
+
+from widget_registry import registry
+
+logger = logging.getLogger("Dashboard")
+
+# ----------------------------------------------------------------------
+# Declarative dashboards
+# ----------------------------------------------------------------------
+#
+# A dashboard file (JSON, TOML or YAML) describes windows, their layout
+# and a tree of widgets :
+#
+#   [[windows]]
+#   x      = 0
+#   y      = 0
+#   width  = 80
+#   height = 6
+#   title  = "eth0"
+#
+#   [[windows.widgets]]
+#   type   = "NetworkDevice"
+#   x      = 1
+#   y      = 1
+#   width  = 78
+#   height = 4
+#   device = "eth0"
+#
+# Every key that is not a geometry/structure key is passed on as a
+# keyword argument.  "layout" is {"type": "row" | "column" | "grid", ...},
+# "constraints" are the layout constraints of a widget and "children" the
+# widgets of a Container.
+#
+# The validated spec is stored as nested tuples in a marshal file, keyed
+# by the SHA-256 of the source file, so a dashboard that did not change
+# is neither parsed nor validated again.
+#
+
+# Bump when the compiled form changes, older cache files are ignored.
+_FORMAT_VERSION = 1
+
+_LAYOUT_TYPES = {
+    "row":    RowLayout,
+    "column": ColumnLayout,
+    "grid":   GridLayout,
+}
+
+_WINDOW_KEYS = ("x", "y", "width", "height", "layout", "widgets")
+_WIDGET_KEYS = ("type", "x", "y", "width", "height", "layout", "constraints", "children")
+
+
+class DashboardError(ValueError):
+    pass
+
+# ----------------------------------------------------------------------
+# Parsing and validation
+# ----------------------------------------------------------------------
+
+def _parse(path: str, data: bytes) -> dict:
+
+    ext = os.path.splitext(path)[1].lower()
+
+    try :
+
+        if ext == ".json" :
+            return json.loads(data)
+
+        if ext == ".toml" :
+            import tomllib
+            return tomllib.loads(data.decode("utf-8"))
+
+        if ext in (".yaml", ".yml") :
+            try :
+                import yaml
+            except ImportError :
+                raise DashboardError(f"{path}: PyYAML is required for YAML dashboards")
+            return yaml.safe_load(data)
+
+    except DashboardError :
+        raise
+
+    except Exception as e :
+        raise DashboardError(f"{path}: {e}") from e
+
+    raise DashboardError(f"{path}: unknown dashboard format '{ext}'")
+
+
+def _check_int(where: str, spec: dict, key: str) -> int:
+
+    if key not in spec :
+        raise DashboardError(f"{where}: missing '{key}'")
+
+    value = spec[key]
+
+    if not isinstance(value, int) or isinstance(value, bool) :
+        raise DashboardError(f"{where}: '{key}' must be an integer")
+
+    return value
+
+
+def _compile_layout(where: str, spec) -> Optional[tuple]:
+
+    if spec is None :
+        return None
+
+    if not isinstance(spec, dict) :
+        raise DashboardError(f"{where}: 'layout' must be a table")
+
+    options = dict(spec)
+    kind    = options.pop("type", None)
+
+    if kind not in _LAYOUT_TYPES :
+        raise DashboardError(f"{where}: unknown layout type '{kind}'")
+
+    return (kind, options)
+
+
+def _compile_widget(where: str, spec) -> tuple:
+
+    if not isinstance(spec, dict) :
+        raise DashboardError(f"{where}: widget must be a table")
+
+    kind = spec.get("type")
+
+    if kind not in registry :
+        raise DashboardError(f"{where}: unknown widget type '{kind}'")
+
+    where = f"{where}/{spec.get('name', kind)}"
+
+    geometry = (_check_int(where, spec, "x"),
+                _check_int(where, spec, "y"),
+                _check_int(where, spec, "width"),
+                _check_int(where, spec, "height") if "height" in spec else None)
+
+    constraints = spec.get("constraints", {})
+
+    if not isinstance(constraints, dict) :
+        raise DashboardError(f"{where}: 'constraints' must be a table")
+
+    children = spec.get("children", [])
+
+    if not isinstance(children, list) :
+        raise DashboardError(f"{where}: 'children' must be a list")
+
+    options = {k: v for k, v in spec.items() if k not in _WIDGET_KEYS}
+
+    return (kind,
+            geometry,
+            options,
+            _compile_layout(where, spec.get("layout")),
+            constraints,
+            tuple(_compile_widget(where, child) for child in children))
+
+
+def compile_dashboard(spec: dict, where: str = "dashboard") -> tuple:
+
+    #
+    #  Validates a parsed dashboard and returns its compiled form :
+    #
+    #    window : ((x, y, width, height), options, layout, widgets)
+    #    widget : (type, (x, y, width, height), options, layout,
+    #              constraints, children)
+    #    layout : (type, options) or None
+    #
+
+    if not isinstance(spec, dict) or not isinstance(spec.get("windows"), list) :
+        raise DashboardError(f"{where}: expected a 'windows' list")
+
+    windows = []
+
+    for index, win in enumerate(spec["windows"]) :
+
+        if not isinstance(win, dict) :
+            raise DashboardError(f"{where}: window {index} must be a table")
+
+        name = f"{where}:{win.get('name', index)}"
+
+        geometry = tuple(_check_int(name, win, key) for key in ("x", "y", "width", "height"))
+
+        widgets = win.get("widgets", [])
+
+        if not isinstance(widgets, list) :
+            raise DashboardError(f"{name}: 'widgets' must be a list")
+
+        windows.append((geometry,
+                        {k: v for k, v in win.items() if k not in _WINDOW_KEYS},
+                        _compile_layout(name, win.get("layout")),
+                        tuple(_compile_widget(name, w) for w in widgets)))
+
+    return tuple(windows)
+
+# ----------------------------------------------------------------------
+# Compiled layout cache
+# ----------------------------------------------------------------------
+
+def default_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "pytlm")
+
+
+def load_dashboard(path: str, cache_dir: Optional[str] = None) -> tuple:
+
+    #
+    #  Returns the compiled form of a dashboard file, from the cache when
+    #  the file did not change.  cache_dir = "" disables the cache.
+    #
+
+    with open(path, "rb") as f :
+        data = f.read()
+
+    if cache_dir is None :
+        cache_dir = default_cache_dir()
+
+    digest = hashlib.sha256(data).hexdigest()
+    cached = os.path.join(cache_dir, f"{digest}.v{_FORMAT_VERSION}.dash") if cache_dir else None
+
+    if cached :
+        try :
+            with open(cached, "rb") as f :
+                return marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError) :
+            pass
+
+    compiled = compile_dashboard(_parse(path, data), path)
+
+    if cached :
+        try :
+            os.makedirs(cache_dir, exist_ok=True)
+
+            # Write and rename, a concurrent reader never sees half a file.
+            (fd, tmp) = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f :
+                marshal.dump(compiled, f)
+            os.replace(tmp, cached)
+
+        except (OSError, ValueError) as e :
+            logger.warning("Cannot cache %s : %s", path, e)
+
+    return compiled
+
+# ----------------------------------------------------------------------
+# Instantiation
+# ----------------------------------------------------------------------
+
+def _widget_class(kind: str) :
+
+    # A cached dashboard is not validated again, its types may be gone.
+    try :
+        return registry.get(kind)
+    except KeyError :
+        raise DashboardError(f"unknown widget type '{kind}'") from None
+
+
+@functools.lru_cache(maxsize=None)
+def _takes_height(cls) -> bool:
+
+    # StatusLabel, Button, ProgressBar, ... are one row high.
+    return "height" in inspect.signature(cls.__init__).parameters
+
+
+def _make_layout(spec: Optional[tuple]) :
+
+    if spec is None :
+        return None
+
+    (kind, options) = spec
+
+    return _LAYOUT_TYPES[kind](**options)
+
+
+def _make_widget(spec: tuple) :
+
+    (kind, (x, y, width, height), options, layout, constraints, children) = spec
+
+    cls   = _widget_class(kind)
+    where = f"{kind} '{options['name']}'" if "name" in options else kind
+
+    if height is not None and not _takes_height(cls) :
+        raise DashboardError(f"{where}: 'height' is not supported by {kind}")
+
+    args = (x, y, width) if height is None else (x, y, width, height)
+
+    try :
+        w = cls(*args, layout=_make_layout(layout), **options)
+    except TypeError as e :
+        raise DashboardError(f"{where}: {e}") from e
+
+    if children and not hasattr(w, "add_widget") :
+        raise DashboardError(f"{where} cannot have children")
+
+    for child in children :
+        w.add_widget(_make_widget(child), **child[4])
+
+    return w
+
+
+def build_dashboard(wm: WindowManager, dashboard, cache_dir: Optional[str] = None) -> List[Window]:
+
+    #
+    #  Creates the windows and widgets of a dashboard (a file path, or a
+    #  compiled form from load_dashboard) and adds them to wm.
+    #
+
+    if isinstance(dashboard, (str, os.PathLike)) :
+        dashboard = load_dashboard(os.fspath(dashboard), cache_dir)
+
+    windows = []
+
+    for (x, y, width, height), options, layout, widgets in dashboard :
+
+        win = Window(x, y, width, height, layout=_make_layout(layout), **options)
+
+        for spec in widgets :
+            win.add_widget(_make_widget(spec), **spec[4])
+
+        windows.append(wm.add_window(win))
+
+    return windows
@@ -0,0 +1,161 @@
+import threading
+
+from collections import ChainMap
+from types import MappingProxyType
+from typing import Any, Callable, Optional
+
+_MISSING = object()
+
+# Snapshots chained before they are merged into one dict again.
+_MAX_LAYERS = 16
+
+# ----------------------------------------------------------------------
+# Binding - one key of a model driving one widget (or callable)
+# ----------------------------------------------------------------------
+#
+# The formatter turns the raw value into what the widget shows.  When it
+# returns a (value, units) tuple both set_value and set_units are called.
+#
+
+class Binding:
+
+    def __init__(self, key: str, target, formatter: Optional[Callable[[Any], Any]] = None) :
+
+        self.key       = key
+        self.target    = target
+        self.formatter = formatter
+
+        self.is_widget = hasattr(target, "set_value")
+
+    def apply(self, value) -> None:
+
+        if self.formatter is not None :
+            value = self.formatter(value)
+
+        target = self.target
+
+        if not self.is_widget :
+            target(value)
+
+        elif isinstance(value, tuple) :
+            target.set_value(value[0])
+            target.set_units(value[1])
+
+        else :
+            target.set_value(value)
+
+# ----------------------------------------------------------------------
+# DataModel - immutable snapshots with change notification
+# ----------------------------------------------------------------------
+#
+# Each update publishes a new read only snapshot (the previous one stays
+# valid for whoever holds it), and only the bindings of the keys whose
+# value actually changed are notified.  Widgets just flag a repaint, so a
+# whole batch of changes lands in the same frame.
+#
+# A snapshot is the dict of changed values chained in front of the
+# previous snapshot (a ChainMap of dicts that are never written again),
+# so an update costs the changed keys, not the whole model.  Every
+# _MAX_LAYERS updates the chain is merged into one dict, which keeps
+# lookups short.
+#
+# update() is meant for the UI thread; other threads publish() their
+# changes, which are merged and applied on the next system tick once the
+# model is attached to a WindowManager.
+#
+
+class DataModel:
+
+    def __init__(self, values: Optional[dict] = None) :
+
+        self.layers    = [dict(values or {})]       # maps of the snapshot, newest first
+        self.snapshot  = MappingProxyType(self.layers[0])
+
+        self.bindings  = {}          # key -> [Binding, ...]
+        self.observers = []          # callables taking the changed dict
+
+        self.pending   = {}
+        self.lock      = threading.Lock()
+
+    def get(self, key: str, default=None) :
+        return self.snapshot.get(key, default)
+
+    def __getitem__(self, key: str) :
+        return self.snapshot[key]
+
+    # ---- bindings ---------------------------------------------------------
+
+    def bind(self, key: str, target, formatter: Optional[Callable[[Any], Any]] = None) -> Binding:
+
+        binding = Binding(key, target, formatter)
+
+        self.bindings.setdefault(key, []).append(binding)
+
+        if key in self.snapshot :
+            binding.apply(self.snapshot[key])
+
+        return binding
+
+    def unbind(self, binding: Binding) -> None:
+
+        bindings = self.bindings.get(binding.key, [])
+
+        if binding in bindings :
+            bindings.remove(binding)
+
+        if not bindings :
+            self.bindings.pop(binding.key, None)
+
+    def observe(self, observer: Callable[[dict], Any]) -> None:
+        self.observers.append(observer)
+
+    # ---- updates ----------------------------------------------------------
+
+    def update(self, values: dict) -> dict:
+
+        current = self.snapshot
+
+        changed = {k: v for k, v in values.items() if current.get(k, _MISSING) != v}
+
+        if not changed :
+            return changed
+
+        if len(self.layers) >= _MAX_LAYERS :
+            merged = {}
+            for layer in reversed(self.layers) :
+                merged.update(layer)
+            merged.update(changed)
+            self.layers = [merged]
+        else :
+            self.layers = [changed] + self.layers
+
+        self.snapshot = MappingProxyType(ChainMap(*self.layers))
+
+        bindings = self.bindings
+
+        for key, value in changed.items() :
+            for binding in bindings.get(key, ()) :
+                binding.apply(value)
+
+        for observer in self.observers :
+            observer(changed)
+
+        return changed
+
+    def publish(self, values: dict) -> None:
+
+        with self.lock :
+            self.pending.update(values)
+
+    def apply_pending(self) -> dict:
+
+        with self.lock :
+            (values, self.pending) = (self.pending, {})
+
+        return self.update(values) if values else {}
+
+    def attach(self, wm) -> None:
+        wm.add_tick_handler(self.apply_pending)
+
+    def detach(self, wm) -> None:
+        wm.remove_tick_handler(self.apply_pending)
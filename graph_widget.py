@@ -0,0 +1,366 @@
+import time
+import math
+import curses
+import logging
+
+from collections import deque
+
+from pytlm import Widget
+from pytlm import cm
+
+try :
+    import numpy
+except ImportError :
+    numpy = None
+
+logger = logging.getLogger("Graph")
+
+# ----------------------------------------------------------------------
+# Sub-cell glyphs
+# ----------------------------------------------------------------------
+#
+#   mode       points per cell   dots per cell (vertical)
+#   braille    2                 4                  U+2800 block
+#   block      1                 2                  ▄ ▀ █
+#
+# A point covers a range of dots (lo..hi, counted from the bottom of the
+# graph): the whole bar up to the value for an area graph, the segment
+# from the previous value for a line graph.  _MASKS[mode][point][a][b]
+# are the glyph bits of the dots a..b of one point within one cell.
+#
+
+_DOTS = {
+    "braille": ((0x40, 0x04, 0x02, 0x01), (0x80, 0x20, 0x10, 0x08)),
+    "block":   ((0x01, 0x02),),
+}
+
+_GLYPHS = {
+    "braille": [chr(0x2800 + bits) for bits in range(256)],
+    "block":   [" ", "▄", "▀", "█"],
+}
+
+
+def _masks(dots: tuple) -> list:
+
+    return [[[sum(column[a:b + 1]) if a <= b else 0 for b in range(len(column))]
+             for a in range(len(column))]
+            for column in dots]
+
+
+_MASKS = {mode: _masks(dots) for mode, dots in _DOTS.items()}
+
+
+def _nice_ceiling(value: float) -> float:
+
+    # 1, 2, 5 x 10^n at or above value, so an autoscaled graph rarely
+    # changes scale (and only then is fully rasterized again).
+
+    if not math.isfinite(value) or value <= 0 :
+        return 1.0
+
+    base = 10 ** math.floor(math.log10(value))
+
+    for step in (1, 2, 5, 10) :
+        if value <= step * base :
+            return step * base
+
+
+def _peak(values) -> float:
+
+    # Largest sample for autoscaling; NaN and inf are gaps, not values.
+    return max((v for v in values if math.isfinite(v)), default=0.0)
+
+# ----------------------------------------------------------------------
+# Graph
+# ----------------------------------------------------------------------
+#
+# A scrolling line or area graph of the last width * points-per-cell
+# samples.  The glyphs are cached per cell column: points are aligned on
+# their absolute sample number, so a new sample only rasterizes the
+# column it lands in while older columns scroll out unchanged.  The whole
+# graph is rasterized again only when the scale or the size changes, in
+# bulk with numpy when it is installed.
+#
+# Graphs take a point per set_value, or sample a model key every interval
+# (a model only notifies changes, so a steady value would not scroll a
+# bound graph), e.g. the rates of a NetworkDevice :
+#
+#   Graph(1, 7, 68, 4, model=device.model, key="rx_bytes_rate")
+#
+
+class Graph(Widget):
+
+    def __init__(self, x: int, y: int, width: int, height: int, **kwargs) :
+
+        #
+        #  kwargs :
+        #
+        #    mode        "braille" or "block" (default: "braille")
+        #    style       "area" or "line" (default: "area")
+        #    minimum     bottom of the scale (default: 0.0)
+        #    maximum     top of the scale (default: None, autoscale)
+        #    model       data_model.DataModel sampled on ticks (default: None)
+        #    key         model key (default: None)
+        #    interval    seconds between model samples (default: 1.0)
+        #
+        #    foreground, background, attribute   graph style
+        #
+
+        super().__init__(x, y, width, height, **kwargs)
+
+        self.mode    = kwargs.get("mode",    "braille")
+        self.style   = kwargs.get("style",   "area")
+        self.minimum = kwargs.get("minimum", 0.0)
+        self.maximum = kwargs.get("maximum", None)
+
+        self.model     = kwargs.get("model",    None)
+        self.key       = kwargs.get("key",      None)
+        self.interval  = kwargs.get("interval", 1.0)
+        self.last_tick = 0.0
+
+        self.fg      = kwargs.get("foreground", "green")
+        self.bg      = kwargs.get("background", "default")
+        self.att     = kwargs.get("attribute",  "default")
+        self.color   = None
+
+        self.sub     = len(_DOTS[self.mode])
+        self.dots    = len(_DOTS[self.mode][0])
+
+        self.masks   = _MASKS[self.mode]
+        self.glyphs  = _GLYPHS[self.mode]
+
+        self.count   = 0                # samples ever added
+        self.scale   = self.maximum
+
+        self.values  = deque(maxlen=width * self.sub)
+        self.columns = deque(maxlen=width)      # glyphs of a cell column, top to bottom
+        self.rows    = None                     # cached row strings
+
+    # ---- data -------------------------------------------------------------
+
+    def set_value(self, value) -> None:
+
+        if value is None :
+            return
+
+        self.values.append(float(value))
+        self.count += 1
+
+        scale = self.maximum if self.maximum is not None else _nice_ceiling(_peak(self.values))
+
+        if scale != self.scale :
+            self.scale = scale
+            self.rasterize()
+
+        else :
+
+            column = self.rasterize_column((self.count - 1) // self.sub)
+
+            if (self.count - 1) % self.sub == 0 :
+                self.columns.append(column)
+            else :
+                self.columns[-1] = column
+
+            self.rows = None
+
+        self.request_repaint()
+
+    def handle_tick(self) :
+
+        now = time.monotonic()
+
+        if self.model is not None and now - self.last_tick >= self.interval :
+            self.last_tick = now
+            self.set_value(self.model.get(self.key))
+
+    def clear(self) -> None:
+
+        self.values.clear()
+        self.columns.clear()
+
+        self.count = 0
+        self.scale = self.maximum
+        self.rows  = None
+
+        self.request_repaint()
+
+    def save_state(self) -> dict:
+        return {"values": list(self.values), "count": self.count}
+
+    def restore_state(self, state: dict) -> None:
+
+        self.values.clear()
+        self.values.extend(state.get("values", ()))
+
+        self.count = max(state.get("count", 0), len(self.values))
+        self.scale = self.maximum
+
+        if self.values and self.maximum is None :
+            self.scale = _nice_ceiling(_peak(self.values))
+
+        self.rasterize()
+        self.request_repaint()
+
+    def set_geometry(self, x: int, y: int, width: int, height: int) -> None:
+
+        resized = (width, height) != (self.width, self.height)
+
+        super().set_geometry(x, y, width, height)
+
+        if resized :
+            self.values  = deque(self.values, maxlen=width * self.sub)
+            self.columns = deque(maxlen=width)
+            self.rasterize()
+
+    # ---- rasterization ----------------------------------------------------
+
+    def level(self, value: float) -> int:
+
+        # Dots from the bottom, 0 .. height * dots.
+
+        total = self.height * self.dots
+        span  = (self.scale or 1.0) - self.minimum
+
+        return min(total, max(0, int((value - self.minimum) / span * total + 0.5)))
+
+    def point_range(self, index: int):
+
+        # (lo, hi) dots of the sample with absolute number index, None if gone.
+
+        first = self.count - len(self.values)
+
+        if index < first or index >= self.count :
+            return None
+
+        value = self.values[index - first]
+
+        if not math.isfinite(value) :
+            return None
+
+        level = self.level(value)
+
+        if self.style == "line" :
+            level = min(level, self.height * self.dots - 1)
+            prev  = self.values[index - first - 1] if index > first else value
+            prev  = self.level(prev) if math.isfinite(prev) else level
+            prev  = min(prev, self.height * self.dots - 1)
+            return (min(prev, level), max(prev, level))
+
+        return (0, level - 1)
+
+    def rasterize_column(self, column: int) -> str:
+
+        ranges = [self.point_range(column * self.sub + s) for s in range(self.sub)]
+
+        masks  = self.masks
+        glyphs = self.glyphs
+        dots   = self.dots
+        cells  = []
+
+        for row in range(self.height - 1, -1, -1) :
+
+            base = row * dots
+            bits = 0
+
+            for s, span in enumerate(ranges) :
+
+                if span is None or span[1] < base or span[0] >= base + dots or span[0] > span[1] :
+                    continue
+
+                bits |= masks[s][max(0, span[0] - base)][min(dots - 1, span[1] - base)]
+
+            cells.append(glyphs[bits])
+
+        return "".join(cells)
+
+    def rasterize(self) -> None:
+
+        # Every column again, after a change of scale or size.
+
+        self.rows = None
+
+        if not self.values :
+            self.columns.clear()
+            return
+
+        first = (self.count - len(self.values)) // self.sub
+        last  = (self.count - 1) // self.sub
+
+        if numpy is not None :
+            columns = self.rasterize_bulk(first, last)
+        else :
+            columns = [self.rasterize_column(c) for c in range(first, last + 1)]
+
+        self.columns = deque(columns, maxlen=self.width)
+
+    def rasterize_bulk(self, first: int, last: int) -> list:
+
+        sub    = self.sub
+        dots   = self.dots
+        height = self.height
+        total  = height * dots
+
+        # Samples of the columns first .. last, padded to whole columns.
+
+        pad    = (self.count - len(self.values)) - first * sub
+        values = numpy.full((last - first + 1) * sub, numpy.nan)
+
+        values[pad:pad + len(self.values)] = self.values
+        values[~numpy.isfinite(values)] = numpy.nan
+
+        span   = (self.scale or 1.0) - self.minimum
+        level  = numpy.clip(((values - self.minimum) / span * total + 0.5) // 1, 0, total)
+
+        missing = numpy.isnan(values)
+
+        if self.style == "line" :
+            level = numpy.minimum(level, total - 1)
+            prev  = numpy.concatenate((level[:1], level[:-1]))
+            prev  = numpy.where(numpy.isnan(prev), level, prev)
+            lo    = numpy.minimum(prev, level)
+            hi    = numpy.maximum(prev, level)
+        else :
+            lo    = numpy.zeros_like(level)
+            hi    = level - 1
+
+        lo = numpy.where(missing, 1, lo).astype(numpy.int64)
+        hi = numpy.where(missing, 0, hi).astype(numpy.int64)
+
+        # (rows, points) bits, top row first.
+
+        base  = (numpy.arange(height - 1, -1, -1) * dots)[:, None]
+
+        valid = (hi >= base) & (lo < base + dots) & (lo <= hi)
+        a     = numpy.clip(lo - base, 0, dots - 1)
+        b     = numpy.clip(hi - base, 0, dots - 1)
+
+        masks = numpy.array(self.masks, dtype=numpy.uint32)
+        point = numpy.arange(len(values)) % sub
+
+        bits  = numpy.where(valid, masks[point, a, b], 0)
+        bits  = bits.reshape(height, -1, sub).sum(axis=2)
+
+        codes = numpy.array([ord(g) for g in self.glyphs], dtype="<u4")[bits]
+        text  = codes.T.copy().tobytes().decode("utf-32-le")
+
+        return [text[i:i + height] for i in range(0, len(text), height)]
+
+    # ---- painting ---------------------------------------------------------
+
+    def paint(self, win) :
+
+        if self.color is None :
+            self.color = cm(self.fg, self.bg, self.att)
+
+        if self.rows is None :
+
+            pad = " " * self.height
+            columns = [pad] * (self.width - len(self.columns)) + list(self.columns)
+
+            self.rows = ["".join(row) for row in zip(*columns)]
+
+        try :
+            for index, row in enumerate(self.rows) :
+                win.addstr(self.y + index, self.x, row, self.color)
+        except curses.error :
+            pass
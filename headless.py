@@ -0,0 +1,357 @@
+import curses
+import logging
+
+from collections import deque
+from typing import List, Optional
+
+logger = logging.getLogger("Headless")
+
+# ----------------------------------------------------------------------
+# MemoryWindow - a curses window drawing into lists
+# ----------------------------------------------------------------------
+#
+# Implements the window calls pytlm uses (addstr, addch, hline, vline,
+# erase, resize, ...) with the curses semantics that matter: text wraps
+# at the right edge and writing past the last cell raises curses.error
+# (after drawing, like curses).  Each cell is a character and an
+# attribute, kept as one list per row.
+#
+
+class MemoryWindow:
+
+    def __init__(self, height: int, width: int, y: int = 0, x: int = 0) :
+
+        self.height = height
+        self.width  = width
+        self.y      = y
+        self.x      = x
+
+        self.attr   = 0
+        self.chars  = [[" "] * width for _ in range(height)]
+        self.attrs  = [[0] * width for _ in range(height)]
+
+        # Bumped on every change, the backend only composes changed screens.
+        self.version = 0
+
+    def put(self, y: int, x: int, text: str, attr: Optional[int]) -> None:
+
+        if attr is None :
+            attr = self.attr
+
+        if not (0 <= y < self.height and 0 <= x < self.width) :
+            raise curses.error("position outside the window")
+
+        self.version += 1
+
+        width = self.width
+
+        while text :
+
+            part = text[:width - x]
+            end  = x + len(part)
+
+            self.chars[y][x:end] = part
+            self.attrs[y][x:end] = [attr] * len(part)
+
+            text = text[len(part):]
+
+            if end == width :
+                (y, x) = (y + 1, 0)
+                if y == self.height :
+                    raise curses.error("write past the last cell")
+
+    def addstr(self, y: int, x: int, text: str, attr: Optional[int] = None) -> None:
+        self.put(y, x, text, attr)
+
+    def addnstr(self, y: int, x: int, text: str, n: int, attr: Optional[int] = None) -> None:
+        self.put(y, x, text[:n], attr)
+
+    @staticmethod
+    def glyph(ch) -> str:
+        return chr(ch & 0xff) if isinstance(ch, int) else ch
+
+    def addch(self, y: int, x: int, ch, attr: Optional[int] = None) -> None:
+        self.put(y, x, self.glyph(ch), attr)
+
+    def hline(self, y: int, x: int, ch, n: int, attr: Optional[int] = None) -> None:
+        self.put(y, x, self.glyph(ch) * max(0, min(n, self.width - x)), attr)
+
+    def vline(self, y: int, x: int, ch, n: int, attr: Optional[int] = None) -> None:
+        for row in range(y, min(y + n, self.height)) :
+            self.put(row, x, self.glyph(ch), attr)
+
+    def erase(self) -> None:
+
+        for row in range(self.height) :
+            self.chars[row] = [" "] * self.width
+            self.attrs[row] = [0] * self.width
+
+        self.version += 1
+
+    def resize(self, height: int, width: int) -> None:
+
+        chars = [[" "] * width for _ in range(height)]
+        attrs = [[0] * width for _ in range(height)]
+
+        for row in range(min(height, self.height)) :
+            chars[row][:min(width, self.width)] = self.chars[row][:width]
+            attrs[row][:min(width, self.width)] = self.attrs[row][:width]
+
+        (self.height, self.width) = (height, width)
+        (self.chars, self.attrs)  = (chars, attrs)
+
+        self.version += 1
+
+    def getmaxyx(self) -> tuple:
+        return (self.height, self.width)
+
+    def attron(self, attr: int) -> None:
+        self.attr |= attr
+
+    def attroff(self, attr: int) -> None:
+        self.attr &= ~attr
+
+    def attrset(self, attr: int) -> None:
+        self.attr = attr
+
+    def leaveok(self, flag: bool) -> None:
+        pass
+
+    def keypad(self, flag: bool) -> None:
+        pass
+
+# ----------------------------------------------------------------------
+# MemoryPanel
+# ----------------------------------------------------------------------
+#
+# Same stack rules as the panel library: new and shown panels go on top,
+# hidden panels leave the stack.
+#
+
+class MemoryPanel:
+
+    def __init__(self, backend: "MemoryBackend", win: MemoryWindow) :
+
+        self.backend = backend
+        self.win     = win
+        self.data    = None
+
+        backend.stack.append(self)
+        backend.stack_version += 1
+
+    def window(self) -> MemoryWindow:
+        return self.win
+
+    def set_userptr(self, data) -> None:
+        self.data = data
+
+    def userptr(self) :
+        return self.data
+
+    def replace(self, win: MemoryWindow) -> None:
+        self.win = win
+        self.backend.stack_version += 1
+
+    def move(self, y: int, x: int) -> None:
+        (self.win.y, self.win.x) = (y, x)
+        self.backend.stack_version += 1
+
+    def hidden(self) -> bool:
+        return self not in self.backend.stack
+
+    def hide(self) -> None:
+        if self in self.backend.stack :
+            self.backend.stack.remove(self)
+            self.backend.stack_version += 1
+
+    def show(self) -> None:
+        self.top()
+
+    def top(self) -> None:
+        self.hide()
+        self.backend.stack.append(self)
+        self.backend.stack_version += 1
+
+    def bottom(self) -> None:
+        self.hide()
+        self.backend.stack.insert(0, self)
+        self.backend.stack_version += 1
+
+    def neighbour(self, step: int) -> Optional["MemoryPanel"]:
+
+        stack = self.backend.stack
+
+        if self not in stack :
+            return None
+
+        index = stack.index(self) + step
+
+        return stack[index] if 0 <= index < len(stack) else None
+
+    def above(self) -> Optional["MemoryPanel"]:
+        return self.neighbour(1)
+
+    def below(self) -> Optional["MemoryPanel"]:
+        return self.neighbour(-1)
+
+# ----------------------------------------------------------------------
+# MemoryBackend - pytlm backend without a terminal
+# ----------------------------------------------------------------------
+#
+#   backend = MemoryBackend(120, 40)
+#   pytlm.set_backend(backend)
+#   wm = WindowManager(HeadlessScreen(backend))
+#
+# update_panels() composes the panel stack into one screen (rows of
+# characters and attributes), only when a window or the stack changed.
+# Colour pairs are recorded, not set: color_pair(n) has the curses
+# encoding, so a terminal that defines the same pairs shows the same
+# attributes.
+#
+
+class MemoryBackend:
+
+    acs = False
+
+    def __init__(self, width: int = 80, height: int = 24) :
+
+        self.width  = width
+        self.height = height
+
+        self.stack: List[MemoryPanel] = []
+        self.stack_version = 0
+
+        self.pairs  = {}            # pair -> (fg, bg)
+        self.mouse  = deque()
+
+        self.chars  = []
+        self.attrs  = []
+        self.cached_rows = None
+        self.composed = None        # what the screen was composed from
+        self.frames   = 0           # compositions so far
+
+        self.compose()
+
+    def newwin(self, height: int, width: int, y: int, x: int) -> MemoryWindow:
+        return MemoryWindow(height, width, y, x)
+
+    def new_panel(self, win: MemoryWindow) -> MemoryPanel:
+        return MemoryPanel(self, win)
+
+    def bottom_panel(self) -> Optional[MemoryPanel]:
+        return self.stack[0] if self.stack else None
+
+    def top_panel(self) -> Optional[MemoryPanel]:
+        return self.stack[-1] if self.stack else None
+
+    def init_pair(self, pair: int, fg: int, bg: int) -> None:
+        self.pairs[pair] = (fg, bg)
+
+    def color_pair(self, pair: int) -> int:
+        return (pair << 8) & curses.A_COLOR
+
+    def getmouse(self) -> tuple:
+
+        if not self.mouse :
+            raise curses.error("no mouse event")
+
+        return self.mouse.popleft()
+
+    def mousemask(self, mask: int) -> None:
+        pass
+
+    def curs_set(self, visibility: int) -> None:
+        pass
+
+    def resize(self, width: int, height: int) -> None:
+        (self.width, self.height) = (width, height)
+        self.composed = None
+
+    # ---- composition ------------------------------------------------------
+
+    def update_panels(self) -> None:
+
+        key = (self.stack_version, self.width, self.height,
+               tuple(p.win.version for p in self.stack))
+
+        if key != self.composed :
+            self.compose()
+            self.composed = key
+
+    def doupdate(self) -> None:
+        pass
+
+    def compose(self) -> None:
+
+        width  = self.width
+        chars  = [[" "] * width for _ in range(self.height)]
+        attrs  = [[0] * width for _ in range(self.height)]
+
+        for panel in self.stack :
+
+            win = panel.win
+
+            x0 = max(0, win.x)
+            x1 = min(width, win.x + win.width)
+
+            if x0 >= x1 :
+                continue
+
+            for row in range(max(0, win.y), min(self.height, win.y + win.height)) :
+                src = row - win.y
+                chars[row][x0:x1] = win.chars[src][x0 - win.x:x1 - win.x]
+                attrs[row][x0:x1] = win.attrs[src][x0 - win.x:x1 - win.x]
+
+        self.chars   = chars
+        self.attrs   = attrs
+        self.frames += 1
+
+        self.cached_rows = None
+
+    def rows(self) -> list:
+
+        # (text, attributes) per screen row, as last composed.
+
+        if self.cached_rows is None :
+            self.cached_rows = [("".join(c), tuple(a)) for c, a in zip(self.chars, self.attrs)]
+
+        return self.cached_rows
+
+# ----------------------------------------------------------------------
+# HeadlessScreen - stands in for stdscr
+# ----------------------------------------------------------------------
+
+class HeadlessScreen:
+
+    def __init__(self, backend: MemoryBackend) :
+        self.backend = backend
+        self.keys    = deque()
+
+    def push_key(self, key: int) -> None:
+        self.keys.append(key)
+
+    def push_mouse(self, x: int, y: int, bstate: int) -> None:
+        self.backend.mouse.append((0, x, y, 0, bstate))
+        self.keys.append(curses.KEY_MOUSE)
+
+    def resize(self, width: int, height: int) -> None:
+        self.backend.resize(width, height)
+        self.keys.append(curses.KEY_RESIZE)
+
+    def getch(self) -> int:
+        return self.keys.popleft() if self.keys else -1
+
+    def getmaxyx(self) -> tuple:
+        return (self.backend.height, self.backend.width)
+
+    def nodelay(self, flag: bool) -> None:
+        pass
+
+    def leaveok(self, flag: bool) -> None:
+        pass
+
+    def keypad(self, flag: bool) -> None:
+        pass
+
+    def noutrefresh(self) -> None:
+        pass
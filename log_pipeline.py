@@ -0,0 +1,187 @@
+import copy
+import queue
+import logging
+import threading
+
+from typing import List, Optional
+
+# Tracebacks are rendered as the stdlib Formatter does.
+_formatter = logging.Formatter()
+
+# ----------------------------------------------------------------------
+# Queue based logging for the UI thread
+# ----------------------------------------------------------------------
+#
+# The UI thread only puts records on a bounded in-memory queue; a writer
+# thread formats them (lazily, %-style arguments are only merged there)
+# and hands them to the real handlers in batches, flushing once per
+# batch.  When the queue is full the record is dropped and counted
+# rather than blocking event_loop.
+#
+# Arguments mutated after logging show their later value.  With eager =
+# True the message is merged on the UI thread instead, as QueueHandler
+# does, at the cost of formatting there.
+#
+
+class BoundedQueueHandler(logging.Handler):
+
+    def __init__(self, records: queue.Queue, eager: bool = False) :
+
+        super().__init__()
+
+        self.records = records
+        self.eager   = eager
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+
+        # A copy with the message merged and the traceback as text, the
+        # handlers' own formatters still run on the writer thread.
+
+        record = copy.copy(record)
+
+        record.msg  = record.getMessage()
+        record.args = None
+
+        if record.exc_info :
+            if not record.exc_text :
+                record.exc_text = _formatter.formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+
+        try :
+            self.records.put_nowait(self.prepare(record) if self.eager else record)
+        except queue.Full :
+            self.dropped += 1
+        except Exception :
+            self.handleError(record)
+
+
+class BatchLogWriter:
+
+    def __init__(self, records: queue.Queue, handlers: List[logging.Handler], batch_size: int = 256) :
+
+        self.records    = records
+        self.handlers   = handlers
+        self.batch_size = batch_size
+
+        self.thread: Optional[threading.Thread] = None
+        self.source: Optional[tuple] = None         # (logger, queue handler)
+
+    def attach(self, logger: logging.Logger, handler: BoundedQueueHandler) -> None:
+
+        # The queue handler is removed from logger again by stop().
+
+        logger.addHandler(handler)
+        self.source = (logger, handler)
+
+    def start(self) -> None:
+
+        self.thread = threading.Thread(target=self.run, name="BatchLogWriter", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+
+        # Detached first, nothing is queued behind the last record.
+        if self.source :
+            (logger, handler) = self.source
+            logger.removeHandler(handler)
+            self.source = None
+
+        if self.thread :
+            self.records.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def run(self) -> None:
+
+        running = True
+
+        while running :
+
+            # Block for the first record, then drain what is already queued.
+
+            batch = [self.records.get()]
+
+            while len(batch) < self.batch_size :
+                try :
+                    batch.append(self.records.get_nowait())
+                except queue.Empty :
+                    break
+
+            if None in batch :
+                running = False
+                batch   = [r for r in batch if r is not None]
+
+            if batch :
+                self.write(batch)
+
+    def write(self, batch: List[logging.LogRecord]) -> None:
+
+        for handler in self.handlers :
+
+            records = [r for r in batch if r.levelno >= handler.level and handler.filter(r)]
+
+            if not records :
+                continue
+
+            if not isinstance(handler, logging.StreamHandler) :
+                for record in records :
+                    handler.handle(record)
+                continue
+
+            # One write and one flush for the whole batch, when there is
+            # a stream: a delayed FileHandler only opens it on an emit.
+
+            handler.acquire()
+
+            try :
+                if handler.stream is None :
+                    for record in records :
+                        handler.emit(record)
+                else :
+                    text = "".join(handler.format(r) + handler.terminator for r in records)
+                    handler.stream.write(text)
+                    handler.flush()
+
+            except Exception :
+                handler.handleError(records[-1])
+
+            finally :
+                handler.release()
+
+
+def setup_queue_logging(handlers: List[logging.Handler], **kwargs) -> tuple[BoundedQueueHandler, BatchLogWriter]:
+
+    #
+    #  kwargs :
+    #
+    #    logger      logger to attach to (default: root logger)
+    #    level       level for that logger (default: unchanged)
+    #    maxsize     queue bound in records (default: 10000)
+    #    batch_size  records written per batch (default: 256)
+    #    eager       merge messages on the logging thread (default: False)
+    #
+
+    logger     = kwargs.get("logger",     None) or logging.getLogger()
+    level      = kwargs.get("level",      None)
+    maxsize    = kwargs.get("maxsize",    10000)
+    batch_size = kwargs.get("batch_size", 256)
+    eager      = kwargs.get("eager",      False)
+
+    records = queue.Queue(maxsize)
+
+    handler = BoundedQueueHandler(records, eager)
+    writer  = BatchLogWriter(records, list(handlers), batch_size)
+
+    writer.attach(logger, handler)
+
+    if level is not None :
+        logger.setLevel(level)
+
+    writer.start()
+
+    return handler, writer
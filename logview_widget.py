@@ -0,0 +1,383 @@
+import os
+import mmap
+import time
+import curses
+import logging
+import threading
+
+from array import array
+
+from pytlm import Widget
+from pytlm import cm
+
+logger = logging.getLogger("LogView")
+
+# ----------------------------------------------------------------------
+# LineRing - bounded byte ring with a line index
+# ----------------------------------------------------------------------
+#
+# Text is kept in one preallocated bytearray used as a ring, lines are
+# only (absolute) start offsets in an array; line i runs up to the start
+# of line i + 1.  Old lines are dropped once their bytes are overwritten
+# or there are more than max_lines, so memory stays at capacity bytes
+# plus 8 bytes per line whatever the volume of input.
+#
+
+class LineRing:
+
+    def __init__(self, capacity: int = 1 << 20, max_lines: int = 10000, max_line: int = 4096) :
+
+        self.capacity  = capacity
+        self.max_lines = max_lines
+        self.max_line  = min(max_line, capacity)
+
+        self.buffer    = bytearray(capacity)
+        self.total     = 0              # bytes ever written (absolute offset)
+
+        self.starts    = array("q")     # absolute start of each line
+        self.head      = 0              # first live entry of starts
+        self.dropped   = 0              # lines dropped so far (absolute line number of head)
+
+        self.partial   = b""
+
+    def __len__(self) -> int:
+        return len(self.starts) - self.head
+
+    def write(self, data: bytes) -> None:
+
+        pos = self.total % self.capacity
+        end = pos + len(data)
+
+        if end <= self.capacity :
+            self.buffer[pos:end] = data
+        else :
+            cut = self.capacity - pos
+            self.buffer[pos:] = data[:cut]
+            self.buffer[:end - self.capacity] = data[cut:]
+
+        self.total += len(data)
+
+    def append_line(self, line: bytes) -> None:
+
+        line = line[:self.max_line]
+
+        self.starts.append(self.total)
+        self.write(line)
+
+        # Drop what was overwritten, and past max_lines.
+
+        limit  = self.total - self.capacity
+        starts = self.starts
+
+        while self.head < len(starts) and (starts[self.head] < limit or len(starts) - self.head > self.max_lines) :
+            self.head    += 1
+            self.dropped += 1
+
+        if self.head > 4096 and self.head * 2 > len(starts) :
+            del starts[:self.head]
+            self.head = 0
+
+    def extend(self, data: bytes) -> int:
+
+        # Appends complete lines, keeps a trailing partial one; returns lines added.
+
+        lines = (self.partial + data).split(b"\n")
+
+        self.partial = lines.pop()
+
+        if len(self.partial) > self.max_line :
+            lines.append(self.partial)
+            self.partial = b""
+
+        for line in lines :
+            self.append_line(line.rstrip(b"\r"))
+
+        return len(lines)
+
+    def line(self, index: int) -> bytes:
+
+        # index 0 is the oldest line kept.
+
+        starts = self.starts
+        i      = self.head + index
+
+        start = starts[i]
+        end   = starts[i + 1] if i + 1 < len(starts) else self.total
+
+        pos = start % self.capacity
+
+        if pos + (end - start) <= self.capacity :
+            return bytes(self.buffer[pos:pos + end - start])
+
+        cut = self.capacity - pos
+
+        return bytes(self.buffer[pos:]) + bytes(self.buffer[:end - start - cut])
+
+# ----------------------------------------------------------------------
+# FileTail - incremental reads from a stored offset
+# ----------------------------------------------------------------------
+#
+# Each poll reads what was appended since the last one with os.pread
+# (at most max_read bytes, the rest on the next poll).  A new file only
+# starts at its last tail_lines lines, found by scanning backwards
+# through an mmap of the end of the file, so opening a 10 GB log reads a
+# few KiB.  Truncation restarts at 0 and rotation (a new inode) reopens.
+#
+
+class FileTail:
+
+    def __init__(self, **kwargs) :
+
+        self.path       = kwargs["path"]
+        self.max_read   = kwargs.get("max_read",   1 << 20)
+        self.tail_lines = kwargs.get("tail_lines", 1000)
+        self.tail_bytes = kwargs.get("tail_bytes", 1 << 20)
+
+        self.fd     = None
+        self.inode  = None
+        self.offset = 0
+
+    def open(self) -> None:
+
+        self.fd     = os.open(self.path, os.O_RDONLY | os.O_CLOEXEC)
+        stat        = os.fstat(self.fd)
+        self.inode  = stat.st_ino
+        self.offset = self.tail_start(stat.st_size)
+
+    def tail_start(self, size: int) -> int:
+
+        if size == 0 :
+            return 0
+
+        # Only map the last tail_bytes (page aligned).
+
+        base = max(0, size - self.tail_bytes)
+        base -= base % mmap.ALLOCATIONGRANULARITY
+
+        with mmap.mmap(self.fd, size - base, access=mmap.ACCESS_READ, offset=base) as view :
+
+            pos = len(view) - 1 if view[-1:] == b"\n" else len(view)
+
+            for _ in range(self.tail_lines) :
+                pos = view.rfind(b"\n", 0, pos)
+                if pos < 0 :
+                    return base if base == 0 else base + view.find(b"\n") + 1
+
+            return base + pos + 1
+
+    def close(self) -> None:
+
+        if self.fd is not None :
+            os.close(self.fd)
+            self.fd = None
+
+    def poll(self) -> bytes:
+
+        try :
+
+            if self.fd is None :
+                self.open()
+
+            size = os.fstat(self.fd).st_size
+
+            if size < self.offset :
+                self.offset = 0                 # truncated
+
+            elif size == self.offset :
+
+                # Rotated ? (only checked when idle, a stat per poll)
+                if os.stat(self.path).st_ino != self.inode :
+                    self.close()
+                    self.open()
+                    self.offset = 0
+
+                return b""
+
+            data = os.pread(self.fd, min(size - self.offset, self.max_read), self.offset)
+            self.offset += len(data)
+
+            return data
+
+        except OSError as e :
+            logger.debug("Cannot tail %s : %s", self.path, e)
+            self.close()
+            return b""
+
+# ----------------------------------------------------------------------
+# LogView
+# ----------------------------------------------------------------------
+#
+# Shows the newest lines (following) or, once scrolled, stays anchored
+# on an absolute line number while new lines arrive.  Only the lines in
+# the viewport are decoded and drawn.
+#
+#   Up / Down, PgUp / PgDn, Home   scroll back
+#   End                            follow again
+#
+
+class LogView(Widget):
+
+    focusable = True
+
+    def __init__(self, x: int, y: int, width: int, height: int, **kwargs) :
+
+        #
+        #  kwargs :
+        #
+        #    path          file to follow (default: None, fed with append)
+        #    interval      seconds between reads of path (default: 0.1)
+        #    capacity      bytes of text kept (default: 1 MiB)
+        #    max_lines     lines kept (default: 10000)
+        #    max_line      longer lines are cut (default: 4096 bytes)
+        #    max_read      bytes read per poll (default: 1 MiB)
+        #    tail_lines    lines shown from an existing file (default: 1000)
+        #    encoding      text encoding (default: "utf-8")
+        #
+
+        super().__init__(x, y, width, height, **kwargs)
+
+        self.ring = LineRing(kwargs.get("capacity",  1 << 20),
+                             kwargs.get("max_lines", 10000),
+                             kwargs.get("max_line",  4096))
+
+        path = kwargs.get("path", None)
+
+        self.tail     = FileTail(**kwargs) if path else None
+        self.interval = kwargs.get("interval", 0.1)
+        self.encoding = kwargs.get("encoding", "utf-8")
+
+        self.text_fg  = kwargs.get("text_foreground", "default")
+        self.text_bg  = kwargs.get("text_background", "default")
+        self.text_att = kwargs.get("text_attribute",  "default")
+        self.text_color = None
+
+        self.top = None         # absolute line at the top, None while following
+
+        self.last_poll = 0.0
+
+        # Lines appended since the last tick, the repaint is requested
+        # from the UI thread.
+        self.pending = False
+
+        self.lock = threading.Lock()
+
+    def append(self, data) -> None:
+
+        # Thread safe, for producers other than a file (bytes or str);
+        # shown on the next tick.
+
+        if isinstance(data, str) :
+            data = data.encode(self.encoding, "replace")
+
+        with self.lock :
+            if self.ring.extend(data) :
+                self.pending = True
+
+    def handle_tick(self) :
+
+        now = time.monotonic()
+
+        if self.tail is not None and now - self.last_poll >= self.interval :
+
+            self.last_poll = now
+
+            data = self.tail.poll()
+
+            if data :
+                self.append(data)
+
+        with self.lock :
+            (pending, self.pending) = (self.pending, False)
+
+        # Scrolled back, the viewport does not change.
+        if pending and self.top is None :
+            self.request_repaint()
+
+    # ---- scrolling --------------------------------------------------------
+
+    def first_visible(self) -> int:
+
+        # Absolute number of the top line in the viewport.
+
+        ring   = self.ring
+        bottom = ring.dropped + len(ring) - self.height
+
+        if self.top is None :
+            return max(ring.dropped, bottom)
+
+        return max(ring.dropped, min(self.top, bottom))
+
+    def scroll(self, lines: int) -> None:
+
+        ring = self.ring
+        top  = self.first_visible() + lines
+
+        if top >= ring.dropped + len(ring) - self.height :
+            self.top = None                     # back at the end, follow
+        else :
+            self.top = max(ring.dropped, top)
+
+        self.request_repaint()
+
+    def handle_key(self, key: int) -> bool:
+
+        page = max(1, self.height - 1)
+
+        if key == curses.KEY_UP :
+            self.scroll(-1)
+        elif key == curses.KEY_DOWN :
+            self.scroll(1)
+        elif key == curses.KEY_PPAGE :
+            self.scroll(-page)
+        elif key == curses.KEY_NPAGE :
+            self.scroll(page)
+        elif key == curses.KEY_HOME :
+            self.top = self.ring.dropped
+            self.request_repaint()
+        elif key == curses.KEY_END :
+            self.top = None
+            self.request_repaint()
+        else :
+            return False
+
+        return True
+
+    def handle_mouse(self, x: int, y: int, button: int) -> bool:
+
+        if not self.contains(x, y) :
+            return False
+
+        if button & curses.BUTTON4_PRESSED :
+            self.scroll(-3)
+            return True
+
+        if button & getattr(curses, "BUTTON5_PRESSED", 0) :
+            self.scroll(3)
+            return True
+
+        return False
+
+    # ---- painting ---------------------------------------------------------
+
+    def paint(self, win) :
+
+        if self.text_color is None :
+            self.text_color = cm(self.text_fg, self.text_bg, self.text_att)
+
+        ring  = self.ring
+        width = self.width
+
+        with self.lock :
+
+            first = self.first_visible() - ring.dropped
+            count = min(self.height, len(ring) - first)
+
+            lines = [ring.line(first + i) for i in range(count)]
+
+        try :
+            for row, raw in enumerate(lines) :
+                text = raw[:width * 4].decode(self.encoding, "replace").expandtabs(8)
+                win.addstr(self.y + row, self.x, text[:width].ljust(width), self.text_color)
+
+        except curses.error :
+            pass
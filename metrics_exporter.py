@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import socketserver
+import threading
+import logging
+
+from http.server import BaseHTTPRequestHandler
+from typing import Optional
+
+from pytlm import Container
+from pytlm import WindowManager
+
+logger = logging.getLogger("MetricsExporter")
+
+#
+#  Loop health metrics taken from WindowManager.stats
+#
+#     stats key        metric name                        type
+#
+
+_LOOP_METRICS = (
+    ("frames",         "pytlm_frames_total",               "counter"),
+    ("paints",         "pytlm_paints_total",               "counter"),
+    ("ticks",          "pytlm_ticks_total",                "counter"),
+    ("frame_time",     "pytlm_frame_time_seconds",         "gauge"),
+    ("frame_time_max", "pytlm_frame_time_max_seconds",     "gauge"),
+    ("tick_lag",       "pytlm_tick_lag_seconds",           "gauge"),
+    ("first_frame",    "pytlm_first_frame_seconds",        "gauge"),
+    ("pending",        "pytlm_pending_windows",            "gauge"),
+    ("output_total",   "pytlm_output_bytes_total",         "counter"),
+    ("output_rate",    "pytlm_output_bytes_per_second",    "gauge"),
+    ("deferred",       "pytlm_deferred_windows",           "gauge"),
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_prometheus(snapshot) -> str:
+
+    (timestamp, loop, widgets) = snapshot
+
+    lines = []
+
+    for key, metric, kind in _LOOP_METRICS :
+        if loop.get(key) is not None :
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.append(f"{metric} {loop[key]}")
+
+    # Group the widget samples by metric name, one TYPE line per family.
+
+    families = {}
+
+    for entry in widgets :
+
+        labels = {"window": entry["window"], "widget": entry["widget"]}
+        labels.update(entry["labels"])
+
+        text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+
+        for name, value in entry["metrics"].items() :
+            families.setdefault(f"pytlm_{name}", []).append(f"{{{text}}} {value}")
+
+    for metric, samples in families.items() :
+        kind = "counter" if metric.endswith("_total") else "gauge"
+        lines.append(f"# TYPE {metric} {kind}")
+        lines.extend(f"{metric}{sample}" for sample in samples)
+
+    lines.append("")
+
+    return "\n".join(lines)
+
+
+def render_json(snapshot) -> str:
+
+    (timestamp, loop, widgets) = snapshot
+
+    return json.dumps({"timestamp": timestamp, "loop": loop, "widgets": widgets})
+
+# ----------------------------------------------------------------------
+# HTTP front end (TCP or unix socket)
+# ----------------------------------------------------------------------
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    exporter = None
+
+    def do_GET(self) :
+
+        path = self.path.split("?", 1)[0]
+
+        if path in ("/", "/metrics") :
+            body  = render_prometheus(self.exporter.snapshot)
+            ctype = "text/plain; version=0.0.4; charset=utf-8"
+
+        elif path in ("/json", "/metrics.json") :
+            body  = render_json(self.exporter.snapshot)
+            ctype = "application/json"
+
+        else :
+            self.send_error(404)
+            return
+
+        data = body.encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self) :
+        return str(self.client_address or "local")
+
+    def log_message(self, format, *args) :
+        logger.debug(format, *args)
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads      = True
+    allow_reuse_address = True
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads      = True
+
+# ----------------------------------------------------------------------
+# MetricsExporter
+# ----------------------------------------------------------------------
+#
+# The UI thread takes a snapshot of the widget values and loop health on
+# a system tick (at most once per interval) and publishes it by swapping
+# a single reference.  The server thread only ever renders the latest
+# published snapshot, so a slow scraper never blocks event_loop.
+#
+
+class MetricsExporter:
+
+    def __init__(self, wm: WindowManager, **kwargs) :
+
+        self.wm        = wm
+
+        self.host      = kwargs.get("host",      "127.0.0.1")
+        self.port      = kwargs.get("port",      9464)
+        self.unix_path = kwargs.get("unix_path", None)
+        self.interval  = kwargs.get("interval",  1.0)
+
+        self.last_collect = 0.0
+        self.snapshot     = (time.time(), {}, [])
+
+        self.server: Optional[socketserver.BaseServer] = None
+        self.thread: Optional[threading.Thread]        = None
+
+    def start(self) -> None:
+
+        handler = type("MetricsHandler", (_MetricsHandler,), {"exporter": self})
+
+        if self.unix_path :
+            self.server = _UnixServer(self.unix_path, handler)
+        else :
+            self.server = _TCPServer((self.host, self.port), handler)
+
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       name="MetricsExporter", daemon=True)
+        self.thread.start()
+
+        self.wm.add_tick_handler(self.handle_tick)
+
+    def stop(self) -> None:
+
+        self.wm.remove_tick_handler(self.handle_tick)
+
+        if self.server :
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+        if self.unix_path :
+            try :
+                os.unlink(self.unix_path)
+            except OSError :
+                pass
+
+    def handle_tick(self) -> None:
+
+        now = time.monotonic()
+
+        if now - self.last_collect >= self.interval :
+            self.last_collect = now
+            self.collect()
+
+    def collect(self) -> None:
+
+        widgets = []
+
+        for index, win in enumerate(self.wm.windows()) :
+            self._collect_widgets(win.name or f"window{index}", "", win.widgets, widgets)
+
+        self.snapshot = (time.time(), dict(self.wm.stats), widgets)
+
+    def _collect_widgets(self, window: str, prefix: str, children, result: list) -> None:
+
+        for index, w in enumerate(children) :
+
+            path   = f"{prefix}{w.name or f'{type(w).__name__}{index}'}"
+            labels = w.metric_labels()
+
+            # Unnamed widgets are only exported when they label themselves.
+            if w.name or labels :
+                values = w.metrics()
+                if values :
+                    result.append({"window":  window,
+                                   "widget":  path,
+                                   "labels":  labels,
+                                   "metrics": values})
+
+            if isinstance(w, Container) :
+                self._collect_widgets(window, f"{path}/", w.children, result)
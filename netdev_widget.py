@@ -8,8 +8,110 @@ from pytlm import Container
 from pytlm import cm
 from pytlm import StatusLabel
 
+from data_model import DataModel
+from units import unit_format
+
+import procfs
+
 logger = logging.getLogger("NetworkDevice")
 
+#
+#  Rates derived from the /proc/net/dev counters, published in the model
+#  as "<counter>_rate".
+#
+#      counter          multiplier  units   metric
+#
+
+_RATES = (
+    ("tx_bytes",     8, "bps", "netdev_tx_bps"),
+    ("rx_bytes",     8, "bps", "netdev_rx_bps"),
+    ("rx_multicast", 1, "pps", "netdev_rx_multicast_pps"),
+    ("tx_packets",   1, "pps", "netdev_tx_pps"),
+    ("rx_packets",   1, "pps", "netdev_rx_pps"),
+)
+
+#
+#  Labels, created with the device (their colours on first paint).
+#
+#      attribute   x  y  width  options
+#
+
+_VALUE = {"normal_background": "black",
+          "normal_foreground": "green",
+          "units_background":  "black"}
+
+_LABELS = (
+    ("host_dev",   1, 0, 15, {"normal_foreground": "white", "normal_background": "black"}),
+
+    ("tx_bps",     7, 1, 11, dict(_VALUE, format=">6.2f")),
+    ("rx_bps",     7, 2, 11, dict(_VALUE, format=">6.2f",
+                                  threshold=90.0,
+                                  comparison=">=",
+                                  fault_background="red",
+                                  fault_foreground="white")),
+    ("rx_mcs",     7, 3, 11, dict(_VALUE, format=">6.2f")),
+
+    ("tx_pps",    20, 1, 11, dict(_VALUE, format=">6.2f")),
+    ("rx_pps",    20, 2, 11, dict(_VALUE, format=">6.2f")),
+
+    ("rx_errs",   33, 1,  6, dict(_VALUE, format=">6", units=" Errs", value=0)),
+    ("tx_errs",   33, 2,  6, dict(_VALUE, format=">6", units=" Errs", value=0)),
+    ("rx_carr",   33, 3,  6, dict(_VALUE, format=">6", units=" Carr", value=0)),
+
+    ("rx_drop",   46, 1,  5, dict(_VALUE, format=">6", units=" Drop", value=0)),
+    ("tx_drop",   46, 2,  5, dict(_VALUE, format=">6", units=" Drop", value=0)),
+    ("rx_fram",   46, 3,  5, dict(_VALUE, format=">6", units=" Frms", value=0)),
+
+    ("rx_fifo",   59, 1,  5, dict(_VALUE, format=">6", units=" Fifo", value=0)),
+    ("tx_fifo",   59, 2,  5, dict(_VALUE, format=">6", units=" Fifo", value=0)),
+    ("tx_coll",   59, 3,  5, dict(_VALUE, format=">6", units=" Coll", value=0)),
+)
+
+#
+#  Model bindings
+#
+#      model key            attribute  rate units
+#
+
+_BINDINGS = (
+    ("name",              "host_dev", None),
+
+    ("tx_bytes_rate",     "tx_bps",   "bps"),
+    ("rx_bytes_rate",     "rx_bps",   "bps"),
+    ("rx_multicast_rate", "rx_mcs",   "pps"),
+    ("tx_packets_rate",   "tx_pps",   "pps"),
+    ("rx_packets_rate",   "rx_pps",   "pps"),
+
+    ("rx_errors",         "rx_errs",  None),
+    ("rx_dropped",        "rx_drop",  None),
+    ("rx_fifo",           "rx_fifo",  None),
+    ("rx_frame",          "rx_fram",  None),
+    ("tx_errors",         "tx_errs",  None),
+    ("tx_dropped",        "tx_drop",  None),
+    ("tx_fifo",           "tx_fifo",  None),
+    ("tx_carrier",        "rx_carr",  None),
+    ("tx_collisions",     "tx_coll",  None),
+)
+
+_MODEL_KEYS = ("name",) + procfs.NET_DEV_FIELDS
+
+_COUNTER_METRICS = ("rx_errors", "rx_dropped", "rx_fifo", "rx_frame",
+                    "tx_errors", "tx_dropped", "tx_fifo", "tx_collisions", "tx_carrier")
+
+
+def counter_rates(current, previous, elapsed: float, multiplier: int = 1) -> list:
+
+    # NetworkDevice.calc_rate for a whole vector of counters in one pass.
+
+    if elapsed <= 0 :
+        return [0.0] * len(current)
+
+    scale = multiplier / elapsed
+
+    # A counter that went back (reset) has a rate of 0, as in calc_rate.
+    return [(c - p) * scale if c >= p else 0.0 for c, p in zip(current, previous)]
+
+
 class NetworkDevice(Container) :
 
     def __init__(self, x: int, y: int, width: int, height: int, **kwargs) :
@@ -35,120 +137,44 @@ class NetworkDevice(Container) :
         self.last_data     = {}
         self.data          = {}
 
-        #    00         10        20        30        40        50        60          
-        #    0123456789|123456789|123456789|123456789|123456789|123456789|123456789
-        #   +=======================================================================  
-        # 0 |HOST / NIC :  
-        # 1 |  TX: 000.00 Xbps  00000 p/s  00000 Errs  00000 Drop  00000 Fifo  
-        # 2 |  RX: 000.00 Xbps  00000 p/s  00000 Errs  00000 Drop  00000 Fifo    
-        # 3 |  MC:  00000 Xps   00000 car  00000 Frms  00000 coll
-        # 4 |
-        # 5 | 
-
-        self.host_dev = self.add_widget(StatusLabel( 1, 0, 15,
-                                                     normal_foreground="white",
-                                                     normal_background="black"))
-
-        ###############################
- 
-        self.tx_bps   = self.add_widget(StatusLabel( 7, 1, 11, format=">6.2f",
-                                                     normal_background="black",
-                                                     normal_foreground="green",
-                                                     units_background="black"))
-
-        self.rx_bps   = self.add_widget(StatusLabel( 7, 2, 11, format=">6.2f",
-                                                     threshold=90.0,
-                                                     comparison=">=",
-                                                     fault_background="red",
-                                                     fault_foreground="white",
-                                                     normal_background="black",
-                                                     normal_foreground="green",
-                                                     units_background="black"))
-                                                     
-        self.rx_mcs   = self.add_widget(StatusLabel( 7, 3, 11, format=">6.2f",
-                                                     normal_background="black",
-                                                     normal_foreground="green",
-                                                     units_background="black"))
-
-        ###############################
- 
-        self.tx_pps   = self.add_widget(StatusLabel(20, 1, 11, format=">6.2f",
-                                                    normal_background="black",
-                                                    normal_foreground="green",
-                                                    units_background="black"))
-                                                    
-        self.rx_pps   = self.add_widget(StatusLabel(20, 2, 11, format=">6.2f",
-                                                    normal_background="black",
-                                                    normal_foreground="green",
-                                                    units_background="black"))
-        ###############################
-                
-        self.rx_errs  = self.add_widget(StatusLabel(33, 1, 6, format=">6",
-                                                    units=" Errs",
-                                                    value=0,
-                                                    normal_background="black",
-                                                    normal_foreground="green",
-                                                    units_background="black"))
-        
-        self.tx_errs  = self.add_widget(StatusLabel(33, 2, 6, format=">6",
-                                                    units=" Errs",
-                                                    value=0,
-                                                    normal_background="black",
-                                                    normal_foreground="green",
-                                                    units_background="black"))
-
-        self.rx_carr  = self.add_widget(StatusLabel(33, 3, 6, format=">6",
-                                                    units=" Carr",
-                                                    value=0,
-                                                    normal_background="black",
-                                                    normal_foreground="green",
-                                                    units_background="black"))
-
-        ###############################
-
-        self.rx_drop  = self.add_widget(StatusLabel(46, 1, 5, format=">6",
-                                                    units=" Drop",
-                                                    value=0,
-                                                    normal_background="black",
-                                                    normal_foreground="green",
-                                                    units_background="black"))
-                                                    
-        self.tx_drop  = self.add_widget(StatusLabel(46, 2, 5, format=">6",
-                                                    units=" Drop",
-                                                    value=0,
-                                                    normal_background="black",
-                                                    normal_foreground="green",
-                                                    units_background="black"))
-
-        self.rx_fram  = self.add_widget(StatusLabel(46, 3, 5, format=">6",
-                                                    units=" Frms",
-                                                    value=0,
-                                                    normal_background="black",
-                                                    normal_foreground="green",
-                                                    units_background="black"))
-        
-        ###############################
-        
-        self.rx_fifo  = self.add_widget(StatusLabel(59, 1, 5, format=">6",
-                                                    units=" Fifo",
-                                                    value=0,
-                                                    normal_background="black",
-                                                    normal_foreground="green",
-                                                    units_background="black"))
-        
-        self.tx_fifo  = self.add_widget(StatusLabel(59, 2, 5, format=">6",
-                                                    units=" Fifo",
-                                                    value=0,
-                                                    normal_background="black",
-                                                    normal_foreground="green",
-                                                    units_background="black"))
-                                                            
-        self.tx_coll  = self.add_widget(StatusLabel(59, 3, 5, format=">6",
-                                                    units=" Coll",
-                                                    value=0,
-                                                    normal_background="black",
-                                                    normal_foreground="green",
-                                                    units_background="black"))
+        self.model         = kwargs.get("model", None) or DataModel()
+
+        # Anything with sample(path) returning parse_net_dev() results and
+        # sample_time(path), e.g. a procfs.ProcReader or shm_collector.Collector.
+        self.source        = kwargs.get("source", None) or procfs.get_reader()
+
+        self.built         = False
+
+        self.build()
+
+    #    00         10        20        30        40        50        60          
+    #    0123456789|123456789|123456789|123456789|123456789|123456789|123456789
+    #   +=======================================================================  
+    # 0 |HOST / NIC :  
+    # 1 |  TX: 000.00 Xbps  00000 p/s  00000 Errs  00000 Drop  00000 Fifo  
+    # 2 |  RX: 000.00 Xbps  00000 p/s  00000 Errs  00000 Drop  00000 Fifo    
+    # 3 |  MC:  00000 Xps   00000 car  00000 Frms  00000 coll
+    # 4 |
+    # 5 | 
+
+    def build(self) :
+
+        #
+        # The labels (from _LABELS) are plain objects, bound to the model;
+        # only their curses colours wait for the first paint.
+        #
+
+        if self.built :
+            return
+
+        self.built = True
+
+        for attr, x, y, width, options in _LABELS :
+            setattr(self, attr, self.add_widget(StatusLabel(x, y, width, **options)))
+
+        for key, attr, units in _BINDINGS :
+            formatter = self.rate_formatter(units) if units else None
+            self.model.bind(key, getattr(self, attr), formatter)
 
         
     def paint(self, win) :
@@ -187,103 +213,111 @@ class NetworkDevice(Container) :
     #              (time_stop - Time_start)
     #
     
-    def calc_bw(self, name) -> tuple[float, str]:
+    def calc_rate(self, name, multiplier=8) -> float:
 
         if name in self.last_data :
             
             data_d = (self.data[name] - self.last_data[name])
             time_d = (self.data['time_ms'] - self.last_data['time_ms'])
 
-            bw_bps = (data_d * 8) / time_d
+            # Counters reset (driver reload, reboot since a restored session)
+            if data_d < 0 or time_d <= 0 :
+                return 0.0
+
+            return (data_d * multiplier) / time_d
 
-            return self.humanize_number(bw_bps)
-                      
-        else :
-                      
-            return 0, ""
+        return 0.0
 
     def humanize_number(self, value) -> tuple[float, str] :
-                      
-        units = [' ','K','M','G','T']
-        unit_index = 0
 
-        count = float(value)
-                      
-        while count >= 1000 and unit_index < len(units) :
-            count /= 1000
-            unit_index += 1
+        # (count, SI prefix), see units.UnitFormat.
+        return unit_format().scale(value)
 
-        return count, units[unit_index] 
+    def rate_formatter(self, units) :
 
+        # Shared and cached per units, (count, " <prefix><units>") tuples.
+        return unit_format(units).split
+
+    def read_stats(self, name) :
+
+        # One shared read and parse of /proc/net/dev per tick for all devices.
+        counters = self.source.sample("/proc/net/dev").get(name)
+
+        if counters is not None :
+
+            stats = dict(zip(procfs.NET_DEV_FIELDS, counters))
+            stats['name']    = name
+
+            # Wall clock time the sample was taken (it may be older than now).
+            stats['time_ms'] = time.time() - (time.monotonic() - self.source.sample_time("/proc/net/dev"))
+
+            self.last_data = self.data
+            self.data = stats
+            self.update_stats()
+                    
+
+    def update_stats(self) :
+
+        # Lazy %-style args, only formatted if a handler takes the record.
+        logger.info("Stats : %s", self.data)
+
+        # Name, counters and rates; not the sample time, which always changes.
+        data   = self.data
+        values = {key: data[key] for key in _MODEL_KEYS if key in data}
+
+        for name, multiplier, units, metric in _RATES :
+            values[f"{name}_rate"] = self.calc_rate(name, multiplier)
+
+        self.model.update(values)
+
+        
     #
+    # Session state : the last two samples, so rates are shown on the
+    # first frame after a restart and the first new sample has a base.
     #
+
+    def save_state(self) -> dict:
+        return {"device": self.device, "data": self.data, "last_data": self.last_data}
+
+    def restore_state(self, state: dict) -> None:
+
+        if state.get("device") != self.device or not state.get("data") :
+            return
+
+        self.data      = state["data"]
+        self.last_data = state.get("last_data") or {}
+
+        self.update_stats()
+
     #
-    #
+    # Exported values (see metrics_exporter.py)
     #
 
-    def bw_stat(self, name, units, label) :
+    def metric_labels(self) -> dict:
+        return {"device": self.device}
 
-        value = 0.0
-        scale = ""
-        
-        value, scale = self.calc_bw(name)
-        
-        label.set_value(float(value))
-        label.set_units(f" {scale}{units}")
+    def metrics(self) -> dict:
 
-        
-    def read_stats(self, name) :
-                
-        with open("/proc/net/dev", "r") as f :
-            lines = f.readlines()
-        
-        if len(lines) > 2 :
-            for line in lines[2:]:
-                stats = self.parse_line(line)
-                if stats['name'] == self.device :
-                    self.last_data = self.data
-                    self.data = stats
-                    self.update_stats()
-                    
+        result = {}
 
-    def update_stats(self) :
+        for name, multiplier, units, metric in _RATES :
+            rate = self.model.get(f"{name}_rate")
+            if rate is not None :
+                result[metric] = rate
 
-        logger.info(f"Stats : {self.data}")
-        
-        self.host_dev.set_value(self.data['name'])        
+        for name in _COUNTER_METRICS :
+            if name in self.data :
+                result[f"netdev_{name}_total"] = self.data[name]
 
-        self.bw_stat('tx_bytes',     "bps", self.tx_bps)        
-        self.bw_stat('rx_bytes',     "bps", self.rx_bps)        
-        self.bw_stat('rx_multicast', "bps", self.rx_mcs)
-        
-        self.bw_stat('tx_packets', "pps", self.tx_pps)               
-        self.bw_stat('rx_packets', "pps", self.rx_pps) 
-        
-        #self.rx_bps.set_value(self.calc_bw('rx_bytes'))
-        #self.rx_pps.set_value(self.data['rx_packets'])
-        self.rx_errs.set_value(self.data['rx_errors'])
-        self.rx_drop.set_value(self.data['rx_dropped'])
-        self.rx_fifo.set_value(self.data['rx_fifo'])
-        self.rx_fram.set_value(self.data['rx_frame'])        
-        
-        #self.tx_bps.set_value(self.data['tx_bytes'])
-        #self.tx_pps.set_value(self.data['tx_packets'])
-        self.tx_errs.set_value(self.data['tx_errors'])
-        self.tx_drop.set_value(self.data['tx_dropped'])
-        self.tx_fifo.set_value(self.data['tx_fifo'])        
+        return result
 
-        
     def parse_line(self, line:str) :
                 
         line = line.strip()
         parts = line.split()
         parts[0] = parts[0].replace(":", "")
     
-        keys = ["name",
-                "rx_bytes",  "rx_packets",    "rx_errors",     "rx_dropped",
-                "rx_fifo",   "rx_frame",      "rx_compressed", "rx_multicast",
-                "tx_bytes",  "tx_packets",    "tx_errors",     "tx_dropped",
-                "tx_fifo",   "tx_collisions", "tx_carrier",    "tx_compressed"]
+        keys = ("name",) + procfs.NET_DEV_FIELDS
 
         # Ensure data is integers and not strings.
         
@@ -0,0 +1,385 @@
+import re
+import time
+import fcntl
+import ctypes
+import socket
+import struct
+import curses
+import logging
+
+from typing import List, Optional
+
+from pytlm import Widget
+from pytlm import cm
+
+from netdev_widget import counter_rates
+from units import unit_format
+
+import procfs
+
+logger = logging.getLogger("NicQueues")
+
+# ----------------------------------------------------------------------
+# EthtoolStats - all driver counters of a NIC with one ioctl
+# ----------------------------------------------------------------------
+#
+# Per queue packet/byte counters are only exported through the driver
+# statistics ("ethtool -S").  The names are read once (ETHTOOL_GSTRINGS),
+# after that a sample is a single ETHTOOL_GSTATS ioctl into a reused
+# buffer, whatever the number of queues.
+#
+
+SIOCETHTOOL      = 0x8946
+
+ETHTOOL_GDRVINFO = 0x03
+ETHTOOL_GSTRINGS = 0x1b
+ETHTOOL_GSTATS   = 0x1d
+
+ETH_SS_STATS     = 1
+ETH_GSTRING_LEN  = 32
+
+# struct ethtool_drvinfo : cmd + 5 * char[32] + reserved2[12] + n_priv_flags
+_DRVINFO_SIZE    = 196
+_DRVINFO_N_STATS = 180
+
+#
+#  Per queue counter names of the common drivers :
+#
+#    rx_queue_0_packets (virtio, ixgbe), rx-0.packets (i40e, ice),
+#    rx0_packets (mlx5), tx_queue_3_bytes ...
+#
+
+_QUEUE_STAT = re.compile(r"^(rx|tx)[-_]?(?:queue[-_])?(\d+)[._](packets|bytes)$")
+
+
+class EthtoolStats:
+
+    def __init__(self, device: str) :
+
+        self.device = device
+        self.sock   = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+        self.names: List[str] = []
+        self.buffer = None
+
+        try :
+            self.names  = self.read_names()
+            self.buffer = ctypes.create_string_buffer(8 + 8 * len(self.names))
+        except OSError as e :
+            logger.warning("No driver statistics for %s : %s", device, e)
+
+    def ioctl(self, buffer) -> None:
+        ifreq = struct.pack("16sP", self.device.encode(), ctypes.addressof(buffer))
+        fcntl.ioctl(self.sock, SIOCETHTOOL, ifreq)
+
+    def read_names(self) -> List[str]:
+
+        info = ctypes.create_string_buffer(_DRVINFO_SIZE)
+        struct.pack_into("I", info, 0, ETHTOOL_GDRVINFO)
+        self.ioctl(info)
+
+        count = struct.unpack_from("I", info, _DRVINFO_N_STATS)[0]
+
+        strings = ctypes.create_string_buffer(12 + ETH_GSTRING_LEN * count)
+        struct.pack_into("III", strings, 0, ETHTOOL_GSTRINGS, ETH_SS_STATS, count)
+        self.ioctl(strings)
+
+        raw = strings.raw[12:]
+
+        return [raw[i:i + ETH_GSTRING_LEN].split(b"\0", 1)[0].decode()
+                for i in range(0, len(raw), ETH_GSTRING_LEN)]
+
+    def read(self) -> tuple:
+
+        # All counters, in the order of self.names.
+
+        if self.buffer is None :
+            return ()
+
+        struct.pack_into("II", self.buffer, 0, ETHTOOL_GSTATS, len(self.names))
+        self.ioctl(self.buffer)
+
+        return struct.unpack_from(f"{len(self.names)}Q", self.buffer, 8)
+
+    def queue_index(self, direction: str, metric: str) -> List[int]:
+
+        # Positions in read() of the <direction> queue <metric> counters, by queue.
+
+        found = {}
+
+        for index, name in enumerate(self.names) :
+            match = _QUEUE_STAT.match(name)
+            if match and match.group(1) == direction and match.group(3) == metric :
+                found[int(match.group(2))] = index
+
+        return [found[q] for q in sorted(found)]
+
+    def close(self) -> None:
+        self.sock.close()
+
+# ----------------------------------------------------------------------
+# NicQueues - per queue and per CPU heat map
+# ----------------------------------------------------------------------
+#
+#    RX  ▁▁▂▁█▁▁▁▁▂▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁
+#    TX  ▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁▁
+#    CPU ▂▂▃▂█▂▂▂
+#    rx q4 812.3K pps  cpu4 1.2M pps  drop 0  squeeze 12
+#
+# One cell per queue / CPU, scaled against the busiest one, so hot queues
+# and softirq imbalance stand out.  A CPU cell turns red when it dropped
+# packets or ran out of budget (time_squeeze) in the interval.
+#
+# Each sample is one GSTATS ioctl plus one read of softnet_stat, and the
+# rates of all queues are computed together (counter_rates).  The cells
+# are built into runs of equal colour on the tick; paint only draws them.
+#
+
+_LEVELS = " ▁▂▃▄▅▆▇█"
+
+# softnet_stat counters are u32.
+_U32 = 0xffffffff
+
+
+class NicQueues(Widget):
+
+    def __init__(self, x: int, y: int, width: int, height: int = 4, **kwargs) :
+
+        super().__init__(x, y, width, height, **kwargs)
+
+        self.device   = kwargs.get("device",   "eth0")
+        self.interval = kwargs.get("interval", 1.0)
+        self.metric   = kwargs.get("metric",   "packets")      # packets, bytes
+        self.source   = kwargs.get("source",   None) or procfs.get_reader()
+        self.ethtool  = kwargs.get("ethtool",  None)
+        self.own_ethtool = self.ethtool is None     # closed by close()
+
+        self.label_fg   = kwargs.get("label_foreground", "cyan")
+        self.label_bg   = kwargs.get("label_background", "black")
+        self.label_att  = kwargs.get("label_attribute",  "normal")
+
+        self.warm_level = kwargs.get("warm_level", 0.5)
+        self.hot_level  = kwargs.get("hot_level",  0.8)
+
+        self.colors = None      # label, cool, warm, hot
+
+        self.last_tick     = 0.0
+        self.last_sample   = None       # (time, queue counters, softnet)
+
+        self.rx_rates: List[float] = []
+        self.tx_rates: List[float] = []
+        self.cpu_rates: List[float] = []
+        self.cpu_alerts: List[bool] = []
+        self.cpu_names: List[str] = []      # "cpu3", or "row3" without a cpu column
+
+        self.softnet_drops   = 0
+        self.softnet_squeeze = 0
+
+        self.rows = []                  # [(label, [(text, level), ...])]
+        self.summary = ""
+
+        self.rx_index: Optional[List[int]] = None       # set by open()
+        self.tx_index: Optional[List[int]] = None
+
+    def open(self) -> None:
+
+        if self.ethtool is None :
+            self.ethtool = EthtoolStats(self.device)
+
+        self.rx_index = self.ethtool.queue_index("rx", self.metric)
+        self.tx_index = self.ethtool.queue_index("tx", self.metric)
+
+    def close(self) -> None:
+
+        # The ioctl socket, when the widget opened it; the next tick opens it again.
+
+        if self.own_ethtool and self.ethtool is not None :
+            self.ethtool.close()
+            self.ethtool = None
+
+        self.rx_index = None
+        self.tx_index = None
+
+    def handle_tick(self) :
+
+        now = time.monotonic()
+
+        if now - self.last_tick < self.interval :
+            return
+
+        self.last_tick = now
+
+        if self.rx_index is None :
+            self.open()
+
+        try :
+            counters = self.ethtool.read()
+        except OSError as e :
+            logger.debug("GSTATS %s : %s", self.device, e)
+            counters = ()
+
+        try :
+            softnet = self.source.sample("/proc/net/softnet_stat")
+        except OSError :
+            softnet = ()
+
+        last = self.last_sample
+        self.last_sample = (now, counters, softnet)
+
+        if last is None :
+            return
+
+        elapsed = now - last[0]
+
+        self.sample_rates(elapsed, counters, last[1], softnet, last[2])
+        self.build_rows()
+        self.request_repaint()
+
+    def sample_rates(self, elapsed: float, counters, last_counters, softnet, last_softnet) -> None:
+
+        # Every queue in one pass, then pick the rx / tx positions.
+
+        if counters and len(counters) == len(last_counters) :
+            rates = counter_rates(counters, last_counters, elapsed)
+            self.rx_rates = [rates[i] for i in self.rx_index]
+            self.tx_rates = [rates[i] for i in self.tx_index]
+
+        if softnet and len(softnet) == len(last_softnet) :
+
+            # Masked, a u32 counter that wrapped still gives its increase.
+            deltas = [tuple((n - o) & _U32 for n, o in zip(new[:3], old[:3]))
+                      for new, old in zip(softnet, last_softnet)]
+
+            self.cpu_names = [f"cpu{row[3]}" if len(row) > 3 else f"row{index}"
+                              for index, row in enumerate(softnet)]
+
+            self.cpu_rates  = counter_rates([d[0] for d in deltas], [0] * len(deltas), elapsed)
+            self.cpu_alerts = [d[1] > 0 or d[2] > 0 for d in deltas]
+
+            self.softnet_drops   = sum(d[1] for d in deltas)
+            self.softnet_squeeze = sum(d[2] for d in deltas)
+
+    def cells(self, rates: List[float], alerts: Optional[List[bool]] = None) -> list:
+
+        # [(text, level)] runs of equal colour, level 0 cool, 1 warm, 2 hot.
+
+        peak = max(rates, default=0.0) or 1.0
+        top  = len(_LEVELS) - 1
+
+        runs = []
+
+        for index, rate in enumerate(rates) :
+
+            fraction = rate / peak
+            glyph    = _LEVELS[max(1, round(fraction * top))] if rate > 0 else _LEVELS[1]
+
+            if alerts and alerts[index] :
+                level = 2
+            elif fraction >= self.hot_level and len(rates) > 1 :
+                level = 2
+            elif fraction >= self.warm_level and len(rates) > 1 :
+                level = 1
+            else :
+                level = 0
+
+            if runs and runs[-1][1] == level :
+                runs[-1][0].append(glyph)
+            else :
+                runs.append(([glyph], level))
+
+        return [("".join(text), level) for text, level in runs]
+
+    def build_rows(self) -> None:
+
+        rows = []
+
+        if self.rx_rates :
+            rows.append(("RX  ", self.cells(self.rx_rates)))
+
+        if self.tx_rates :
+            rows.append(("TX  ", self.cells(self.tx_rates)))
+
+        if self.cpu_rates :
+            rows.append(("CPU ", self.cells(self.cpu_rates, self.cpu_alerts)))
+
+        self.rows = rows
+
+        rate  = unit_format("pps" if self.metric == "packets" else "B/s", precision=1)
+        parts = []
+
+        if self.rx_rates :
+            q = max(range(len(self.rx_rates)), key=self.rx_rates.__getitem__)
+            parts.append(f"rx q{q} {rate(self.rx_rates[q])}")
+
+        if self.cpu_rates :
+            c = max(range(len(self.cpu_rates)), key=self.cpu_rates.__getitem__)
+            parts.append(f"{self.cpu_names[c]} {unit_format('pps', precision=1)(self.cpu_rates[c])}")
+            parts.append(f"drop {self.softnet_drops}  squeeze {self.softnet_squeeze}")
+
+        self.summary = "  ".join(parts)
+
+    def metric_labels(self) -> dict:
+        return {"device": self.device}
+
+    def metrics(self) -> dict:
+
+        result = {}
+
+        if self.rx_rates :
+            result["nic_rx_queue_max"] = max(self.rx_rates)
+
+        if self.tx_rates :
+            result["nic_tx_queue_max"] = max(self.tx_rates)
+
+        if self.cpu_rates :
+            result["nic_softnet_max"] = max(self.cpu_rates)
+
+        return result
+
+    def paint(self, win) :
+
+        if self.colors is None :
+            self.colors = (cm(self.label_fg, self.label_bg, self.label_att),
+                           cm("green",  "black"),
+                           cm("yellow", "black"),
+                           cm("red",    "black"))
+
+        (label_color, *levels) = self.colors
+
+        # Wrap long rows, one screen line per (width - label) cells.
+
+        span = max(1, self.width - 4)
+        line = 0
+
+        try :
+
+            for label, runs in self.rows :
+
+                column = 0
+
+                win.addstr(self.y + line, self.x, label, label_color)
+
+                for text, level in runs :
+
+                    while text and line < self.height - 1 :
+
+                        if column == span :
+                            line  += 1
+                            column = 0
+                            win.addstr(self.y + line, self.x, "    ", label_color)
+
+                        chunk = text[:span - column]
+                        text  = text[len(chunk):]
+
+                        win.addstr(self.y + line, self.x + 4 + column, chunk, levels[level])
+                        column += len(chunk)
+
+                line += 1
+
+                if line >= self.height - 1 :
+                    break
+
+            win.addstr(self.y + self.height - 1, self.x, self.summary[:self.width].ljust(self.width), label_color)
+
+        except curses.error :
+            pass
@@ -0,0 +1,359 @@
+import time
+import curses
+import logging
+
+from typing import List, Optional
+
+from pytlm import Widget
+from pytlm import Window
+from pytlm import WindowManager
+from pytlm import Button
+from pytlm import StatusLabel
+from pytlm import cm
+
+logger = logging.getLogger("Popups")
+
+_ESCAPE = 27
+
+# ----------------------------------------------------------------------
+# Popup - a window shown above the others
+# ----------------------------------------------------------------------
+#
+# Popups are plain panels on top of the stack : opening one only paints
+# the popup itself, and closing it hides and drops its panel, after
+# which the panel library restores the area from the windows below.
+# Neither the windows underneath nor their widgets are repainted; only
+# the active marker of the previous window is redrawn.
+#
+
+class Popup(Window):
+
+    def __init__(self, x: int, y: int, width: int, height: int, **kwargs) :
+
+        super().__init__(x, y, width, height, **kwargs)
+
+        self.modal    = kwargs.get("modal",    False)
+        self.center   = kwargs.get("center",   True)
+        self.on_close = kwargs.get("on_close", lambda *_, **__: None)
+
+    def open(self, wm: WindowManager) -> "Popup":
+
+        if self.center :
+            self.x = max(0, (wm.width  - self.width)  // 2)
+            self.y = max(0, (wm.height - self.height) // 2)
+
+        wm.add_window(self)
+
+        if self.modal :
+            wm.push_modal(self)
+        else :
+            wm.set_active_window(self)
+
+        return self
+
+    def close(self) -> None:
+
+        wm = self.window_manager
+
+        if wm is not None :
+            wm.remove_window(self)
+            self.on_close(popup=self)
+
+    def handle_key(self, key: int) -> bool:
+
+        if key == _ESCAPE :
+            self.close()
+            return True
+
+        return super().handle_key(key)
+
+
+class MessageBox(Popup):
+
+    #
+    #  Modal message with a row of buttons; on_result(result=label) is
+    #  called with the label of the button chosen (None on escape).
+    #
+
+    def __init__(self, text: str, **kwargs) :
+
+        lines   = text.split("\n")
+        buttons = kwargs.get("buttons", ["OK"])
+
+        row   = sum(len(b) + 4 for b in buttons) + 1
+        width = max(row, max(len(l) for l in lines) + 4, len(kwargs.get("title", "")) + 6)
+
+        kwargs.setdefault("modal", True)
+
+        super().__init__(0, 0, width, len(lines) + 4, **kwargs)
+
+        for index, line in enumerate(lines) :
+            self.add_widget(StatusLabel(2, 1 + index, len(line), value=line))
+
+        self.on_result = kwargs.get("on_result", lambda *_, **__: None)
+        self.result    = None
+
+        x = (width - row) // 2 + 1
+
+        for label in buttons :
+            self.add_widget(Button(x, len(lines) + 2, len(label) + 2, text=label,
+                                   on_click=lambda label=label, **_: self.choose(label)))
+            x += len(label) + 4
+
+        self.next_focus()
+
+    def choose(self, label: Optional[str]) -> None:
+        self.result = label
+        self.close()
+        self.on_result(result=label)
+
+    def handle_key(self, key: int) -> bool:
+
+        if key == _ESCAPE :
+            self.choose(None)
+            return True
+
+        return super().handle_key(key)
+
+# ----------------------------------------------------------------------
+# PopupMenu
+# ----------------------------------------------------------------------
+
+class MenuList(Widget):
+
+    focusable = True
+
+    def __init__(self, x: int, y: int, width: int, height: int, items: list, **kwargs) :
+
+        super().__init__(x, y, width, height, **kwargs)
+
+        self.items    = items           # [(label, callback), ...]
+        self.selected = 0
+
+        self.normal_color   = None
+        self.selected_color = None
+
+        self.on_select = kwargs.get("on_select", lambda *_, **__: None)
+
+    def handle_key(self, key: int) -> bool:
+
+        count = len(self.items)
+
+        if key == curses.KEY_UP :
+            self.selected = (self.selected - 1) % count
+        elif key == curses.KEY_DOWN :
+            self.selected = (self.selected + 1) % count
+        elif key in (curses.KEY_ENTER, ord('\n'), ord(' ')) :
+            self.on_select(index=self.selected)
+            return True
+        else :
+            return False
+
+        self.request_repaint()
+        return True
+
+    def handle_mouse(self, x: int, y: int, button: int) -> bool:
+
+        index = y - self.y
+
+        if 0 <= index < len(self.items) and button & (curses.BUTTON1_CLICKED | curses.BUTTON1_RELEASED) :
+            self.selected = index
+            self.on_select(index=index)
+            return True
+
+        return False
+
+    def paint(self, win) :
+
+        if self.normal_color is None :
+            self.normal_color   = cm("default", "default", "default")
+            self.selected_color = cm("default", "default", "reverse")
+
+        try :
+            for index, (label, _) in enumerate(self.items[:self.height]) :
+                style = self.selected_color if index == self.selected else self.normal_color
+                win.addstr(self.y + index, self.x, f" {label}".ljust(self.width), style)
+        except curses.error :
+            pass
+
+
+class PopupMenu(Popup):
+
+    #
+    #  items : [(label, callback), ...], the callback is called with
+    #  item=label once the menu has closed.
+    #
+
+    def __init__(self, x: int, y: int, items: list, **kwargs) :
+
+        width = max(len(label) for label, _ in items) + 4
+
+        kwargs.setdefault("center", False)
+
+        super().__init__(x, y, width, len(items) + 2, **kwargs)
+
+        self.items = items
+        self.menu  = self.add_widget(MenuList(1, 1, width - 2, len(items), items,
+                                              on_select=self.select))
+        self.set_focus(self.menu)
+
+    def select(self, index: int) -> None:
+
+        (label, callback) = self.items[index]
+
+        self.close()
+
+        if callback is not None :
+            callback(item=label)
+
+# ----------------------------------------------------------------------
+# Notifications
+# ----------------------------------------------------------------------
+#
+# Toasts stack in the top right corner and expire after timeout.  At
+# most rate new toasts are shown per second; the rest wait in a queue
+# where repeats of the same key (by default the text) are coalesced into
+# one toast with a count, and past max_pending the oldest waiting alerts
+# are folded into a single "N more" summary, so a storm of alerts turns
+# into a handful of panels.
+#
+
+_LEVEL_COLORS = {"info": "cyan", "warning": "yellow", "error": "red"}
+
+_OVERFLOW = "\0overflow"
+
+
+class Toast(Window):
+
+    def __init__(self, x: int, y: int, width: int, key: str, text: str, level: str, count: int) :
+
+        super().__init__(x, y, width, 3, border_foreground=_LEVEL_COLORS.get(level, "default"))
+
+        self.key     = key
+        self.count   = count
+        self.expires = 0.0
+
+        self.label   = self.add_widget(StatusLabel(1, 1, width - 2, value=""))
+
+        self.update(text, count)
+
+    def update(self, text: str, count: int) -> None:
+
+        self.count = count
+
+        if count > 1 :
+            text = f"{text} (x{count})"
+
+        self.label.set_value(text[:self.width - 2])
+
+
+class NotificationQueue:
+
+    def __init__(self, wm: WindowManager, **kwargs) :
+
+        #
+        #  kwargs :
+        #
+        #    width         toast width (default: 40)
+        #    timeout       seconds a toast stays up (default: 5.0)
+        #    rate          new toasts per second (default: 2)
+        #    max_visible   toasts on screen (default: 5)
+        #    max_pending   alerts kept waiting before folding (default: 50)
+        #
+
+        self.wm          = wm
+
+        self.width       = kwargs.get("width",       40)
+        self.timeout     = kwargs.get("timeout",     5.0)
+        self.rate        = kwargs.get("rate",        2)
+        self.max_visible = kwargs.get("max_visible", 5)
+        self.max_pending = kwargs.get("max_pending", 50)
+
+        self.pending = {}           # key -> [text, level, count], in arrival order
+        self.visible: List[Toast] = []
+
+        self.tokens    = float(self.rate)
+        self.last_tick = time.monotonic()
+
+        wm.add_tick_handler(self.handle_tick)
+
+    def notify(self, text: str, level: str = "info", key: Optional[str] = None) -> None:
+
+        key = key or text
+
+        # Already on screen : bump the count and keep it up longer.
+
+        for toast in self.visible :
+            if toast.key == key :
+                toast.update(text, toast.count + 1)
+                toast.expires = time.monotonic() + self.timeout
+                return
+
+        entry = self.pending.get(key)
+
+        if entry is not None :
+            entry[0]  = text
+            entry[2] += 1
+            return
+
+        self.pending[key] = [text, level, 1]
+
+        if len(self.pending) > self.max_pending :
+            self.fold()
+
+    def fold(self) -> None:
+
+        # The oldest waiting alerts into one summary, first in line.
+
+        folded = self.pending.pop(_OVERFLOW, [None, None, 0])[2]
+
+        while len(self.pending) >= self.max_pending :
+            folded += self.pending.pop(next(iter(self.pending)))[2]
+
+        self.pending = {_OVERFLOW: [f"{folded} more alerts", "warning", folded], **self.pending}
+
+    def handle_tick(self) -> None:
+
+        now = time.monotonic()
+
+        self.tokens    = min(float(self.rate), self.tokens + (now - self.last_tick) * self.rate)
+        self.last_tick = now
+
+        changed = False
+
+        for toast in [t for t in self.visible if t.expires <= now] :
+            self.visible.remove(toast)
+            self.wm.remove_window(toast)
+            changed = True
+
+        while self.pending and self.tokens >= 1 and len(self.visible) < self.max_visible :
+
+            key = next(iter(self.pending))
+            (text, level, count) = self.pending.pop(key)
+
+            if key == _OVERFLOW :
+                count = 1
+
+            toast = Toast(0, 0, self.width, key, text, level, count)
+            toast.expires = now + self.timeout
+
+            self.visible.append(toast)
+
+            # Toasts never take the focus from the window in use.
+            self.wm.add_window(toast, activate=False)
+
+            self.tokens -= 1
+            changed = True
+
+        if changed :
+            self.restack()
+
+    def restack(self) -> None:
+
+        # Newest on top; moving a panel does not repaint it.
+
+        x = max(0, self.wm.width - self.width - 1)
+
+        for index, toast in enumerate(reversed(self.visible)) :
+            toast.move(x, 1 + index * 3)
+            toast.panel.top()
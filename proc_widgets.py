@@ -0,0 +1,240 @@
+import time
+import operator
+import logging
+
+from typing import Optional
+
+from pytlm import StatusLabel
+from pytlm import ProgressBar
+
+from units import unit_format
+
+import procfs
+
+logger = logging.getLogger("ProcWidgets")
+
+# ----------------------------------------------------------------------
+# ProcSampler - interval and delta bookkeeping for /proc based widgets
+# ----------------------------------------------------------------------
+#
+# All the widgets read through one procfs.ProcReader (the shared one by
+# default, pass source= to use another), so any number of them sampling
+# the same file in a tick cost one read and one parse.
+#
+
+class ProcSampler:
+
+    def init_sampler(self, kwargs: dict) -> None:
+
+        self.source      = kwargs.get("source",   None) or procfs.get_reader()
+        self.interval    = kwargs.get("interval", 1.0)
+
+        self.last_tick   = 0.0
+        self.last_sample = None     # (time, counters)
+
+    def due(self) -> bool:
+
+        now = time.monotonic()
+
+        if now - self.last_tick >= self.interval :
+            self.last_tick = now
+            return True
+
+        return False
+
+    def sample(self, path: str) :
+
+        try :
+            return self.source.sample(path)
+        except OSError as e :
+            logger.debug("Cannot read %s : %s", path, e)
+            return None
+
+    def delta(self, counters) -> Optional[tuple]:
+
+        #
+        #  (elapsed seconds, counter differences) since the previous call,
+        #  None on the first one.  counters is an int or a tuple of ints.
+        #
+
+        now  = time.monotonic()
+        last = self.last_sample
+
+        self.last_sample = (now, counters)
+
+        if last is None or now <= last[0] :
+            return None
+
+        if isinstance(counters, tuple) :
+            return (now - last[0], tuple(map(operator.sub, counters, last[1])))
+
+        return (now - last[0], counters - last[1])
+
+# ----------------------------------------------------------------------
+# CPU and memory usage bars
+# ----------------------------------------------------------------------
+
+class CpuUsage(ProgressBar, ProcSampler):
+
+    def __init__(self, x: int, y: int, width: int, **kwargs) :
+
+        super().__init__(x, y, width, **kwargs)
+
+        self.init_sampler(kwargs)
+
+        self.cpu = kwargs.get("cpu", "cpu")     # cpu (all), cpu0, cpu1...
+
+    def handle_tick(self) :
+
+        if not self.due() :
+            return
+
+        stats = self.sample("/proc/stat")
+
+        if stats is None or self.cpu not in stats :
+            return
+
+        # guest time is already part of user time, CPU_FIELDS[:8] only.
+        result = self.delta(stats[self.cpu][:8])
+
+        if result is not None :
+
+            counters = result[1]
+            total    = sum(counters)
+            idle     = counters[3] + counters[4]
+
+            if total > 0 :
+                self.set_value(100.0 * (total - idle) / total)
+
+
+class MemoryUsage(ProgressBar, ProcSampler):
+
+    def __init__(self, x: int, y: int, width: int, **kwargs) :
+
+        super().__init__(x, y, width, **kwargs)
+
+        self.init_sampler(kwargs)
+
+    def handle_tick(self) :
+
+        if not self.due() :
+            return
+
+        info = self.sample("/proc/meminfo")
+
+        if info :
+
+            total     = info.get("MemTotal", 0)
+            available = info.get("MemAvailable", info.get("MemFree", 0))
+
+            if total > 0 :
+                self.set_value(100.0 * (total - available) / total)
+
+# ----------------------------------------------------------------------
+# Disk and interface counters
+# ----------------------------------------------------------------------
+
+class DiskRate(StatusLabel, ProcSampler):
+
+    #
+    #  Bytes per second / divisor in fixed units (MB/s by default), or
+    #  with humanize = True in B/s, KB/s, MB/s, ...  A threshold is then
+    #  compared with the number shown, whatever its prefix.
+    #
+
+    def __init__(self, x: int, y: int, width: int, **kwargs) :
+
+        kwargs.setdefault("units", "  B/s" if kwargs.get("humanize") else " MB/s")
+        kwargs.setdefault("format", ">6.2f")
+
+        super().__init__(x, y, width, **kwargs)
+
+        self.init_sampler(kwargs)
+
+        self.device    = kwargs.get("device",    "sda")
+        self.direction = kwargs.get("direction", "read")       # read, write
+        self.divisor   = kwargs.get("divisor",   1000000.0)
+        self.humanize  = kwargs.get("humanize",  False)
+
+        self.field     = procfs.DISK_FIELDS.index(f"{self.direction}_sectors")
+
+        self.unit_format = unit_format("B/s") if self.humanize else None
+        self.bytes_rate  = 0.0
+
+    def handle_tick(self) :
+
+        if not self.due() :
+            return
+
+        disks = self.sample("/proc/diskstats")
+
+        if disks is None or self.device not in disks :
+            return
+
+        result = self.delta(disks[self.device][self.field])
+
+        if result is not None :
+
+            (elapsed, sectors) = result
+
+            rate = self.bytes_rate = sectors * 512 / elapsed
+
+            if self.unit_format is None :
+                self.set_value(rate / self.divisor)
+            else :
+                (value, units) = self.unit_format.split(rate)
+                self.set_units(units)
+                self.set_value(value)
+
+    def metric_labels(self) -> dict:
+        return {"device": self.device, "direction": self.direction}
+
+    def metrics(self) -> dict:
+
+        # Unscaled, the label value depends on the prefix shown.
+        return {"disk_bytes_rate": self.bytes_rate}
+
+
+class InterfaceCounter(StatusLabel, ProcSampler):
+
+    #
+    #  One /sys/class/net/<device>/statistics/<counter>, as a total or
+    #  (rate = True) per second.
+    #
+
+    def __init__(self, x: int, y: int, width: int, **kwargs) :
+
+        kwargs.setdefault("format", ">6")
+        kwargs.setdefault("value",  0)
+
+        super().__init__(x, y, width, **kwargs)
+
+        self.init_sampler(kwargs)
+
+        self.device  = kwargs.get("device",  "eth0")
+        self.counter = kwargs.get("counter", "rx_dropped")
+        self.rate    = kwargs.get("rate",    False)
+
+        self.path    = f"/sys/class/net/{self.device}/statistics/{self.counter}"
+
+    def handle_tick(self) :
+
+        if not self.due() :
+            return
+
+        value = self.sample(self.path)
+
+        if value is None :
+            return
+
+        if not self.rate :
+            self.set_value(value)
+            return
+
+        result = self.delta(value)
+
+        if result is not None :
+            self.set_value(result[1] / result[0])
+
+    def metric_labels(self) -> dict:
+        return {"device": self.device, "counter": self.counter}
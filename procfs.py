@@ -0,0 +1,258 @@
+import os
+import time
+import fnmatch
+import threading
+
+from typing import Any, Callable, Optional
+
+# ----------------------------------------------------------------------
+# Shared /proc and /sys reader
+# ----------------------------------------------------------------------
+#
+# Files are opened once and kept open; each sample rereads them from
+# offset 0 with os.preadv() into one preallocated buffer (procfs and
+# sysfs regenerate the content on a read at offset 0).  The parsed result
+# is kept for max_age seconds, so every widget that shows a part of
+# /proc/net/dev within the same tick shares one read and one parse.
+#
+# Parsers turn the raw bytes into tuples of ints keyed by the first
+# column, no per line dicts are built.
+#
+
+#
+#  Field names of the parsed tuples.
+#
+
+NET_DEV_FIELDS = ("rx_bytes",  "rx_packets",    "rx_errors",     "rx_dropped",
+                  "rx_fifo",   "rx_frame",      "rx_compressed", "rx_multicast",
+                  "tx_bytes",  "tx_packets",    "tx_errors",     "tx_dropped",
+                  "tx_fifo",   "tx_collisions", "tx_carrier",    "tx_compressed")
+
+CPU_FIELDS      = ("user", "nice", "system", "idle", "iowait",
+                   "irq", "softirq", "steal", "guest", "guest_nice")
+
+DISK_FIELDS     = ("reads",  "reads_merged",  "read_sectors",  "read_ms",
+                   "writes", "writes_merged", "write_sectors", "write_ms",
+                   "in_flight", "io_ms", "weighted_io_ms")
+
+SOFTNET_FIELDS  = ("processed", "dropped", "time_squeeze", "cpu")
+
+
+def parse_net_dev(data: bytes) -> dict:
+
+    # name -> NET_DEV_FIELDS, the two header lines are skipped.
+
+    result = {}
+
+    for line in data.splitlines()[2:] :
+        (name, _, counters) = line.partition(b":")
+        result[name.strip().decode()] = tuple(map(int, counters.split()))
+
+    return result
+
+
+def parse_stat(data: bytes) -> dict:
+
+    # "cpu", "cpu0", ... -> CPU_FIELDS (the other lines are ignored).
+
+    result = {}
+
+    for line in data.splitlines() :
+        if line.startswith(b"cpu") :
+            parts = line.split()
+            result[parts[0].decode()] = tuple(map(int, parts[1:]))
+
+    return result
+
+
+def parse_meminfo(data: bytes) -> dict:
+
+    # "MemTotal", ... -> value in kB (or pages / count when unitless).
+
+    result = {}
+
+    for line in data.splitlines() :
+        (name, _, value) = line.partition(b":")
+        result[name.decode()] = int(value.split()[0])
+
+    return result
+
+
+def parse_diskstats(data: bytes) -> dict:
+
+    # device -> DISK_FIELDS (and the discard/flush fields of newer kernels).
+
+    result = {}
+
+    for line in data.splitlines() :
+        parts = line.split()
+        result[parts[2].decode()] = tuple(map(int, parts[3:]))
+
+    return result
+
+
+def parse_softnet_stat(data: bytes) -> tuple:
+
+    # One SOFTNET_FIELDS tuple per online CPU (hex columns).  The CPU
+    # number is the 13th column (Linux 5.10+); older kernels give only
+    # three fields, and the rows skip offline CPUs.
+
+    rows = []
+
+    for line in data.splitlines() :
+        columns = line.split()
+        rows.append(tuple(int(v, 16) for v in columns[:3] + columns[12:13]))
+
+    return tuple(rows)
+
+
+def parse_int(data: bytes) -> int:
+    return int(data)
+
+#
+#  Parser registry, exact paths first, then fnmatch patterns in the
+#  order they were registered.  A pattern "*" also matches "/", so only
+#  register patterns under which every file has the parser's format.
+#
+
+_PARSERS: dict[str, Callable[[bytes], Any]] = {}
+_PATTERNS: list[tuple[str, Callable[[bytes], Any]]] = []
+
+
+def register_parser(path: str, parser: Callable[[bytes], Any]) -> None:
+
+    if any(c in path for c in "*?[") :
+        _PATTERNS.append((path, parser))
+    else :
+        _PARSERS[path] = parser
+
+
+def find_parser(path: str) -> Optional[Callable[[bytes], Any]]:
+
+    parser = _PARSERS.get(path)
+
+    if parser is None :
+        for pattern, candidate in _PATTERNS :
+            if fnmatch.fnmatchcase(path, pattern) :
+                return candidate
+
+    return parser
+
+
+register_parser("/proc/net/dev",                   parse_net_dev)
+register_parser("/proc/stat",                      parse_stat)
+register_parser("/proc/meminfo",                   parse_meminfo)
+register_parser("/proc/diskstats",                 parse_diskstats)
+register_parser("/proc/net/softnet_stat",          parse_softnet_stat)
+register_parser("/sys/class/net/*/statistics/*",   parse_int)
+
+
+class ProcReader:
+
+    def __init__(self, **kwargs) :
+
+        #
+        #  kwargs :
+        #
+        #    bufsize   initial read buffer size (default: 64 KiB, grows)
+        #    max_age   seconds a parsed sample is reused (default: 0.05)
+        #
+
+        self.max_age = kwargs.get("max_age", 0.05)
+
+        self.buffer  = bytearray(kwargs.get("bufsize", 65536))
+        self.fds     = {}           # path -> fd
+        self.samples = {}           # path -> (time, parsed)
+
+        self.lock    = threading.Lock()
+
+    def _fd(self, path: str) -> int:
+
+        fd = self.fds.get(path)
+
+        if fd is None :
+            fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+            self.fds[path] = fd
+
+        return fd
+
+    def read(self, path: str) -> bytes:
+
+        with self.lock :
+
+            fd = self._fd(path)
+
+            while True :
+
+                try :
+                    size = os.preadv(fd, [self.buffer], 0)
+                except OSError :
+                    # Device gone (or fd stale), reopen on the next read.
+                    self.close(path)
+                    raise
+
+                # A full buffer may mean a truncated read, grow and retry.
+                if size < len(self.buffer) :
+                    return bytes(memoryview(self.buffer)[:size])
+
+                self.buffer = bytearray(len(self.buffer) * 2)
+
+    def sample(self, path: str, parser: Optional[Callable[[bytes], Any]] = None) :
+
+        #
+        #  Parsed content of path, shared by all callers within max_age.
+        #
+
+        now   = time.monotonic()
+        entry = self.samples.get(path)
+
+        if entry is not None and now - entry[0] < self.max_age :
+            return entry[1]
+
+        if parser is None :
+            parser = find_parser(path)
+
+        data   = self.read(path)
+        parsed = parser(data) if parser is not None else data
+
+        self.samples[path] = (now, parsed)
+
+        return parsed
+
+    def sample_time(self, path: str) -> float:
+
+        # time.monotonic() of the last sample of path (0.0 if none).
+
+        entry = self.samples.get(path)
+
+        return entry[0] if entry is not None else 0.0
+
+    def close(self, path: Optional[str] = None) -> None:
+
+        paths = [path] if path is not None else list(self.fds)
+
+        for p in paths :
+
+            fd = self.fds.pop(p, None)
+            self.samples.pop(p, None)
+
+            if fd is not None :
+                try :
+                    os.close(fd)
+                except OSError :
+                    pass
+
+
+_reader: Optional[ProcReader] = None
+
+
+def get_reader() -> ProcReader:
+
+    # The process wide reader shared by the widgets.
+
+    global _reader
+
+    if _reader is None :
+        _reader = ProcReader()
+
+    return _reader
@@ -1,18 +1,43 @@
 #!/usr/bin/env python3
 
+import os
 import curses
 import curses.panel
+import functools
+import heapq
+import locale
+import operator
 import time
 import threading
+import logging
+from collections import deque
 from typing import List, Optional, Callable, Any
 
 
+logger = logging.getLogger("pytlm")
+
+# Reference point for the time-to-first-frame report.
+_START_TIME = time.monotonic()
+
+# Frames of waiting worth one step of paint priority, see paint_windows.
+_PAINT_AGING = 30
+
 # ----------------------------------------------------------------------
 # Lazy colour manager
 # ----------------------------------------------------------------------
 
     
-_COLOR_MAP = {
+#
+# The maps are filled on first use, importing the module does not touch
+# curses at all.
+#
+
+_COLOR_MAP: dict[str, int] = {}
+_ATTR_MAP:  dict[str, int] = {}
+
+def _init_maps() -> None:
+
+    _COLOR_MAP.update({
         "black":          curses.COLOR_BLACK,
         "red":            curses.COLOR_RED,
         "green":          curses.COLOR_GREEN,
@@ -32,9 +57,9 @@ _COLOR_MAP = {
         "default":        -1,
         "gray":           curses.COLOR_BLACK,
         "grey":           curses.COLOR_BLACK,
-    }
+    })
 
-_ATTR_MAP = {
+    _ATTR_MAP.update({
         "bold":       curses.A_BOLD,
         "underline":  curses.A_UNDERLINE,
         "reverse":    curses.A_REVERSE,
@@ -44,12 +69,76 @@ _ATTR_MAP = {
         "standout":   curses.A_STANDOUT,
         "normal":     curses.A_NORMAL,
         "default":    curses.A_NORMAL
-    }
+    })
+
+# ----------------------------------------------------------------------
+# Backend - where windows, panels and colour pairs live
+# ----------------------------------------------------------------------
+#
+# Everything pytlm asks of curses beyond drawing on a window goes through
+# the backend, the terminal by default.  headless.MemoryBackend stands in
+# for it to run the widget tree without a terminal (see daemon.py).
+#
+
+class CursesBackend:
+
+    # ACS glyphs are available (after initscr) for borders.
+    acs = True
+
+    def newwin(self, height: int, width: int, y: int, x: int) :
+        return curses.newwin(height, width, y, x)
+
+    def new_panel(self, win) :
+        return curses.panel.new_panel(win)
+
+    def bottom_panel(self) :
+        return curses.panel.bottom_panel()
+
+    def top_panel(self) :
+        return curses.panel.top_panel()
+
+    def update_panels(self) -> None:
+        curses.panel.update_panels()
+
+    def doupdate(self) -> None:
+        curses.doupdate()
+
+    def init_pair(self, pair: int, fg: int, bg: int) -> None:
+        curses.init_pair(pair, fg, bg)
+
+    def color_pair(self, pair: int) -> int:
+        return curses.color_pair(pair)
+
+    def getmouse(self) -> tuple:
+        return curses.getmouse()
+
+    def mousemask(self, mask: int) -> None:
+        curses.mousemask(mask)
+        curses.mouseinterval(0)
+
+    def curs_set(self, visibility: int) -> None:
+        curses.curs_set(visibility)
+
+_backend = CursesBackend()
+
+def get_backend() :
+    return _backend
+
+def set_backend(backend) -> None:
+
+    # Before any window is created; colour pairs start over.
+    global _backend
+
+    _backend = backend
+    _color_pairs.clear()
 
 _color_pairs: dict[tuple[int, int, int], int] = {}    
 
 def cm(fg: str = "default", bg: str = "default", att: str = "default") -> int:
 
+    if not _COLOR_MAP :
+        _init_maps()
+
     fore = _COLOR_MAP[fg]
     back = _COLOR_MAP[bg]
     attr = _ATTR_MAP[att]
@@ -59,69 +148,825 @@ def cm(fg: str = "default", bg: str = "default", att: str = "default") -> int:
     if key not in _color_pairs:
 
         idx = len(_color_pairs) + 1
-        curses.init_pair(idx, fore, back)
-        _color_pairs[key] = curses.color_pair(idx) | attr
+        _backend.init_pair(idx, fore, back)
+        _color_pairs[key] = _backend.color_pair(idx) | attr
 
     return _color_pairs[key]
 
-# ----------------------------------------------------------------------
-# Base Widget
-# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# DrawContext - offset and clipped drawing on a curses window
+# ----------------------------------------------------------------------
+#
+# Widgets paint with their own (parent relative) coordinates; the
+# context translates them into the backing curses window and clips the
+# output at the bounds of the context.  Containers derive a context for
+# their children, so nested containers paint without touching the
+# child geometry.
+#
+
+class DrawContext:
+
+    def __init__(self, win, x: int = 0, y: int = 0,
+                 width: Optional[int] = None, height: Optional[int] = None, clip=None):
+
+        if width is None or height is None :
+            (max_y, max_x) = win.getmaxyx()
+            width  = max_x if width  is None else width
+            height = max_y if height is None else height
+
+        self.win    = win
+        self.x      = x           # origin, in backing window coordinates
+        self.y      = y
+        self.width  = width
+        self.height = height
+
+        # Clip rectangle (x0, y0, x1, y1), in backing window coordinates.
+        if clip is None :
+            clip = (x, y, x + width, y + height)
+
+        self.clip = clip
+
+    def derive(self, x: int, y: int, width: int, height: int) -> "DrawContext":
+
+        ox = self.x + x
+        oy = self.y + y
+
+        (cx0, cy0, cx1, cy1) = self.clip
+
+        clip = (max(cx0, ox), max(cy0, oy), min(cx1, ox + width), min(cy1, oy + height))
+
+        return DrawContext(self.win, ox, oy, width, height, clip)
+
+    def getmaxyx(self) -> tuple[int, int]:
+        return (self.height, self.width)
+
+    def addstr(self, y: int, x: int, text: str, attr: Optional[int] = None) -> None:
+
+        (cx0, cy0, cx1, cy1) = self.clip
+
+        ay = self.y + y
+        if ay < cy0 or ay >= cy1 :
+            return
+
+        ax = self.x + x
+        if ax < cx0 :
+            text = text[cx0 - ax:]
+            ax   = cx0
+
+        room = cx1 - ax
+        if room <= 0 or not text :
+            return
+
+        if len(text) > room :
+            text = text[:room]
+
+        if attr is None :
+            self.win.addstr(ay, ax, text)
+        else :
+            self.win.addstr(ay, ax, text, attr)
+
+    def addnstr(self, y: int, x: int, text: str, n: int, attr: Optional[int] = None) -> None:
+        self.addstr(y, x, text[:n], attr)
+
+    def addch(self, y: int, x: int, ch, attr: Optional[int] = None) -> None:
+
+        (cx0, cy0, cx1, cy1) = self.clip
+
+        ay = self.y + y
+        ax = self.x + x
+
+        if cx0 <= ax < cx1 and cy0 <= ay < cy1 :
+            if attr is None :
+                self.win.addch(ay, ax, ch)
+            else :
+                self.win.addch(ay, ax, ch, attr)
+
+    def hline(self, y: int, x: int, ch, n: int, attr: int = 0) -> None:
+
+        (cx0, cy0, cx1, cy1) = self.clip
+
+        ay = self.y + y
+        if ay < cy0 or ay >= cy1 :
+            return
+
+        ax = self.x + x
+        if ax < cx0 :
+            n -= cx0 - ax
+            ax = cx0
+
+        n = min(n, cx1 - ax)
+
+        if n > 0 :
+            self.win.hline(ay, ax, ch, n, attr)
+
+    def vline(self, y: int, x: int, ch, n: int, attr: int = 0) -> None:
+
+        (cx0, cy0, cx1, cy1) = self.clip
+
+        ax = self.x + x
+        if ax < cx0 or ax >= cx1 :
+            return
+
+        ay = self.y + y
+        if ay < cy0 :
+            n -= cy0 - ay
+            ay = cy0
+
+        n = min(n, cy1 - ay)
+
+        if n > 0 :
+            self.win.vline(ay, ax, ch, n, attr)
+
+    def attron(self, attr: int) -> None:
+        self.win.attron(attr)
+
+    def attroff(self, attr: int) -> None:
+        self.win.attroff(attr)
+
+    def attrset(self, attr: int) -> None:
+        self.win.attrset(attr)
+
+# ----------------------------------------------------------------------
+# Border primitives
+# ----------------------------------------------------------------------
+#
+# Borders are drawn from strings built once per style and width: the top
+# and bottom rows are one addstr each, the sides one vline each when the
+# side glyph exists in the alternate character set (single, rounded,
+# solid), or one addstr per row otherwise (double, heavy).  The Unicode
+# sets are only used on UTF-8 terminals, others get the ACS single border
+# whatever the style.
+#
+
+#                tl   tr   bl   br   h    v
+_BORDER_SETS = {
+    "single":  ("┌", "┐", "└", "┘", "─", "│"),
+    "rounded": ("╭", "╮", "╰", "╯", "─", "│"),
+    "double":  ("╔", "╗", "╚", "╝", "═", "║"),
+    "heavy":   ("┏", "┓", "┗", "┛", "━", "┃"),
+    "solid":   ("█", "█", "█", "█", "█", "█"),
+}
+
+_BORDER_ACS_SIDES = {"single": "ACS_VLINE", "rounded": "ACS_VLINE", "solid": "ACS_BLOCK"}
+
+_unicode_borders: Optional[bool] = None
+
+def unicode_borders() -> bool:
+
+    global _unicode_borders
+
+    if _unicode_borders is None :
+        try :
+            codeset = locale.nl_langinfo(locale.CODESET)
+        except (AttributeError, ValueError) :
+            codeset = ""
+        _unicode_borders = codeset.upper().replace("-", "") == "UTF8"
+
+    return _unicode_borders
+
+def set_unicode_borders(enabled: Optional[bool]) -> None:
+
+    # Forces the Unicode (True) or ACS (False) sets, None detects again.
+    global _unicode_borders
+    _unicode_borders = enabled
+
+@functools.lru_cache(maxsize=512)
+def border_rows(style: str, width: int) -> tuple[str, str, str]:
+
+    (tl, tr, bl, br, h, v) = _BORDER_SETS.get(style, _BORDER_SETS["single"])
+
+    inner = h * max(0, width - 2)
+
+    return (tl + inner + tr, bl + inner + br, v)
+
+def draw_border(win, x: int, y: int, width: int, height: int, attr: int, style: Optional[str] = "single") -> None:
+
+    if style in (None, "none") or width < 2 or height < 2 :
+        return
+
+    last  = y + height - 1
+    right = x + width - 1
+    sides = height - 2
+
+    if not unicode_borders() :
+
+        win.hline(y,    x + 1, curses.ACS_HLINE, width - 2, attr)
+        win.hline(last, x + 1, curses.ACS_HLINE, width - 2, attr)
+
+        if sides > 0 :
+            win.vline(y + 1, x,     curses.ACS_VLINE, sides, attr)
+            win.vline(y + 1, right, curses.ACS_VLINE, sides, attr)
+
+        win.addch(y,    x,     curses.ACS_ULCORNER, attr)
+        win.addch(y,    right, curses.ACS_URCORNER, attr)
+        win.addch(last, x,     curses.ACS_LLCORNER, attr)
+
+        # The lower right corner of a window is written, but raises.
+        try :
+            win.addch(last, right, curses.ACS_LRCORNER, attr)
+        except curses.error :
+            pass
+
+        return
+
+    (top, bottom, side) = border_rows(style, width)
+
+    win.addstr(y, x, top, attr)
+
+    acs = _BORDER_ACS_SIDES.get(style) if _backend.acs else None
+
+    if acs is not None :
+        if sides > 0 :
+            win.vline(y + 1, x,     getattr(curses, acs), sides, attr)
+            win.vline(y + 1, right, getattr(curses, acs), sides, attr)
+    else :
+        for row in range(y + 1, last) :
+            win.addstr(row, x,     side, attr)
+            win.addstr(row, right, side, attr)
+
+    try :
+        win.addstr(last, x, bottom, attr)
+    except curses.error :
+        pass
+
+# ----------------------------------------------------------------------
+# Keymaps - key bindings in dict based dispatch tables
+# ----------------------------------------------------------------------
+#
+# A keymap maps key sequences (tuples of key codes) to actions, plain
+# callables taking no argument.  Sequences of more than one key are
+# chords: their prefixes are kept in a second table, so a lookup is
+# always one or two dict probes.  Keys are given as codes or as names :
+#
+#   "q"  "Enter"  "Esc"  "Tab"  "Space"  "F5"  "Up"  "PPage"  "C-x"
+#   "C-x C-c"   (a chord, names separated by spaces)
+#
+# The WindowManager has the global keymap, windows and widgets their own
+# (created by bind_key).  See WindowManager.dispatch_key for the order.
+#
+
+_KEY_NAMES = {
+    "Enter":  ord("\n"),
+    "Tab":    ord("\t"),
+    "Esc":    27,
+    "Escape": 27,
+    "Space":  ord(" "),
+}
+
+def key_code(spec) -> int:
+
+    if isinstance(spec, int) :
+        return spec
+
+    if spec in _KEY_NAMES :
+        return _KEY_NAMES[spec]
+
+    if len(spec) == 1 :
+        return ord(spec)
+
+    if len(spec) == 3 and spec[:2] == "C-" :
+        return ord(spec[2].lower()) & 0x1f
+
+    code = getattr(curses, "KEY_" + spec.upper(), None)
+
+    if code is None :
+        raise ValueError(f"unknown key {spec!r}")
+
+    return code
+
+def key_sequence(keys) -> tuple:
+
+    if isinstance(keys, int) :
+        return (keys,)
+
+    if isinstance(keys, str) :
+        keys = keys.split() if " " in keys.strip() else [keys]
+
+    return tuple(key_code(k) for k in keys)
+
+
+class Keymap:
+
+    # lookup() result for the prefix of a chord.
+    PREFIX = object()
+
+    def __init__(self, bindings: Optional[dict] = None) :
+
+        self.bindings = {}          # key sequence -> action
+        self.prefixes = {}          # chord prefix -> number of chords
+
+        for keys, action in (bindings or {}).items() :
+            self.bind(keys, action)
+
+    def bind(self, keys, action: Callable[[], Any]) -> None:
+
+        seq = key_sequence(keys)
+
+        if seq not in self.bindings :
+            for n in range(1, len(seq)) :
+                self.prefixes[seq[:n]] = self.prefixes.get(seq[:n], 0) + 1
+
+        self.bindings[seq] = action
+
+    def unbind(self, keys) -> None:
+
+        seq = key_sequence(keys)
+
+        if self.bindings.pop(seq, None) is None :
+            return
+
+        for n in range(1, len(seq)) :
+            count = self.prefixes[seq[:n]] - 1
+            if count :
+                self.prefixes[seq[:n]] = count
+            else :
+                del self.prefixes[seq[:n]]
+
+    def lookup(self, seq: tuple) :
+
+        # The action, Keymap.PREFIX or None; a full binding wins over a chord.
+
+        action = self.bindings.get(seq)
+
+        if action is None and seq in self.prefixes :
+            return Keymap.PREFIX
+
+        return action
+
+# ----------------------------------------------------------------------
+# Base Widget
+# ----------------------------------------------------------------------
+
+class Widget:
+
+    focusable = False
+
+    # Columns drawn by the last paint when more than width (a label with
+    # its units), cleared with the widget on its next repaint.
+    painted_width = 0
+
+    def __init__(self, x: int, y: int, width: int, height: int = 1, **kwargs):
+        
+        self.x      = x
+        self.y      = y
+        self.width  = width
+        self.height = height
+
+        self.name   = kwargs.get("name", None)
+
+        self.parent: Optional["Window"] = None
+                 
+        self.visible = True
+        self.focused = False
+
+        if "focusable" in kwargs :
+            self.focusable = kwargs["focusable"]
+
+        # Bindings while the widget is in the focus chain, see Keymap.
+        self.keymap: Optional[Keymap] = kwargs.get("keymap", None)
+        
+    def set_parent(self, parent: "Window") -> None:
+        self.parent = parent
+
+    def bind_key(self, keys, action: Callable[[], Any]) -> None:
+
+        if self.keymap is None :
+            self.keymap = Keymap()
+
+        self.keymap.bind(keys, action)
+
+    def set_focusable(self, focusable: bool) -> None:
+
+        if focusable != self.focusable :
+            self.focusable = focusable
+            if self.parent is not None :
+                self.parent.widget_list().relink(self)
+
+    def box(self, win, x, y, w, h, style, border="single") :
+        draw_border(win, x, y, w, h, style, border)
+        
+    def request_repaint(self) :
+
+        # Only this widget is painted again, see WindowManager.paint_windows.
+        if self.parent :
+            self.parent.invalidate(self)
+
+    def paint_priority(self) -> int:
+
+        # Painted ahead of others when the frame budget runs out (faults).
+        return 0
+
+    def set_geometry(self, x: int, y: int, width: int, height: int) -> None:
+
+        if (x, y, width, height) == (self.x, self.y, self.width, self.height) :
+            return
+
+        self.x      = x
+        self.y      = y
+        self.width  = width
+        self.height = height
+
+        # The old area has to be cleared as well, the parent paints it all.
+        if self.parent :
+            self.parent.request_repaint()
+
+    def paint(self, win) -> None:
+        pass
+
+    def contains(self, x: int, y: int) -> bool:
+        return (self.x <= x < self.x + self.width and
+                self.y <= y < self.y + self.height)
+
+    def handle_key(self, key: int) -> bool:
+        return False
+
+    def handle_mouse(self, x: int, y: int, button: int) -> bool:
+        return False
+
+    def handle_tick(self) :
+        return False
+
+    # ---- session state (see session.py) ------------------------------------
+
+    def save_state(self) -> Optional[dict]:
+
+        # JSON-able state worth keeping across restarts (counters,
+        # history), None when there is nothing to keep.
+        return None
+
+    def restore_state(self, state: dict) -> None:
+        pass
+
+    # ---- metrics ----------------------------------------------------------
+
+    def metrics(self) -> dict:
+        return {}
+
+    def metric_labels(self) -> dict:
+        return {}
+
+# ----------------------------------------------------------------------
+# Layouts - Rows, Columns and Grids with cached geometry
+# ----------------------------------------------------------------------
+#
+# A layout owns the geometry of the widgets registered with it, inside
+# the content rectangle of its owner (a Window or a Container).  The
+# result is cached against that rectangle, so it is only recomputed when
+# the owner is resized or a widget is added / removed.  Child Containers
+# only re-layout their own children when their size actually changes.
+#
+
+def _distribute(total: int, specs) -> List[int]:
+
+    # specs : [(size, weight, min_size, max_size), ...]
+    #
+    # Fixed items get their size, flexible items start at their minimum
+    # and share whatever is left in proportion to their weight.
+
+    sizes = [0] * len(specs)
+    flex  = []
+    free  = total
+
+    for i, (size, weight, minimum, maximum) in enumerate(specs) :
+
+        if size is None and weight > 0 :
+            flex.append(i)
+            sizes[i] = minimum
+        else :
+            sizes[i] = size if size is not None else minimum
+
+        free -= sizes[i]
+
+    while free > 0 and flex :
+
+        weights = sum(specs[i][1] for i in flex)
+        growing = []
+        spent   = 0
+
+        for i in flex :
+
+            share   = free * specs[i][1] // weights
+            maximum = specs[i][3]
+
+            if maximum is not None and sizes[i] + share >= maximum :
+                share = maximum - sizes[i]
+            else :
+                growing.append(i)
+
+            sizes[i] += share
+            spent    += share
+
+        free -= spent
+
+        if spent == 0 :
+            # Hand out the rounding remainder one cell at a time.
+            for i in growing[:free] :
+                sizes[i] += 1
+            break
+
+        flex = growing
+
+    return sizes
+
+
+def _align(align: str, space: int, size: int) -> int:
+
+    if align == "center" :
+        return (space - size) // 2
+    if align == "end" :
+        return space - size
+    return 0
+
+
+class Layout:
+
+    def __init__(self, **kwargs):
+
+        self.margin    = kwargs.get("margin",  0)
+        self.spacing   = kwargs.get("spacing", 0)
+
+        self.items     = {}        # widget -> constraints, in insertion order
+        self.owner     = None
+
+        self.cache_key = None
+        self.geometry  = []
+
+    def add(self, w: Widget, **constraints) -> Widget:
+
+        self.items[w] = constraints
+        self.invalidate()
+        return w
+
+    def remove(self, w: Widget) -> None:
+
+        if w in self.items :
+            del self.items[w]
+            self.invalidate()
+
+    def invalidate(self) -> None:
+
+        self.cache_key = None
+
+        if self.owner is not None :
+            self.owner.invalidate_layout()
+
+    def apply(self, x: int, y: int, width: int, height: int) -> None:
+
+        key = (x, y, width, height)
+
+        if key == self.cache_key :
+            return
+
+        m = self.margin
+        self.geometry  = self.compute(x + m, y + m, max(0, width - 2 * m), max(0, height - 2 * m))
+        self.cache_key = key
+
+        for w, gx, gy, gw, gh in self.geometry :
+            w.set_geometry(gx, gy, gw, gh)
+
+    def compute(self, x: int, y: int, width: int, height: int) -> list:
+        return []
+
+
+class BoxLayout(Layout):
+
+    #
+    # Constraints (per widget) :
+    #
+    #   size        fixed size along the layout axis
+    #   weight      share of the free space (default 1)
+    #   min_size    minimum size along the layout axis
+    #   max_size    maximum size along the layout axis
+    #   cross_size  size across the axis (default: fill)
+    #   align       "start", "center" or "end" across the axis
+    #
+
+    horizontal = True
+
+    def compute(self, x: int, y: int, width: int, height: int) -> list:
+
+        if not self.items :
+            return []
+
+        main, cross = (width, height) if self.horizontal else (height, width)
+
+        specs = [(c.get("size"), c.get("weight", 1), c.get("min_size", 0), c.get("max_size"))
+                 for c in self.items.values()]
+
+        sizes = _distribute(main - self.spacing * (len(specs) - 1), specs)
+
+        geometry = []
+        pos      = 0
+
+        for (w, c), size in zip(self.items.items(), sizes) :
+
+            span   = min(c.get("cross_size") or cross, cross)
+            offset = _align(c.get("align", "start"), cross, span)
+
+            if self.horizontal :
+                geometry.append((w, x + pos, y + offset, size, span))
+            else :
+                geometry.append((w, x + offset, y + pos, span, size))
+
+            pos += size + self.spacing
+
+        return geometry
+
+
+class RowLayout(BoxLayout):
+    horizontal = True
+
+
+class ColumnLayout(BoxLayout):
+    horizontal = False
+
+
+class GridLayout(Layout):
+
+    #
+    # rows / cols : track sizes, a positive int is a fixed size and
+    #               0 shares the free space equally.
+    #
+    # Constraints (per widget) : row, col, row_span, col_span
+    #
+
+    def __init__(self, **kwargs):
+
+        super().__init__(**kwargs)
+
+        self.rows = list(kwargs.get("rows", [0]))
+        self.cols = list(kwargs.get("cols", [0]))
+
+    def _tracks(self, total: int, tracks: List[int]) -> List[int]:
+
+        specs = [(t, 0, 0, None) if t > 0 else (None, 1, 0, None) for t in tracks]
+        sizes = _distribute(total - self.spacing * (len(tracks) - 1), specs)
+
+        offsets = []
+        pos     = 0
+
+        for size in sizes :
+            offsets.append(pos)
+            pos += size + self.spacing
+
+        return list(zip(offsets, sizes))
+
+    def compute(self, x: int, y: int, width: int, height: int) -> list:
+
+        rows = self._tracks(height, self.rows)
+        cols = self._tracks(width,  self.cols)
+
+        geometry = []
+
+        for w, c in self.items.items() :
+
+            r0 = min(c.get("row", 0), len(rows) - 1)
+            c0 = min(c.get("col", 0), len(cols) - 1)
+            r1 = min(r0 + c.get("row_span", 1), len(rows)) - 1
+            c1 = min(c0 + c.get("col_span", 1), len(cols)) - 1
+
+            gx = cols[c0][0]
+            gy = rows[r0][0]
+            gw = cols[c1][0] + cols[c1][1] - gx
+            gh = rows[r1][0] + rows[r1][1] - gy
+
+            geometry.append((w, x + gx, y + gy, gw, gh))
+
+        return geometry
+
+# ----------------------------------------------------------------------
+# WidgetList - ordered children with O(1) removal and a focus ring
+# ----------------------------------------------------------------------
+#
+# Children are kept in an insertion ordered dict (paint / focus order),
+# and the focusable ones are also linked into a ring, so Tab / BackTab
+# and removal never scan the list.
+#
+
+class WidgetList:
+
+    # Bumped on every add / remove, used to invalidate path indexes.
+    generation = 0
+
+    def __init__(self):
+
+        self.items      = {}
+        self.focus_next = {}
+        self.focus_prev = {}
+        self.focus_head = None
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __iter__(self) :
+        return iter(self.items)
+
+    def __reversed__(self) :
+        return reversed(self.items)
+
+    def __contains__(self, w) -> bool:
+        return w in self.items
+
+    def append(self, w: Widget) -> None:
+
+        if w in self.items :
+            return
+
+        self.items[w] = None
+
+        if w.focusable :
+            self._link(w, self.focus_head)
+
+        WidgetList.generation += 1
+
+    def remove(self, w: Widget) -> None:
+
+        del self.items[w]
+
+        self._unlink(w)
+
+        WidgetList.generation += 1
+
+    def relink(self, w: Widget) -> None:
+
+        # Focusability changed, find the focusable successor in order (rare).
+
+        self._unlink(w)
+
+        if not w.focusable or w not in self.items :
+            return
+
+        successor = None
+        found     = False
+
+        for item in self.items :
+            if found and item in self.focus_next :
+                successor = item
+                break
+            found = found or item is w
+
+        if successor is None :
+            self._link(w, self.focus_head)
+            return
+
+        self._link(w, successor)
+
+        # Nothing focusable before our successor, so nothing before us either.
+        if successor is self.focus_head :
+            self.focus_head = w
+
+    def _link(self, w: Widget, before: Optional[Widget]) -> None:
+
+        # Insert w in the ring just before 'before' (at the tail for the head).
+
+        if before is None :
+            self.focus_head    = w
+            self.focus_next[w] = w
+            self.focus_prev[w] = w
+            return
+
+        prev = self.focus_prev[before]
+
+        self.focus_next[prev]   = w
+        self.focus_prev[w]      = prev
+        self.focus_next[w]      = before
+        self.focus_prev[before] = w
+
+    def _unlink(self, w: Widget) -> None:
+
+        if w not in self.focus_next :
+            return
+
+        prev = self.focus_prev.pop(w)
+        nxt  = self.focus_next.pop(w)
+
+        if nxt is w :
+            self.focus_head = None
+            return
 
-class Widget:
+        self.focus_next[prev] = nxt
+        self.focus_prev[nxt]  = prev
 
-    def __init__(self, x: int, y: int, width: int, height: int = 1, **kwargs):
-        
-        self.x      = x
-        self.y      = y
-        self.width  = width
-        self.height = height
+        if self.focus_head is w :
+            self.focus_head = nxt
 
-        self.name   = kwargs.get("name", None)
+    def next_focus(self, w: Optional[Widget]) -> Optional[Widget]:
 
-        self.parent: Optional["Window"] = None
-                 
-        self.visible = True
-        self.focused = False
-        
-    def set_parent(self, parent: "Window") -> None:
-        self.parent = parent
+        if w in self.focus_next :
+            return self.focus_next[w]
 
-    def box(self, win, x, y, w, h, style) :
+        return self.focus_head
 
-        h -= 1
-        
-        win.hline(y, x, curses.ACS_HLINE, w, style)        
-        win.hline(y + h, x, curses.ACS_HLINE, w, style)
-        
-        win.vline(y, x, curses.ACS_VLINE, h, style)
-        win.vline(y, x + w, curses.ACS_VLINE, h, style)
+    def prev_focus(self, w: Optional[Widget]) -> Optional[Widget]:
 
-        win.addch(y, x, curses.ACS_ULCORNER, style)
-        win.addch(y + h, x, curses.ACS_LLCORNER, style)
-        win.addch(y, x + w, curses.ACS_URCORNER, style)
-        win.addch(y + h, x + w, curses.ACS_LRCORNER, style)
-        
-    def request_repaint(self) :
-        if self.parent :
-            self.parent.request_repaint()
-            
-    def paint(self, win) -> None:
-        pass
+        if w in self.focus_prev :
+            return self.focus_prev[w]
 
-    def contains(self, x: int, y: int) -> bool:
-        return (self.x <= x < self.x + self.width and
-                self.y <= y < self.y + self.height)
+        if self.focus_head is None :
+            return None
 
-    def handle_key(self, key: int) -> bool:
-        return False
-    
-    def handle_mouse(self, x: int, y: int, button: int) -> bool:
-        return False
+        return self.focus_prev[self.focus_head]
 
-    def handle_tick(self) :
-        return False
-    
 # ----------------------------------------------------------------------
 # Container - Used to make composite wiget patterns
 # ----------------------------------------------------------------------
@@ -132,7 +977,7 @@ class Container(Widget):
 
         super().__init__(x, y, width, height, **kwargs)
 
-        self.children       = []
+        self.children       = WidgetList()
         self.child_names    = {}
         self.focused_child  = None
 
@@ -146,35 +991,106 @@ class Container(Widget):
         self.border_fg   = kwargs.get("border_foreground", "cyan")
         self.border_bg   = kwargs.get("border_background", "default")
         self.border_att  = kwargs.get("border_attribute",  "default")
+        self.border_style = kwargs.get("border_style",     "single")
         self.border_color = None
 
-        
-    def add_widget(self, w: Widget) -> Widget:
+        self.layout       = None
+        self.layout_dirty = False
 
-        # Set the child's parent to the same window as this container
-        if self.parent:
-            w.set_parent(self.parent)
+        if kwargs.get("layout") is not None :
+            self.set_layout(kwargs["layout"])
+
+        # Cached drawing context for the children : (parent context, geometry, context)
+        self.child_context = (None, None, None)
+
+    def add_widget(self, w: Widget, **constraints) -> Widget:
+
+        # Repaint requests from the child go through this container
+        w.set_parent(self)
 
         self.children.append(w)
 
         if w.name:
             self.child_names[w.name] = w
 
+        # A container is focusable as soon as one of its children is.
+        if w.focusable and not self.focusable :
+            self.set_focusable(True)
+
+        if self.layout is not None :
+            self.layout.add(w, **constraints)
+
         self.request_repaint()
         return w
 
     def remove_widget(self, w: Widget) -> None:
         if w in self.children:
             self.children.remove(w)
-            if w.name and w.name in self.child_names:
+            if w.name and self.child_names.get(w.name) is w:
                 del self.child_names[w.name]
             if self.focused_child == w:
                 self.focused_child = None
+            if self.layout is not None :
+                self.layout.remove(w)
             self.request_repaint()
 
+    # ---- layout -----------------------------------------------------------
+
+    def set_layout(self, layout: Optional[Layout]) -> None:
+
+        if self.layout is not None :
+            self.layout.owner = None
+
+        self.layout = layout
+
+        if layout is not None :
+            layout.owner = self
+
+        self.invalidate_layout()
+
+    def content_rect(self) -> tuple[int, int, int, int]:
+
+        # Children use container relative coordinates, inside the box.
+        if self.border_style in (None, "none") :
+            return (0, 0, self.width, self.height)
+
+        return (1, 1, max(0, self.width - 2), max(0, self.height - 2))
+
+    def invalidate_layout(self) -> None:
+
+        self.layout_dirty = True
+        self.request_repaint()
+
+    def apply_layout(self) -> None:
+
+        if self.layout_dirty :
+            self.layout_dirty = False
+            if self.layout is not None :
+                self.layout.apply(*self.content_rect())
+
+    def set_geometry(self, x: int, y: int, width: int, height: int) -> None:
+
+        # Only a change of size invalidates the children, moving the
+        # container keeps its (relative) child geometry.
+        if width != self.width or height != self.height :
+            self.layout_dirty = True
+
+        super().set_geometry(x, y, width, height)
+
+    def invalidate(self, child: Widget) -> None:
+
+        # A container paints as a whole (background, box and children).
+        self.request_repaint()
+
+    def paint_priority(self) -> int:
+        return max((child.paint_priority() for child in self.children), default=0)
+
     def get_child_by_name(self, name: str) -> Optional[Widget]:
         return self.child_names.get(name)
 
+    def widget_list(self) -> WidgetList:
+        return self.children
+
     def set_focus(self, w: Optional[Widget]) -> None:
         if self.focused_child:
             self.focused_child.focused = False
@@ -184,19 +1100,34 @@ class Container(Widget):
         self.request_repaint()
 
     def next_focus(self) -> None:
-        if not self.children:
-            return
-        i = (self.children.index(self.focused_child) + 1) % len(self.children) if self.focused_child else 0
-        self.set_focus(self.children[i])
+        w = self.children.next_focus(self.focused_child)
+        if w is not None:
+            self.set_focus(w)
 
     def prev_focus(self) -> None:
-        if not self.children:
-            return
-        i = (self.children.index(self.focused_child) - 1) % len(self.children) if self.focused_child else -1
-        self.set_focus(self.children[i])
+        w = self.children.prev_focus(self.focused_child)
+        if w is not None:
+            self.set_focus(w)
+
+    def get_child_context(self, win) -> DrawContext:
+
+        geometry = (self.x, self.y, self.width, self.height)
+
+        (parent, cached_geometry, ctx) = self.child_context
+
+        if parent is not win or cached_geometry != geometry :
+            ctx = win.derive(*geometry)
+            self.child_context = (win, geometry, ctx)
+
+        return ctx
 
     def paint(self, win) -> None:
 
+        if not isinstance(win, DrawContext) :
+            win = DrawContext(win)
+
+        self.apply_layout()
+
         # One time init colors
         
         if self.base_color is None:
@@ -215,21 +1146,18 @@ class Container(Widget):
 
         # Paint box if requested...
         
-        self.box(win, self.x, self.y, self.width, self.height, self.border_color)
+        self.box(win, self.x, self.y, self.width, self.height, self.border_color, self.border_style)
         
         #
-        # Because these child  widgets aren't based on a curses window, 
-        # we need to simulate the window based coordinates that widgets 
-        # expect, so paint the children with a temporary absolute offset.
-        # 
+        # Children use container relative coordinates, paint them through
+        # a derived context that carries our offset and clips at our bounds.
+        #
+
+        ctx = self.get_child_context(win)
 
         for child in self.children:
             if child.visible:
-                orig_x, orig_y = child.x, child.y
-                child.x += self.x
-                child.y += self.y
-                child.paint(win)
-                child.x, child.y = orig_x, orig_y
+                child.paint(ctx)
 
     def contains(self, x: int, y: int) -> bool:
         # Check if point is within container or any child (with relative coords)
@@ -248,15 +1176,10 @@ class Container(Widget):
             self.prev_focus()
             return True
 
-        # Delegate to focused child first
+        # Keys only go down the focus chain
         if self.focused_child and self.focused_child.handle_key(key):
             return True
 
-        # Then try all children in reverse (top-to-bottom)
-        for child in reversed(self.children):
-            if child.handle_key(key):
-                return True
-
         return False
 
     def handle_mouse(self, x: int, y: int, button: int) -> bool:
@@ -278,11 +1201,20 @@ class Container(Widget):
 
         # Container itself doesn't handle mouse by default
         return False
-    
+
+    def handle_tick(self) :
+
+        # Nested (sampling) widgets tick with their window.
+        for child in reversed(self.children) :
+            child.handle_tick()
+
 # ----------------------------------------------------------------------
 # Window
 # ----------------------------------------------------------------------
 class Window:
+
+    # Frames painted so far, dirty windows and widgets age against it.
+    frame = 0
     
     def __init__(self, x: int, y: int, width: int, height: int, **kwargs):
 
@@ -303,30 +1235,51 @@ class Window:
         self.border_bg     = kwargs.get("border_background", "default")
         self.border_att    = kwargs.get("border_attribute",  "default")
 
-        self.border_style  = kwargs.get("border_style",      "single") # single, double, solid, none
+        self.border_style  = kwargs.get("border_style",      "single") # single, rounded, double, heavy, solid, none
         self.border_color  = None
+
+        self.stretch       = kwargs.get("stretch",           None)     # horizontal, vertical, both
+
+        # Windows with priority <= 0 are held back when over the output budget.
+        self.priority      = kwargs.get("priority",          0)
         
         self.active_fg     = kwargs.get("active_foreground", "default")
         self.active_bg     = kwargs.get("active_background", "default")
         self.active_att    = kwargs.get("active_attribute",  "default")
         self.active_color  = None
         
-        self.win   = curses.newwin(height, width, y, x)
-        self.panel = curses.panel.new_panel(self.win)
-        
-        self.panel.set_userptr(self)
+        # The curses window and panel (backing store) are only allocated
+        # when the window is first shown, see materialize().
+        self._win    = None
+        self._panel  = None
+        self._canvas = None
+
+        self.hidden = kwargs.get("hidden", False)
         
         self.active = False     
 
-        self.widgets: List[Widget] = []
+        self.widgets = WidgetList()
 
         self.widget_names = {}
                  
         self.focused_widget: Optional[Widget] = None
         self.needs_repaint = True
+        self.chrome_dirty  = False
+        self.dirty_frame   = Window.frame
+
+        # Widgets to paint on their own, with the frame they were queued.
+        self.dirty: dict[Widget, int] = {}
 
         self.window_manager = None
 
+        self.keymap: Optional[Keymap] = kwargs.get("keymap", None)
+
+        self.layout        = None
+        self.layout_dirty  = False
+
+        if kwargs.get("layout") is not None :
+            self.set_layout(kwargs["layout"])
+
     def set_title(self, text):
         
         self.title = text
@@ -336,7 +1289,7 @@ class Window:
 
         return self.window_manager
     
-    def add_widget(self, w: Widget) -> Widget:
+    def add_widget(self, w: Widget, **constraints) -> Widget:
 
         w.set_parent(self)
         
@@ -344,11 +1297,116 @@ class Window:
         
         if w.name :
            self.widget_names[w.name] = w
-                 
+
+        if self.layout is not None :
+            self.layout.add(w, **constraints)
+
         self.request_repaint()
 
         return w
 
+    def get_child_by_name(self, name: str) -> Optional[Widget]:
+        return self.widget_names.get(name)
+
+    def widget_list(self) -> WidgetList:
+        return self.widgets
+
+    def remove_widget(self, w: Widget) -> None:
+
+        if w in self.widgets :
+
+            self.widgets.remove(w)
+
+            if w.name and self.widget_names.get(w.name) is w :
+                del self.widget_names[w.name]
+
+            if self.focused_widget is w :
+                self.set_focus(None)
+
+            if self.layout is not None :
+                self.layout.remove(w)
+
+            self.request_repaint()
+
+    # ---- layout -----------------------------------------------------------
+
+    def set_layout(self, layout: Optional[Layout]) -> None:
+
+        if self.layout is not None :
+            self.layout.owner = None
+
+        self.layout = layout
+
+        if layout is not None :
+            layout.owner = self
+
+        self.invalidate_layout()
+
+    def content_rect(self) -> tuple[int, int, int, int]:
+
+        if self.border_style in (None, "none") :
+            return (0, 0, self.width, self.height)
+
+        return (1, 1, max(0, self.width - 2), max(0, self.height - 2))
+
+    def invalidate_layout(self) -> None:
+
+        self.layout_dirty = True
+        self.request_repaint()
+
+    def apply_layout(self) -> None:
+
+        if self.layout_dirty :
+            self.layout_dirty = False
+            if self.layout is not None :
+                self.layout.apply(*self.content_rect())
+
+    # ---- backing store ----------------------------------------------------
+
+    @property
+    def materialized(self) -> bool:
+        return self._win is not None
+
+    def materialize(self) -> None:
+
+        if self._win is not None :
+            return
+
+        self._win    = _backend.newwin(self.height, self.width, self.y, self.x)
+        self._panel  = _backend.new_panel(self._win)
+        self._canvas = DrawContext(self._win, 0, 0, self.width, self.height)
+
+        self._panel.set_userptr(self)
+
+        if self.window_manager is not None and self.window_manager.remote :
+            self._win.leaveok(True)
+
+        if self.hidden :
+            self._panel.hide()
+
+        self.request_repaint()
+
+    @property
+    def win(self) :
+        self.materialize()
+        return self._win
+
+    @property
+    def panel(self) :
+        self.materialize()
+        return self._panel
+
+    @property
+    def canvas(self) -> DrawContext:
+        self.materialize()
+        return self._canvas
+
+    def on_screen(self, width: int, height: int) -> bool:
+
+        return (not self.hidden and
+                self.x < width  and self.x + self.width  > 0 and
+                self.y < height and self.y + self.height > 0)
+
     def move_top(self) :
         self.panel.top()
 
@@ -362,47 +1420,84 @@ class Window:
         self.panel.backward()
 
     def hide(self) :
-        self.panel.hide()
+
+        self.hidden = True
+
+        if self.materialized :
+            self._panel.hide()
 
     def show(self) :
+
+        self.hidden = False
         self.panel.show()
+
+    def release(self) -> None:
+
+        # Drops the backing store; the area is restored from the panels below.
+
+        if self.materialized :
+            self._panel.hide()
+
+        self._win    = None
+        self._panel  = None
+        self._canvas = None
+
+        self.needs_repaint = True
         
     def set_focus(self, w: Optional[Widget]) -> None:
 
-        if self.focused_widget:
-            self.focused_widget.focused = False
+        old = self.focused_widget
+
+        if old:
+            old.focused = False
+            self.invalidate(old)
 
         self.focused_widget = w
 
         if w:
             w.focused = True
-
-        self.request_repaint()
+            self.invalidate(w)
 
     def next_focus(self) -> None:
 
-        if not self.widgets:
-            return
-        
-        i = (self.widgets.index(self.focused_widget) + 1) % len(self.widgets) if self.focused_widget else 0
+        w = self.widgets.next_focus(self.focused_widget)
 
-        self.set_focus(self.widgets[i])
+        if w is not None :
+            self.set_focus(w)
 
     def prev_focus(self) -> None:
 
-        if not self.widgets: return
-        i = (self.widgets.index(self.focused_widget) - 1) % len(self.widgets) if self.focused_widget else -1
+        w = self.widgets.prev_focus(self.focused_widget)
 
-        self.set_focus(self.widgets[i])
+        if w is not None :
+            self.set_focus(w)
 
     def request_repaint(self) -> None:
-        self.needs_repaint = True
+
+        if not self.needs_repaint :
+            self.needs_repaint = True
+            self.dirty_frame   = Window.frame
+
+    def invalidate(self, widget: Widget) -> None:
+
+        # Queues one widget, unless the whole window is painted anyway.
+        if not self.needs_repaint and widget not in self.dirty :
+            self.dirty[widget] = Window.frame
 
     def resize(self, width: int, height: int) :
 
-        self.win.resize(height, width)        
-        self.panel.replace(self.win)        
-        self.request_repaint()
+        if width == self.width and height == self.height :
+            return
+
+        if self.materialized :
+            self._win.resize(height, width)        
+            self._panel.replace(self._win)        
+            self._canvas = DrawContext(self._win, 0, 0, width, height)
+
+        self.width  = width
+        self.height = height
+
+        self.invalidate_layout()
 
     def move(self, x, y) :
 
@@ -410,34 +1505,102 @@ class Window:
         
         if x != self.x or y != self.y :
 
-            try :
-                result = self.win.mvwin(y, x)                
-            except Exception as e :
-                pass
+            # Moving the panel keeps the content, the panel library
+            # refreshes what was uncovered; nothing needs repainting.
+            if self.materialized :
+                try :
+                    self._panel.move(y, x)
+                    result = curses.OK
+                except curses.error :
+                    pass
                 
             self.x = x
             self.y = y            
-            self.request_repaint()
 
         return result
     
+    def request_chrome(self) -> None:
+
+        # Border / title / active marker only, the widgets are left alone.
+        self.chrome_dirty = True
+
     def paint(self) -> None:
 
         if not self.needs_repaint:
+
+            # Without a border the marker sits on the content, repaint it all.
+            if self.chrome_dirty :
+                if self.border_style in (None, "none") :
+                    self.needs_repaint = True
+                else :
+                    self.paint_chrome()
+
+            if not self.needs_repaint :
+                return
+
+        self.apply_layout()
+
+        self.win.erase()
+
+        self.paint_chrome()
+
+        for widget in self.widgets:
+            if widget.visible:
+                widget.paint(self.canvas)
+
+        self.needs_repaint = False
+        self.dirty.clear()
+
+    def paint_widget(self, widget: Widget) -> None:
+
+        # Clears the area of one widget (and what it drew past it last
+        # time) and paints it, the rest of the window is left alone.
+        # Widgets under that overdraw are painted again on top of it.
+        # Queued twice, or painted with the whole window in the meantime,
+        # it is skipped.
+
+        if widget not in self.dirty :
             return
 
+        canvas = self.canvas
+        extent = max(widget.width, widget.painted_width)
+        blank  = " " * extent
+
+        try :
+            for row in range(widget.y, widget.y + widget.height) :
+                canvas.addstr(row, widget.x, blank, curses.A_NORMAL)
+        except curses.error :
+            pass
+
+        if widget.visible :
+            widget.paint(canvas)
+
+        if extent > widget.width :
+
+            left  = widget.x + widget.width
+            right = widget.x + extent
+
+            for other in self.widgets :
+                if (other is not widget and other.visible and
+                        other.x < right and left < other.x + other.width and
+                        other.y < widget.y + widget.height and widget.y < other.y + other.height) :
+                    other.paint(canvas)
+
+        # Requests made while painting (e.g. a layout pass) are covered.
+        del self.dirty[widget]
+
+    def paint_chrome(self) -> None:
+
         w = self.win
-        
-        w.erase()
 
-        if self.border_style != None :
+        self.chrome_dirty = False
+
+        if self.border_style not in (None, "none") :
             
             if self.border_color == None :
                 self.border_color = cm(self.border_fg, self.border_bg, self.border_att)
             
-            w.attron(self.border_color)
-            w.border()
-            w.attroff(self.border_color)
+            draw_border(w, 0, 0, self.width, self.height, self.border_color, self.border_style)
         
         if self.title:
 
@@ -455,12 +1618,6 @@ class Window:
 
             w.addstr(0, 1, "*", self.active_color)
 
-        for widget in self.widgets:
-            if widget.visible:
-                widget.paint(w)
-
-        self.needs_repaint = False
-
     # ---- input ------------------------------------------------------------
 
     def handle_key(self, key: int) -> bool:
@@ -471,12 +1628,34 @@ class Window:
         if key == curses.KEY_BTAB:
             self.prev_focus(); return True
 
+        # Keys only go down the focus chain, never to every widget.
         if self.focused_widget and self.focused_widget.handle_key(key):
             return True
 
-        for widget in reversed(self.widgets):
-            if widget.handle_key(key):
-                return True
+        return False
+
+    def focus_chain(self) -> list:
+
+        # Focused widget (innermost first) up to the window itself.
+
+        chain = []
+        w     = self.focused_widget
+
+        while w is not None :
+            chain.append(w)
+            w = getattr(w, "focused_child", None)
+
+        chain.reverse()
+        chain.append(self)
+
+        return chain
+
+    def bind_key(self, keys, action: Callable[[], Any]) -> None:
+
+        if self.keymap is None :
+            self.keymap = Keymap()
+
+        self.keymap.bind(keys, action)
 
     def handle_mouse(self, local_x: int, local_y: int, button: int) -> bool:
 
@@ -489,25 +1668,195 @@ class Window:
         for widget in reversed(self.widgets) :
             widget.handle_tick()            
     
-    def handle_resize(self, width, height) :        
-        pass
+    def handle_resize(self, width, height) :
+
+        #
+        # Windows that stretch follow the terminal size, the layout is
+        # then only recomputed for the subtrees whose size changed.
+        #
+
+        if not self.stretch :
+            return
+
+        new_width  = self.width
+        new_height = self.height
+
+        if self.stretch in ("horizontal", "both") :
+            new_width = max(1, width - self.x)
+
+        if self.stretch in ("vertical", "both") :
+            new_height = max(1, height - self.y)
+
+        try :
+            self.resize(new_width, new_height)
+        except curses.error :
+            pass
     
+# ----------------------------------------------------------------------
+# OutputMeter - terminal output per frame and a bytes/sec budget
+# ----------------------------------------------------------------------
+#
+# A terminal has no byte counter, so what is measured is every write()
+# of the UI thread while doupdate() runs: the wchar counter of
+# /proc/thread-self/io (Linux) before and after it.  That is the
+# terminal output, as long as nothing else writes from the UI thread
+# inside doupdate() (logging from a curses call would be counted too).
+# Elsewhere nothing is measured and the budget is never exceeded.
+#
+# The counter file stays open while the loop runs; close() releases it
+# (event_loop does on exit) and the next begin() opens it again.
+#
+# The budget is a token bucket : budget bytes per second, at most burst
+# bytes saved up.  While it is empty, low priority windows are not
+# repainted (they stay dirty and are drawn once the bucket refills).
+#
+
+class OutputMeter:
+
+    def __init__(self, budget: Optional[float] = None, burst: Optional[float] = None) :
+
+        self.budget  = budget
+        self.burst   = burst if burst is not None else (budget or 0) / 2
+        self.tokens  = self.burst
+
+        self.fd      = None
+        self.enabled = True
+
+        self.start       = 0
+        self.last_time   = time.monotonic()
+
+        self.frame_bytes = 0
+        self.total_bytes = 0
+        self.rate        = 0.0      # bytes/sec, smoothed
+
+    def counter(self) -> int:
+
+        if self.fd is None :
+            # Opened from (and bound to) the thread running the loop.
+            self.fd = os.open("/proc/thread-self/io", os.O_RDONLY)
+
+        data = os.pread(self.fd, 512, 0)
+
+        return int(data[data.index(b"wchar:") + 6:].split(None, 1)[0])
+
+    def begin(self) -> None:
+
+        if self.enabled :
+            try :
+                self.start = self.counter()
+            except (OSError, ValueError) :
+                self.enabled = False
+
+    def end(self) -> int:
+
+        now     = time.monotonic()
+        elapsed = now - self.last_time
+
+        self.last_time = now
+
+        written = 0
+
+        if self.enabled :
+            try :
+                written = self.counter() - self.start
+            except (OSError, ValueError) :
+                self.enabled = False
+
+        self.frame_bytes  = written
+        self.total_bytes += written
+
+        if elapsed > 0 :
+            self.rate += (written / elapsed - self.rate) * min(1.0, elapsed)
+
+        if self.budget :
+            self.tokens = min(self.burst, self.tokens + self.budget * elapsed - written)
+
+        return written
+
+    def over_budget(self) -> bool:
+        return bool(self.budget) and self.tokens <= 0
+
+    def close(self) -> None:
+
+        if self.fd is not None :
+            os.close(self.fd)
+            self.fd = None
+
 # ----------------------------------------------------------------------
 # WindowManager (panels + global repaint)
 # ----------------------------------------------------------------------
 class WindowManager:
     
-    def __init__(self, stdscr):
+    def __init__(self, stdscr, **kwargs):
+
+        #
+        #  kwargs :
+        #
+        #    output_budget  terminal output in bytes/sec (default: None, unlimited)
+        #    output_burst   bytes that can be saved up (default: budget / 2)
+        #    remote         remote terminal mode, fewer cursor moves
+        #                   (default: True when a budget is set)
+        #    keymap         global Keymap (default: an empty one)
+        #    chord_timeout  seconds to finish a chord (default: 1.0)
+        #    paint_budget   seconds of painting per frame, the rest is
+        #                   carried to the next frame (default: 0.008)
+        #
 
         self.stdscr = stdscr        
         self.window = {}
         self.active_window = None
         self.last_tick    = 0.0
+
+        self.tick_handlers: List[Callable[[], Any]] = []
+
+        # Modal windows, the top one takes all input.
+        self.modal: List[Window] = []
+
+        # Global key bindings, and the chord being typed.
+        self.keymap        = kwargs.get("keymap", None) or Keymap()
+        self.chord         = ()
+        self.chord_time    = 0.0
+        self.chord_timeout = kwargs.get("chord_timeout", 1.0)
+
+        # Cached "window/.../widget" lookups, see get_widget_byName
+        self.path_index      = {}
+        self.path_generation = -1
+
+        # Loop health, updated every frame.
+        self.stats = {
+            "frames":         0,
+            "paints":         0,
+            "ticks":          0,
+            "frame_time":     0.0,
+            "frame_time_max": 0.0,
+            "tick_lag":       0.0,
+            "first_frame":    None,     # seconds from import to the first frame
+            "pending":        0,        # windows not materialized yet
+            "output_bytes":   0,        # written by the UI thread in doupdate(), last frame
+            "output_total":   0,
+            "output_rate":    0.0,      # bytes/sec
+            "deferred":       0,        # windows / widgets left for the next frame
+            "widget_paints":  0,        # widgets painted on their own
+        }
+
+        self.paint_budget = kwargs.get("paint_budget", 0.008)
+
+        self.output = OutputMeter(kwargs.get("output_budget", None),
+                                  kwargs.get("output_burst",  None))
+
+        self.remote = kwargs.get("remote", self.output.budget is not None)
+
+        # Windows not visible at startup (hidden / off screen) are only
+        # materialized after the first frame, within this budget per frame.
+        self.pending_windows    = deque()
+        self.materialize_budget = 0.002
         
         (self.height, self.width) = stdscr.getmaxyx()
+
+        if self.remote :
+            stdscr.leaveok(True)
         
-        curses.mousemask(curses.ALL_MOUSE_EVENTS | curses.REPORT_MOUSE_POSITION)
-        curses.mouseinterval(0)
+        _backend.mousemask(curses.ALL_MOUSE_EVENTS | curses.REPORT_MOUSE_POSITION)
 
     def get_window_byName(self, name: str) -> Window :
 
@@ -521,50 +1870,150 @@ class WindowManager:
         
     def get_widget_byName(self, name: str) -> Widget :
 
-        window = None
+        #
+        # Hierarchical lookup "window/container/.../widget", resolved
+        # through the child name maps and cached until the widget tree
+        # changes.
+        #
+
+        if self.path_generation != WidgetList.generation :
+            self.path_index.clear()
+            self.path_generation = WidgetList.generation
+
+        if name in self.path_index :
+            return self.path_index[name]
+
         widget = None
-        
-        (window_str, widget_str) = name.split("/")
-        
-        if window_str and widget_str :                            
-            window = self.get_window_byName(window_str)
-            
-            if window :        
-                if widget_str in window.widget_names :
-                   widget = window.widget_names[widget_str]
-        
+        parts  = name.split("/")
+
+        if len(parts) > 1 and all(parts) :
+
+            node = self.get_window_byName(parts[0])
+
+            for part in parts[1:] :
+                if node is None or not hasattr(node, "get_child_by_name") :
+                    node = None
+                    break
+                node = node.get_child_by_name(part)
+
+            widget = node
+
+        self.path_index[name] = widget
+
         return widget
     
                    
-    def add_window(self, win: Window) -> Window:
+    def add_window(self, win: Window, activate: bool = True) -> Window:
         
         if win.name :           
            self.window[win.name] = win
-           
-        self.set_active_window(win)
+           WidgetList.generation += 1
 
         # Store a quick link to the window manager.
         win.window_manager = self
+
+        #
+        # Only what is visible is allocated (and activated) right away,
+        # the rest is materialized in the background after the first frame.
+        #
+
+        if win.on_screen(self.width, self.height) :
+            if activate :
+                self.set_active_window(win)
+            else :
+                win.materialize()
+        else :
+            self.pending_windows.append(win)
+            self.stats["pending"] = len(self.pending_windows)
         
         return win
 
+    def materialize_pending(self, budget: float) -> None:
+
+        deadline = time.monotonic() + budget
+
+        while self.pending_windows and time.monotonic() < deadline :
+
+            win = self.pending_windows.popleft()
+
+            if not win.materialized :
+                win.materialize()
+                if not win.hidden :
+                    win.panel.bottom()
+
+        self.stats["pending"] = len(self.pending_windows)
+
     def set_active_window(self, win: Window) -> None:        
 
         if self.active_window == win:
             return
 
+        #
+        # Only the chrome (active marker) changes, the panel library
+        # composes the stack, so no window repaints its widgets.
+        #
+
         if self.active_window:
             self.active_window.active = False
-            self.active_window.request_repaint()
+            self.active_window.request_chrome()
 
         self.active_window = win
         win.active = True
-        win.request_repaint()        
+        win.request_chrome()
         win.panel.top()
 
+    def remove_window(self, win: Window) -> None:
+
+        if win.name and self.window.get(win.name) is win :
+            del self.window[win.name]
+            WidgetList.generation += 1
+
+        if win in self.pending_windows :
+            self.pending_windows.remove(win)
+            self.stats["pending"] = len(self.pending_windows)
+
+        if win in self.modal :
+            self.modal.remove(win)
+
+        win.release()
+        win.window_manager = None
+
+        if self.active_window is win :
+
+            self.active_window = None
+
+            stack = self.modal or list(self.windows())
+            top   = stack[-1] if stack else None
+
+            if top is not None :
+                self.set_active_window(top)
+
+    def push_modal(self, win: Window) -> None:
+
+        # win takes all keyboard and mouse input until pop_modal.
+
+        self.modal.append(win)
+        self.set_active_window(win)
+
+    def pop_modal(self, win: Window) -> None:
+        if win in self.modal :
+            self.modal.remove(win)
+
+    def windows(self) :
+
+        # Every window in the panel stack, bottom to top.
+
+        panel = _backend.bottom_panel()
+
+        while panel :
+            win = panel.userptr()
+            if isinstance(win, Window) :
+                yield win
+            panel = panel.above()
+
     def get_window_at(self, x: int, y: int) -> Optional[Window]:
 
-        panel = curses.panel.top_panel()
+        panel = _backend.top_panel()
 
         while panel:
             
@@ -580,111 +2029,289 @@ class WindowManager:
 
         return None
     
+    def add_tick_handler(self, handler: Callable[[], Any]) -> None:
+        self.tick_handlers.append(handler)
+
+    def remove_tick_handler(self, handler: Callable[[], Any]) -> None:
+        if handler in self.tick_handlers :
+            self.tick_handlers.remove(handler)
+
     def event_loop(self) -> None:
 
         self.stdscr.nodelay(True)
-        curses.curs_set(0)
+        _backend.curs_set(0)
         self.running = True
 
-        while self.running:
-            
-            frame_start = time.monotonic()
-            
-            key = self.stdscr.getch()
+        try :
 
-            while key != -1:
+            while self.running:
 
-                #
-                # MOUSE EVENTS
-                #
-                # Determine which window the X,Y Coordinates occurred, by 
-                # searching Top to bottom of the panel stack.. then
-                # subtract the windows x, y and pass the relative coordinates
-                # into the windows handle_mouse interface.
-                #
-                
-                if key == curses.KEY_MOUSE:                
-                    try:
-                        _, mx, my, _, bstate = curses.getmouse()
-                        win = self.get_window_at(mx, my)
-                        if win:
-                            self.set_active_window(win)
-                            local_x = mx - win.x
-                            local_y = my - win.y
-                            win.handle_mouse(local_x, local_y, bstate)
-
-                    except curses.error:
-                        # Invalid mouse event — ignore but KEEP DRAINING
-                        pass
-
-                #
-                # TERMINAL RESIZE
-                #
-                # Get the new size, and interate through the panel stack
-                # from bottom to top, and call their resize handlers.
-                #
-                
-                if key == curses.KEY_RESIZE :
-                    
-                    self.height, self.width = self.stdscr.getmaxyx()
+                frame_start = time.monotonic()
 
-                    panel = curses.panel.bottom_panel()       # start at true bottom
+                self.run_frame()
 
-                    while panel:
-                        
-                        win_obj = panel.userptr()
+                 # === 4. FPS LIMIT ===
+                elapsed = time.monotonic() - frame_start
+                target = 1.0 / 60.0
+
+                if elapsed < target:
+                    time.sleep(target - elapsed)
+
+        finally :
+            self.output.close()
+
+    def bind_key(self, keys, action: Callable[[], Any]) -> None:
+        self.keymap.bind(keys, action)
+
+    def dispatch_key(self, key: int) -> bool:
 
-                        if win_obj and isinstance(win_obj, Window):
-                            win_obj.handle_resize(self.width, self.height)
+        #
+        # The window taking input is the top modal one, or the active one.
+        # The key (with the chord typed so far) is looked up in the keymaps
+        # of its focus chain, innermost first, then offered to handle_key
+        # down that chain only, and last looked up in the global keymap.
+        # The cost is set by the depth of the focus chain, not by the
+        # number of widgets; unbound keys touch no other widget.
+        #
+
+        now = time.monotonic()
+
+        if self.chord and now - self.chord_time > self.chord_timeout :
+            self.chord = ()
+
+        seq        = self.chord + (key,)
+        self.chord = ()
+
+        target = self.modal[-1] if self.modal else self.active_window
+        chain  = target.focus_chain() if target is not None else []
+
+        for scope in chain :
+
+            if scope.keymap is not None :
+
+                action = scope.keymap.lookup(seq)
+
+                if action is not None :
+                    return self.run_binding(seq, action, now)
+
+        if len(seq) == 1 and target is not None and target.handle_key(key) :
+            return True
+
+        action = self.keymap.lookup(seq)
+
+        if action is not None :
+            return self.run_binding(seq, action, now)
+
+        return False
+
+    def run_binding(self, seq: tuple, action, now: float) -> bool:
+
+        if action is Keymap.PREFIX :
+            self.chord      = seq
+            self.chord_time = now
+        else :
+            action()
+
+        return True
+
+    def paint_windows(self, deadline: float) -> tuple[int, int]:
+
+        #
+        # Dirty windows (painted whole) and dirty widgets go through one
+        # priority queue, painted until the deadline; the rest stays dirty
+        # for the next frame.  The active window comes first, then windows
+        # with a positive priority and faulted widgets (paint_priority).
+        # Each step of priority is worth _PAINT_AGING frames of waiting, so
+        # a storm on the active window does not starve the others.
+        #
+        # Returns (windows painted, windows and widgets left).
+        #
+
+        Window.frame += 1
+
+        # Over the output budget only the active and priority windows are drawn.
+        throttle = self.output.over_budget()
+
+        queue = []
+        held  = 0
+        panel = _backend.bottom_panel()
+
+        while panel :
+
+            win   = panel.userptr()
+            panel = panel.above()
+
+            if not win :
+                continue
+
+            whole = win.needs_repaint or win.chrome_dirty
 
-                        panel = panel.above()
+            if not whole and not win.dirty :
+                continue
 
-                #
-                # EVERY OTHER KEY
-                #
+            boost = 2 * win.active + (win.priority > 0)
+
+            if throttle and not boost :
+                held += 1
+                continue
+
+            if whole :
+                queue.append((win.dirty_frame - _PAINT_AGING * boost, len(queue), win, None))
+
+            if not win.needs_repaint :
+                for widget, frame in win.dirty.items() :
+                    rank = frame - _PAINT_AGING * (boost + widget.paint_priority())
+                    queue.append((rank, len(queue), win, widget))
+
+        heapq.heapify(queue)
+
+        paints  = 0
+        widgets = 0
+
+        while queue :
+
+            (_, _, win, widget) = heapq.heappop(queue)
+
+            if widget is None :
+                paints += win.needs_repaint
+                win.paint()
+            else :
+                widgets += 1
+                win.paint_widget(widget)
+
+            if time.monotonic() >= deadline :
+                break
+
+        self.stats["widget_paints"] += widgets
+
+        return (paints, held + len(queue))
+
+    def run_frame(self) -> None:
+
+        frame_start = time.monotonic()
+
+        key = self.stdscr.getch()
+
+        while key != -1:
+
+            #
+            # MOUSE EVENTS
+            #
+            # Determine which window the X,Y Coordinates occurred, by 
+            # searching Top to bottom of the panel stack.. then
+            # subtract the windows x, y and pass the relative coordinates
+            # into the windows handle_mouse interface.
+            #
+            
+            if key == curses.KEY_MOUSE:                
+                try:
+                    _, mx, my, _, bstate = _backend.getmouse()
+                    win = self.get_window_at(mx, my)
+                    if self.modal and win is not self.modal[-1] :
+                        win = None
+                    if win:
+                        self.set_active_window(win)
+                        local_x = mx - win.x
+                        local_y = my - win.y
+                        win.handle_mouse(local_x, local_y, bstate)
+
+                except curses.error:
+                    # Invalid mouse event — ignore but KEEP DRAINING
+                    pass
+
+            #
+            # TERMINAL RESIZE
+            #
+            # Get the new size, and interate through the panel stack
+            # from bottom to top, and call their resize handlers.
+            #
+            
+            elif key == curses.KEY_RESIZE :
                 
-                elif self.active_window:
-                    self.active_window.handle_key(key)
+                self.height, self.width = self.stdscr.getmaxyx()
+
+                panel = _backend.bottom_panel()       # start at true bottom
+
+                while panel:
                     
-                # Always get next key — even after error
-                key = self.stdscr.getch()
+                    win_obj = panel.userptr()
 
+                    if win_obj and isinstance(win_obj, Window):
+                        win_obj.handle_resize(self.width, self.height)
+
+                    panel = panel.above()
+
+            #
+            # EVERY OTHER KEY
+            #
+            
+            else :
+                self.dispatch_key(key)
                 
-            # Call all the paint routines.
+            # Always get next key — even after error
+            key = self.stdscr.getch()
+
+            
+        # Call all the paint routines.
+
+        (paints, deferred) = self.paint_windows(frame_start + self.paint_budget)
             
-            panel = curses.panel.bottom_panel()
+        # Refresh the actual screen.
+        _backend.update_panels()
+
+        self.stdscr.noutrefresh()
+
+        self.output.begin()
+        _backend.doupdate()
+        self.output.end()
+
+        if self.stats["first_frame"] is None :
+            self.stats["first_frame"] = time.monotonic() - _START_TIME
+            logger.info("first frame after %.3f s", self.stats["first_frame"])
+
+        elif self.pending_windows :
+            self.materialize_pending(self.materialize_budget)
+
+        #
+        # Time for a system Tick 1/10 sec
+        #
+        
+        tick_start = time.monotonic()
+
+        if (tick_start - self.last_tick) >= (0.100) :
 
+            if self.last_tick :
+                self.stats["tick_lag"] = tick_start - self.last_tick - 0.100
+
+            self.last_tick = tick_start
+            self.stats["ticks"] += 1
+
+            panel = _backend.bottom_panel()
             while panel :
                 win = panel.userptr()
                 if win :
-                   win.paint()
+                    win.handle_tick()
                 panel = panel.above()
-                
-            # Refresh the actual screen.
-            curses.panel.update_panels()
 
-            self.stdscr.noutrefresh()
-            curses.doupdate()
+            for handler in self.tick_handlers :
+                handler()
 
-            #
-            # Time for a system Tick 1/10 sec
-            #
-            
-            if (time.monotonic() - self.last_tick) >= (0.100) :
-                self.last_tick = time.monotonic()
-                panel = curses.panel.bottom_panel()
-                while panel :
-                    win = panel.userptr()
-                    if win :
-                        win.handle_tick()
-                    panel = panel.above()
+        #
+        # Loop health
+        #
+
+        frame_time = time.monotonic() - frame_start
 
-             # === 4. FPS LIMIT ===
-            elapsed = time.monotonic() - frame_start
-            target = 1.0 / 60.0
+        stats = self.stats
+        stats["frames"]        += 1
+        stats["paints"]        += paints
+        stats["frame_time"]     = frame_time
+        stats["frame_time_max"] = max(stats["frame_time_max"], frame_time)
 
-            if elapsed < target:
-                time.sleep(target - elapsed)
+        stats["output_bytes"]   = self.output.frame_bytes
+        stats["output_total"]   = self.output.total_bytes
+        stats["output_rate"]    = self.output.rate
+        stats["deferred"]       = deferred
 
 # ----------------------------------------------------------------------
 # Widget Button
@@ -692,9 +2319,11 @@ class WindowManager:
 
 class Button(Widget):
 
+    focusable = True
+
     def __init__(self, x: int, y: int, width: int, **kwargs) :
 
-        super().__init__(x, y, width)
+        super().__init__(x, y, width, **kwargs)
 
         self.text         = kwargs.get("text",               "")
 
@@ -758,7 +2387,7 @@ class Button(Widget):
     def handle_key(self, key: int) -> bool:
 
         if key in (curses.KEY_ENTER, ord('\n'), ord(' ')) and self.focused:
-            self.on_click()
+            self.click()
             self.request_repaint()
             return True
         return False
@@ -794,6 +2423,48 @@ class Button(Widget):
                     
         return result
                         
+# ----------------------------------------------------------------------
+# Precompiled formats and comparisons
+# ----------------------------------------------------------------------
+#
+# Format specs and threshold comparisons are turned into callables once
+# per widget; the widgets then cache the rendered text per value, so
+# repainting a value that was already shown is a dict lookup.
+#
+
+_RENDER_CACHE_SIZE = 256
+
+_COMPARISONS = {
+        "LT":  operator.lt,   "<":  operator.lt,
+        "LTE": operator.le,   "<=": operator.le,
+        "GT":  operator.gt,   ">":  operator.gt,
+        "GTE": operator.ge,   ">=": operator.ge,
+    }
+
+def compile_format(fmt: str) -> Callable[[Any], str]:
+
+    if not fmt :
+        return str
+
+    return ("{:" + fmt.replace("{", "{{").replace("}", "}}") + "}").format
+
+
+def compile_comparison(comparison: str, threshold) -> Callable[[Any], bool]:
+
+    # Only numeric values can fault; unknown comparisons test equality.
+
+    op = _COMPARISONS.get(comparison)
+
+    if op is None :
+        return lambda value: isinstance(value, (int, float)) and value == threshold
+
+    try :
+        limit = float(threshold)
+    except (TypeError, ValueError) :
+        return lambda value: False
+
+    return lambda value: isinstance(value, (int, float)) and op(value, limit)
+
 # ----------------------------------------------------------------------
 # Widget StatusLabel
 # ----------------------------------------------------------------------
@@ -828,6 +2499,13 @@ class StatusLabel(Widget):
         self.normal_color = None
         self.fault_color  = None
         self.units_color  = None
+
+        self.formatter    = compile_format(self.fmt)
+        self.faulted      = compile_comparison(self.comparison, self.threshold)
+        self.render_cache = {}      # (type, value) -> (text, style)
+
+        # Alarm level pushed by an alarms.AlarmEngine, overrides the threshold.
+        self.alarm        = None
         
     def set_value(self, value):
 
@@ -842,49 +2520,58 @@ class StatusLabel(Widget):
 
     def set_units(self, value) :
         self.units = value
+
+    def paint_priority(self) -> int:
+
+        # Faults (alarm or threshold) are painted first under load.
+        return 1 if self.alarm or self.faulted(self.value) else 0
+
+    def set_alarm(self, level: Optional[int]) -> None:
+
+        # Only a change of alarm state repaints.
+
+        if level != self.alarm :
+            self.alarm = level
+            self.request_repaint()
         
     def get_value(self) :
         return self.value
 
-    def _compare_values(self) :
+    def set_format(self, fmt: str) -> None:
 
-        faulted = False
+        self.fmt       = fmt
+        self.formatter = compile_format(fmt)
+        self.render_cache.clear()
+        self.request_repaint()
 
-        # &= BAE  Bitwise AND and Equal
-        # |= BOE  Bitwise OR and equal
-        #
-        # Faulted text, normal text
-        #
-        
-        if isinstance(self.value, (int, float)) :
+    def set_threshold(self, threshold, comparison: Optional[str] = None) -> None:
 
-            if self.comparison == "LT" or self.comparison == "<" :
-                faulted = float(self.value) < float(self.threshold)
+        self.threshold = threshold
 
-            elif self.comparison == "LTE" or self.comparison == "<=" :
-                faulted = float(self.value) <= float(self.threshold)
-                
-            elif self.comparison == "GT" or self.comparison == ">" :
-                faulted = float(self.value) > float(self.threshold)
+        if comparison is not None :
+            self.comparison = comparison
 
-            elif self.comparison == "GTE" or self.comparison == ">=" :
-                faulted = float(self.value) >= float(self.threshold)
-                
-            else :
-                faulted = self.value == self.threshold
+        self.faulted = compile_comparison(self.comparison, self.threshold)
+        self.render_cache.clear()
+        self.request_repaint()
 
-        return faulted
+    def metrics(self) -> dict:
+        if isinstance(self.value, (int, float)) :
+            return {"widget_value": self.value}
+        return {}
 
-    
-    def paint(self, win):
+    def _compare_values(self) :
+        return self.faulted(self.value)
 
-        # Set Value...
-        txt = f"{self.value:{self.fmt}}"
+    def render(self, value) -> tuple[str, int]:
 
-        # detect fault.
+        txt   = self.formatter(value)
+        style = self.fault_color if self.faulted(value) else self.normal_color
+
+        return (txt, style)
+    
+    def paint(self, win):
 
-        faulted = self._compare_values()
-        
         # First Time Color Init
         
         if self.fault_color == None :
@@ -895,13 +2582,32 @@ class StatusLabel(Widget):
 
         if self.units_color == None :
             self.units_color = cm(self.units_fg, self.units_bg, self.units_att)
-            
-        # Get Style
 
-        if faulted :
-            style = self.fault_color
-        else :
-            style = self.normal_color
+        # Text and style, cached per value (1 and 1.0 format differently).
+
+        value = self.value
+        key   = (value.__class__, value)
+
+        try :
+            entry = self.render_cache.get(key)
+        except TypeError :
+            key = entry = None
+
+        if entry is None :
+
+            entry = self.render(value)
+
+            if key is not None :
+                if len(self.render_cache) >= _RENDER_CACHE_SIZE :
+                    self.render_cache.clear()
+                self.render_cache[key] = entry
+
+        (txt, style) = entry
+
+        if self.alarm is not None :
+            style = self.fault_color if self.alarm else self.normal_color
+
+        self.painted_width = len(txt) + len(f"{self.units}")
 
         try:
 
@@ -949,40 +2655,111 @@ class ProgressBar(Widget):
         self.critical_bg    = kwargs.get("critical_background", "black")
         self.critical_att   = kwargs.get("critical_attribute",  "default")
         self.critical_color = None
+
+        self.formatter     = compile_format(self.fmt)
+        self.render_cache  = {}     # (type, value, width) -> (bar, style)
+
+        # Alarm level (0, 1, 2) pushed by an alarms.AlarmEngine, overrides the thresholds.
+        self.alarm         = None
         
     def set_value(self, value: float):
         
         self.value = max(self.minimum, min(self.maximum, value))
         self.request_repaint()
 
-    def paint(self, win):
+    def set_format(self, fmt: str) -> None:
+
+        self.fmt       = fmt
+        self.formatter = compile_format(fmt)
+        self.render_cache.clear()
+        self.request_repaint()
+
+    def set_range(self, minimum: float, maximum: float) -> None:
+
+        self.minimum = minimum
+        self.maximum = maximum
+        self.value   = max(minimum, min(maximum, self.value))
+        self.render_cache.clear()
+        self.request_repaint()
+
+    def set_thresholds(self, warning, critical, invert: Optional[bool] = None) -> None:
+
+        self.warning_threshold  = warning
+        self.critical_threshold = critical
+
+        if invert is not None :
+            self.invert_threshold = invert
+
+        self.render_cache.clear()
+        self.request_repaint()
+
+    def set_show_value(self, show_value: bool) -> None:
+
+        self.show_value = show_value
+        self.render_cache.clear()
+        self.request_repaint()
+
+    def set_chars(self, fill_char: str, empty_char: str) -> None:
+
+        self.fill_char  = fill_char
+        self.empty_char = empty_char
+        self.render_cache.clear()
+        self.request_repaint()
+
+    def set_alarm(self, level: Optional[int]) -> None:
+
+        if level != self.alarm :
+            self.alarm = level
+            self.request_repaint()
+
+    def metrics(self) -> dict:
+        return {"widget_value": self.value}
+
+    def level(self, value) -> int:
+
+        # 0 normal, 1 warning, 2 critical
+
+        if self.invert_threshold :
+            if value < self.critical_threshold :
+                return 2
+            if value < self.warning_threshold :
+                return 1
+        else :
+            if value >= self.critical_threshold :
+                return 2
+            if value >= self.warning_threshold :
+                return 1
+
+        return 0
+
+    def render(self, value, width: int) -> tuple[str, int]:
 
         # Clamp value to range
-        work_value = max(self.minimum, min(self.value, self.maximum))
+        work_value = max(self.minimum, min(value, self.maximum))
 
-        # Compute Relative, abs value range...
+        # Compute Relative, abs value range (an empty range shows empty)...
         relative_range = self.maximum - self.minimum
+        fraction       = (work_value - self.minimum) / relative_range if relative_range > 0 else 0.0
 
         # Adjust for Text if needed.        
         if self.show_value :
-            bar_text  = f" {self.value:{self.fmt}} "
-            bar_width = self.width - len(bar_text)
+            bar_text  = f" {self.formatter(value)} "
+            bar_width = width - len(bar_text)
         else :
             bar_text  = ""
-            bar_width = self.width
-            
-        # Get bar relative value
-        bar_value = (work_value - self.minimum) / relative_range
-        
+            bar_width = width
+
         # Convert fraction to number of filled characters
-        filled_length = round(bar_value * bar_width)
-        
-        # Build the bar
-        filled  = self.fill_char * filled_length
-        empty   = self.empty_char * (bar_width - filled_length)
+        filled_length = round(fraction * bar_width)
+
+        bar = self.fill_char * filled_length + self.empty_char * (bar_width - filled_length) + bar_text
+
+        style = (self.normal_color, self.warning_color, self.critical_color)[self.level(value)]
+
+        return (bar, style)
+
+    def paint(self, win):
 
-        bar = filled + empty + bar_text
-        
         #
         # Init the colors on first pass
         #
@@ -995,25 +2772,27 @@ class ProgressBar(Widget):
 
         if self.critical_color == None :
            self.critical_color = cm(self.critical_fg, self.critical_bg, self.critical_att)
-           
+
         #
-        # Select the proper Color
+        # Bar text and colour, cached per value and width
         #
 
-        if self.invert_threshold :
-            if self.value < self.critical_threshold :        
-                style = self.critical_color
-            elif self.value < self.warning_threshold :
-                style = self.warning_color
-            else :
-                style = self.normal_color
-        else :                
-            if self.value >= self.critical_threshold :        
-                style = self.critical_color
-            elif self.value >= self.warning_threshold :
-                style = self.warning_color
-            else :
-                style = self.normal_color
+        key   = (self.value.__class__, self.value, self.width)
+        entry = self.render_cache.get(key)
+
+        if entry is None :
+
+            entry = self.render(self.value, self.width)
+
+            if len(self.render_cache) >= _RENDER_CACHE_SIZE :
+                self.render_cache.clear()
+
+            self.render_cache[key] = entry
+
+        (bar, style) = entry
+
+        if self.alarm is not None :
+            style = (self.normal_color, self.warning_color, self.critical_color)[min(2, int(self.alarm))]
 
         #
         # Do the draw...
@@ -1024,4 +2803,3 @@ class ProgressBar(Widget):
             
         except curses.error:
             pass
-                     
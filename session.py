@@ -0,0 +1,322 @@
+import os
+import json
+import time
+import zlib
+import logging
+import tempfile
+import threading
+
+from typing import Optional
+
+from pytlm import Window
+from pytlm import WindowManager
+
+logger = logging.getLogger("Session")
+
+_FORMAT_VERSION = 1
+
+# ----------------------------------------------------------------------
+# Session - checkpoint and restore of a running dashboard
+# ----------------------------------------------------------------------
+#
+# Every interval the session takes a snapshot of the named windows
+# (geometry, hidden, focused widget), the active window, and the state of
+# every widget that has one (Widget.save_state: NetworkDevice counters,
+# Graph history, ...).  The snapshot is taken on the UI thread, only the
+# encoding (zlib compressed JSON) and the write happen on a writer
+# thread, to a temporary file renamed over the previous checkpoint, so a
+# crash at any point leaves a complete file.
+#
+# Widgets are identified by their path in the window, names where they
+# have one and indexes otherwise, plus their class name; a dashboard
+# that changed shape restores what still matches and ignores the rest.
+#
+
+def default_session_path() -> str:
+    base = os.environ.get("XDG_STATE_HOME") or os.path.join(os.path.expanduser("~"), ".local", "state")
+    return os.path.join(base, "pytlm", "session.z")
+
+
+def _walk(widgets, prefix: str = "") :
+
+    # (path, widget) for a widget list and all nested containers.
+
+    for index, widget in enumerate(widgets) :
+
+        path = f"{prefix}{widget.name or index}"
+
+        yield path, widget
+
+        children = getattr(widget, "children", None)
+
+        if children is not None :
+            yield from _walk(children, path + "/")
+
+
+class Session:
+
+    def __init__(self, wm: WindowManager, path: Optional[str] = None, **kwargs) :
+
+        #
+        #  kwargs :
+        #
+        #    interval    seconds between checkpoints (default: 30.0)
+        #    max_age     widget state older than this is not restored,
+        #                layout and focus always are (default: 600.0)
+        #
+
+        self.wm       = wm
+        self.path     = path or default_session_path()
+
+        self.interval = kwargs.get("interval", 30.0)
+        self.max_age  = kwargs.get("max_age",  600.0)
+
+        self.last_checkpoint = time.monotonic()
+
+        # Latest snapshot waiting for the writer (only the newest is kept).
+        self.pending  = None
+        self.cond     = threading.Condition()
+        self.writer   = None
+        self.running  = False
+
+    # ---- checkpoint -------------------------------------------------------
+
+    def snapshot(self) -> dict:
+
+        windows = {}
+        active  = self.wm.active_window
+
+        for name, win in self.wm.window.items() :
+
+            state = {}
+
+            for path, widget in _walk(win.widgets) :
+
+                saved = widget.save_state()
+
+                if saved is not None :
+                    state[path] = [type(widget).__name__, saved]
+
+            windows[name] = {
+                "geometry": [win.x, win.y, win.width, win.height],
+                "hidden":   win.hidden,
+                "focus":    self.focus_path(win),
+                "widgets":  state,
+            }
+
+        return {
+            "version": _FORMAT_VERSION,
+            "time":    time.time(),
+            "active":  active.name if active is not None else None,
+            "windows": windows,
+        }
+
+    def focus_path(self, win: Window) -> Optional[list]:
+
+        # Path of the focus chain, as indexes from the window down.
+
+        path   = []
+        parent = win.widgets
+        w      = win.focused_widget
+
+        while w is not None and parent is not None and w in parent :
+            path.append(list(parent).index(w))
+            parent = getattr(w, "children", None)
+            w      = getattr(w, "focused_child", None)
+
+        return path or None
+
+    def checkpoint(self) -> None:
+
+        state = self.snapshot()
+
+        if self.writer is None :
+            self.write(self.encode(state))
+            return
+
+        with self.cond :
+            self.pending = state
+            self.cond.notify()
+
+    def handle_tick(self) -> None:
+
+        now = time.monotonic()
+
+        if now - self.last_checkpoint >= self.interval :
+            self.last_checkpoint = now
+            self.checkpoint()
+
+    # ---- writer -----------------------------------------------------------
+
+    @staticmethod
+    def encode(state: dict) -> bytes:
+        return zlib.compress(json.dumps(state, separators=(",", ":")).encode(), 6)
+
+    def write(self, payload: bytes) -> None:
+
+        directory = os.path.dirname(self.path) or "."
+
+        try :
+            os.makedirs(directory, exist_ok=True)
+
+            # Write and rename, a restart never sees half a checkpoint.
+            (fd, tmp) = tempfile.mkstemp(dir=directory, suffix=".tmp")
+
+            try :
+                with os.fdopen(fd, "wb") as f :
+                    f.write(payload)
+                os.replace(tmp, self.path)
+            except BaseException :
+                os.unlink(tmp)
+                raise
+
+        except OSError as e :
+            logger.warning("Cannot write session %s : %s", self.path, e)
+
+    def run_writer(self) -> None:
+
+        while True :
+
+            with self.cond :
+
+                while self.pending is None and self.running :
+                    self.cond.wait()
+
+                (state, self.pending) = (self.pending, None)
+
+                if state is None :
+                    return
+
+            self.write(self.encode(state))
+
+    def start(self) -> None:
+
+        # Restore, then checkpoint on the system ticks of the manager.
+
+        self.restore()
+
+        self.running = True
+        self.writer  = threading.Thread(target=self.run_writer, name="Session", daemon=True)
+        self.writer.start()
+
+        self.wm.add_tick_handler(self.handle_tick)
+
+    def close(self) -> None:
+
+        # Final checkpoint, written before returning.
+
+        self.wm.remove_tick_handler(self.handle_tick)
+
+        if self.writer is not None :
+
+            with self.cond :
+                self.running = False
+                self.cond.notify()
+
+            self.writer.join()
+            self.writer = None
+
+        self.checkpoint()
+
+    # ---- restore ----------------------------------------------------------
+
+    def load(self) -> Optional[dict]:
+
+        try :
+            with open(self.path, "rb") as f :
+                state = json.loads(zlib.decompress(f.read()))
+        except FileNotFoundError :
+            return None
+        except (OSError, zlib.error, ValueError) as e :
+            logger.warning("Ignoring session %s : %s", self.path, e)
+            return None
+
+        if not isinstance(state, dict) or state.get("version") != _FORMAT_VERSION :
+            return None
+
+        return state
+
+    def restore(self) -> bool:
+
+        #
+        # Applies the last checkpoint to the windows added so far; call it
+        # once the dashboard is built, before the first frame.
+        #
+
+        state = self.load()
+
+        if state is None :
+            return False
+
+        fresh = time.time() - state.get("time", 0) <= self.max_age
+
+        for name, saved in state.get("windows", {}).items() :
+
+            win = self.wm.get_window_byName(name)
+
+            if win is None :
+                continue
+
+            self.restore_window(win, saved, fresh)
+
+        active = self.wm.get_window_byName(state.get("active") or "")
+
+        if active is not None and active.materialized and not active.hidden :
+            self.wm.set_active_window(active)
+
+        logger.info("Session restored from %s (%s)", self.path,
+                    "with widget state" if fresh else "layout only")
+
+        return True
+
+    def restore_window(self, win: Window, saved: dict, fresh: bool) -> None:
+
+        (x, y, width, height) = saved.get("geometry", (win.x, win.y, win.width, win.height))
+
+        win.resize(width, height)
+
+        if win.materialized :
+            win.move(x, y)
+        else :
+            (win.x, win.y) = (x, y)
+
+        if saved.get("hidden") and not win.hidden :
+            win.hide()
+        elif not saved.get("hidden") and win.hidden and win.materialized :
+            win.show()
+
+        if fresh :
+
+            widgets = saved.get("widgets", {})
+
+            for path, widget in _walk(win.widgets) :
+
+                entry = widgets.get(path)
+
+                if entry is not None and entry[0] == type(widget).__name__ :
+                    try :
+                        widget.restore_state(entry[1])
+                    except (KeyError, TypeError, ValueError) as e :
+                        logger.warning("Cannot restore %s/%s : %s", win.name, path, e)
+
+        self.restore_focus(win, saved.get("focus"))
+
+    def restore_focus(self, win: Window, path: Optional[list]) -> None:
+
+        owner    = win
+        children = list(win.widgets)
+
+        for index in path or () :
+
+            if not isinstance(index, int) or index >= len(children) :
+                return
+
+            widget = children[index]
+
+            if not widget.focusable :
+                return
+
+            owner.set_focus(widget)
+
+            owner    = widget
+            children = list(getattr(widget, "children", None) or ())
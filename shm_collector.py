@@ -0,0 +1,365 @@
+import os
+import time
+import struct
+import logging
+import multiprocessing
+
+from collections.abc import Mapping
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional
+
+import procfs
+
+logger = logging.getLogger("ShmCollector")
+
+# ----------------------------------------------------------------------
+# SnapshotRing - latest snapshot in shared memory, guarded by a seqlock
+# ----------------------------------------------------------------------
+#
+#   header : seq (Q)  latest slot (I)  slots (I)
+#   slot   : seq (Q)  length (I)  pad (I)  payload[slot_size - 16]
+#
+# The writer fills the slot after the latest one, with the slot sequence
+# odd while it writes, and then publishes it as the latest.  Readers
+# never lock: they copy the latest payload and retry if the slot sequence
+# was odd or changed under them.  With several slots a reader is only
+# raced when the writer laps the whole ring during one copy.
+#
+
+_HEADER = struct.Struct("QII")
+_SLOT   = struct.Struct("QII")
+
+
+class SnapshotRing:
+
+    def __init__(self, name: Optional[str] = None, **kwargs) :
+
+        #
+        #  kwargs (creating side only) :
+        #
+        #    slots       number of slots (default: 4)
+        #    slot_size   bytes per slot (default: 256 KiB)
+        #
+
+        if name is None :
+            self.slots     = kwargs.get("slots",     4)
+            self.slot_size = kwargs.get("slot_size", 262144)
+            self.shm       = shared_memory.SharedMemory(create=True,
+                                                        size=_HEADER.size + self.slots * self.slot_size)
+            self.owner     = True
+            _HEADER.pack_into(self.shm.buf, 0, 0, 0, self.slots)
+        else :
+            self.shm       = shared_memory.SharedMemory(name=name)
+            self.owner     = False
+            self.slots     = _HEADER.unpack_from(self.shm.buf, 0)[2]
+            self.slot_size = (self.shm.size - _HEADER.size) // self.slots
+
+        self.name = self.shm.name
+
+    def offset(self, slot: int) -> int:
+        return _HEADER.size + slot * self.slot_size
+
+    def write(self, payload: bytes) -> None:
+
+        buf = self.shm.buf
+
+        if len(payload) > self.slot_size - _SLOT.size :
+            raise ValueError(f"snapshot of {len(payload)} bytes does not fit a slot")
+
+        (seq, latest, slots) = _HEADER.unpack_from(buf, 0)
+
+        slot   = (latest + 1) % slots
+        offset = self.offset(slot)
+
+        slot_seq = _SLOT.unpack_from(buf, offset)[0]
+
+        _SLOT.pack_into(buf, offset, slot_seq + 1, 0, 0)            # odd: writing
+        buf[offset + _SLOT.size:offset + _SLOT.size + len(payload)] = payload
+        _SLOT.pack_into(buf, offset, slot_seq + 2, len(payload), 0)
+
+        _HEADER.pack_into(buf, 0, seq + 1, slot, slots)
+
+    def sequence(self) -> int:
+        return _HEADER.unpack_from(self.shm.buf, 0)[0]
+
+    def read(self, retries: int = 8) -> Optional[bytes]:
+
+        # Latest payload (a copy), None when nothing was published yet.
+
+        buf = self.shm.buf
+
+        for _ in range(retries) :
+
+            (seq, latest, slots) = _HEADER.unpack_from(buf, 0)
+
+            if seq == 0 :
+                return None
+
+            offset = self.offset(latest)
+
+            (before, length, _) = _SLOT.unpack_from(buf, offset)
+
+            if before & 1 :
+                continue
+
+            payload = bytes(buf[offset + _SLOT.size:offset + _SLOT.size + length])
+
+            if _SLOT.unpack_from(buf, offset)[0] == before :
+                return payload
+
+        return None
+
+    def close(self) -> None:
+
+        self.shm.close()
+
+        if self.owner :
+            try :
+                self.shm.unlink()
+            except FileNotFoundError :
+                pass
+
+# ----------------------------------------------------------------------
+# Table snapshots
+# ----------------------------------------------------------------------
+#
+# A parsed procfs sample is encoded as
+#
+#   time (d)  rows (I)  width (I)  names length (I)  kind (I)
+#   names, "\n" separated, padded to 8 bytes
+#   rows * width counters (Q)
+#
+# so the reader needs no parsing at all: the counters are a memoryview
+# cast over the copied payload, and the names are only decoded again
+# when they change.  The kind gives the shape the parser returned :
+#
+#   _ROWS     name -> tuple of ints    /proc/net/dev, /proc/stat, ...
+#   _VALUES   name -> int              /proc/meminfo
+#   _MATRIX   tuple of int tuples      /proc/net/softnet_stat (no names)
+#   _SCALAR   int                      /sys/class/net/... files
+#
+
+_TABLE = struct.Struct("dIIII")
+
+(_ROWS, _VALUES, _MATRIX, _SCALAR) = range(4)
+
+
+def encode_table(stamp: float, table) -> bytes:
+
+    # TypeError for any other shape.
+
+    if isinstance(table, int) :
+        (kind, names, rows) = (_SCALAR, [], [(table,)])
+
+    elif isinstance(table, (tuple, list)) :
+        (kind, names, rows) = (_MATRIX, [], [tuple(row) for row in table])
+
+    elif isinstance(table, Mapping) :
+
+        values = list(table.values())
+
+        if all(isinstance(v, int) for v in values) :
+            (kind, rows) = (_VALUES, [(v,) for v in values])
+        else :
+            (kind, rows) = (_ROWS, [tuple(v) for v in values])
+
+        names = list(table)
+
+    else :
+        raise TypeError(f"cannot encode a {type(table).__name__}")
+
+    names = "\n".join(names).encode()
+    width = max((len(row) for row in rows), default=0)
+
+    counters = []
+
+    for row in rows :
+        counters.extend(row)
+        counters.extend((0,) * (width - len(row)))
+
+    pad = -len(names) % 8
+
+    return b"".join((_TABLE.pack(stamp, len(rows), width, len(names), kind),
+                     names, b"\0" * pad,
+                     struct.pack(f"{len(counters)}Q", *counters)))
+
+
+class TableSnapshot(Mapping):
+
+    def __init__(self, names: List[str], index: Dict[str, int], width: int, counters: memoryview) :
+
+        self.names    = names
+        self.index    = index
+        self.width    = width
+        self.counters = counters
+
+    def __getitem__(self, name: str) -> tuple:
+        row = self.index[name] * self.width
+        return tuple(self.counters[row:row + self.width])
+
+    def __iter__(self) :
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class ValueSnapshot(TableSnapshot):
+
+    # name -> int, one counter per row.
+
+    def __getitem__(self, name: str) -> int:
+        return self.counters[self.index[name]]
+
+# ----------------------------------------------------------------------
+# Collector - worker processes sampling procfs into shared memory
+# ----------------------------------------------------------------------
+#
+# Each worker samples its share of the paths every interval and writes
+# them into one ring per path.  In the UI process the collector is a
+# drop-in source (sample / sample_time, like procfs.ProcReader):
+#
+#   collector = Collector(["/proc/net/dev"])
+#   collector.start()
+#   NetworkDevice(0, 0, 70, 5, device="eth0", source=collector)
+#
+
+def _collect(paths: List[str], rings: List[str], interval: float) -> None:
+
+    reader  = procfs.ProcReader(max_age=0)
+    targets = [(path, SnapshotRing(name)) for path, name in zip(paths, rings)]
+
+    parent  = os.getppid()
+    failed  = set()
+
+    while os.getppid() == parent :
+
+        start = time.monotonic()
+
+        for path, ring in targets :
+
+            # Whatever goes wrong with one path, the others go on (and
+            # the failure is only logged once per path).
+            try :
+                ring.write(encode_table(time.monotonic(), reader.sample(path)))
+                failed.discard(path)
+            except Exception as e :
+                if path not in failed :
+                    failed.add(path)
+                    logger.warning("Cannot collect %s : %s", path, e)
+
+        time.sleep(max(0.0, interval - (time.monotonic() - start)))
+
+
+class Collector:
+
+    def __init__(self, paths: List[str], **kwargs) :
+
+        #
+        #  kwargs :
+        #
+        #    workers     number of worker processes (default: 1)
+        #    interval    seconds between samples (default: 0.1)
+        #    slot_size   bytes per snapshot slot (default: 256 KiB)
+        #
+
+        self.paths     = list(paths)
+        self.workers   = kwargs.get("workers",   1)
+        self.interval  = kwargs.get("interval",  0.1)
+        self.slot_size = kwargs.get("slot_size", 262144)
+
+        self.rings: Dict[str, SnapshotRing] = {}
+        self.processes: List[multiprocessing.Process] = []
+
+        self.tables = {}        # path -> (sequence, names bytes, TableSnapshot, time)
+
+    def start(self) -> None:
+
+        for path in self.paths :
+            self.rings[path] = SnapshotRing(slot_size=self.slot_size)
+
+        # Paths are dealt round robin to the workers.
+
+        for index in range(min(self.workers, len(self.paths))) :
+
+            paths = self.paths[index::self.workers]
+            rings = [self.rings[p].name for p in paths]
+
+            process = multiprocessing.Process(target=_collect,
+                                              args=(paths, rings, self.interval),
+                                              name=f"Collector-{index}", daemon=True)
+            process.start()
+
+            self.processes.append(process)
+
+    def stop(self) -> None:
+
+        for process in self.processes :
+            process.terminate()
+            process.join()
+
+        for ring in self.rings.values() :
+            ring.close()
+
+        self.processes = []
+        self.rings     = {}
+        self.tables    = {}
+
+    def sample(self, path: str) :
+
+        #
+        #  Latest snapshot of path, shaped like the parser result (a read
+        #  only mapping for tables), an empty mapping until the first one
+        #  arrives.
+        #
+
+        ring  = self.rings[path]
+        entry = self.tables.get(path)
+
+        seq = ring.sequence()
+
+        if entry is not None and entry[0] == seq :
+            return entry[2]
+
+        payload = ring.read()
+
+        if payload is None :
+            return entry[2] if entry is not None else {}
+
+        (stamp, rows, width, names_len, kind) = _TABLE.unpack_from(payload, 0)
+
+        names_end = _TABLE.size + names_len
+        names_raw = payload[_TABLE.size:names_end]
+        start     = names_end + (-names_len % 8)
+
+        counters = memoryview(payload)[start:start + rows * width * 8].cast("Q")
+
+        if kind == _SCALAR :
+            table = counters[0]
+
+        elif kind == _MATRIX :
+            table = tuple(tuple(counters[r * width:(r + 1) * width]) for r in range(rows))
+
+        else :
+
+            if entry is not None and entry[1] == names_raw and isinstance(entry[2], TableSnapshot) :
+                (names, index) = (entry[2].names, entry[2].index)
+            else :
+                names = names_raw.decode().split("\n") if rows else []
+                index = {name: i for i, name in enumerate(names)}
+
+            snapshot = ValueSnapshot if kind == _VALUES else TableSnapshot
+
+            table = snapshot(names, index, width, counters)
+
+        self.tables[path] = (seq, names_raw, table, stamp)
+
+        return table
+
+    def sample_time(self, path: str) -> float:
+
+        # time.monotonic() (in the worker) of the latest snapshot of path.
+
+        entry = self.tables.get(path)
+
+        return entry[3] if entry is not None else 0.0
@@ -0,0 +1,477 @@
+import gc
+import os
+import sys
+import json
+import time
+import curses
+import random
+import logging
+import argparse
+import tracemalloc
+
+from array import array
+from collections import Counter
+from typing import List, Optional
+
+import pytlm
+import procfs
+
+from pytlm import Window, WindowManager, Container
+from pytlm import StatusLabel, ProgressBar, Button
+from headless import MemoryBackend, HeadlessScreen
+from netdev_widget import NetworkDevice
+from graph_widget import Graph
+from logview_widget import LogView
+
+logger = logging.getLogger("Soak")
+
+# ----------------------------------------------------------------------
+# Soak test - hours of dashboard life in minutes
+# ----------------------------------------------------------------------
+#
+# Drives a WindowManager on the headless backend with synthetic windows
+# and widgets (labels with thresholds, bars, buttons, nested containers,
+# network devices on a synthetic /proc/net/dev, graphs, log views),
+# random keys, clicks, window switches, resizes and data updates.
+#
+# Time is accelerated: time.monotonic is replaced by a clock advancing
+# frame_step seconds per frame, so intervals, ticks and rates behave as
+# in real time while frames run back to back.  Frame times are measured
+# on the real clock (perf_counter).
+#
+# Every sample_interval (simulated) seconds a sample records frame time
+# percentiles, RSS, live objects, garbage collections, traced memory
+# (with --tracemalloc) and the size of the colour pair table.  Once the
+# warmup is over, the first sample is the baseline; the run fails when
+# memory or latency drift past the thresholds.
+#
+#   python soak.py --hours 6
+#
+
+_MIB = 1024 * 1024
+
+_KEYS = (ord("\t"), curses.KEY_BTAB, curses.KEY_UP, curses.KEY_DOWN,
+         curses.KEY_PPAGE, curses.KEY_NPAGE, curses.KEY_HOME, curses.KEY_END,
+         ord(" "), 10, ord("x"), 24)
+
+_COLORS = ("default", "red", "green", "yellow", "blue", "magenta", "cyan", "white")
+
+
+class SoakClock:
+
+    # Stands in for time.monotonic while installed.
+
+    def __init__(self, step: float) :
+
+        self.step     = step
+        self.now      = time.monotonic()
+        self.original = None
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self) -> None:
+        self.now += self.step
+
+    def __enter__(self) :
+        self.original  = time.monotonic
+        time.monotonic = self.monotonic
+        return self
+
+    def __exit__(self, *exc) :
+        time.monotonic = self.original
+
+
+class SyntheticSource:
+
+    #
+    # A /proc/net/dev reader (see procfs.ProcReader) for NetworkDevice:
+    # counters of every device grow by a random amount per sample.
+    #
+
+    def __init__(self, clock: SoakClock, rng: random.Random, devices: List[str]) :
+
+        self.clock    = clock
+        self.rng      = rng
+        self.counters = {name: [0] * len(procfs.NET_DEV_FIELDS) for name in devices}
+
+    def sample(self, path: str) :
+
+        for counters in self.counters.values() :
+            for index in range(len(counters)) :
+                counters[index] += self.rng.randrange(1 << self.rng.randrange(1, 40))
+
+        return {name: tuple(counters) for name, counters in self.counters.items()}
+
+    def sample_time(self, path: str) -> float:
+        return self.clock.now
+
+
+def rss_bytes() -> int:
+
+    # Current resident set size (Linux), 0 elsewhere.
+
+    try :
+        with open("/proc/self/statm", "rb") as f :
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError) :
+        return 0
+
+
+def percentile(ordered, fraction: float) -> float:
+
+    if not ordered :
+        return 0.0
+
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def type_counts() -> Counter:
+    return Counter(type(o).__name__ for o in gc.get_objects())
+
+
+class Soak:
+
+    def __init__(self, **kwargs) :
+
+        #
+        #  kwargs :
+        #
+        #    duration            simulated seconds (default: 6 hours)
+        #    frame_step          simulated seconds per frame (default: 0.05)
+        #    sample_interval     simulated seconds between samples (default: 300)
+        #    warmup              simulated seconds before the baseline (default: 600)
+        #    windows             synthetic windows (default: 8)
+        #    labels              labels per window (default: 40)
+        #    width, height       initial screen size (default: 160 x 50)
+        #    seed                random seed (default: 1)
+        #    tracemalloc         trace Python allocations, slower (default: False)
+        #
+        #    max_rss_growth      bytes of RSS growth over the baseline (default: 32 MiB)
+        #    max_object_growth   relative growth of live objects (default: 0.10)
+        #    max_latency_ratio   p99 frame time over the baseline p99 (default: 3.0)
+        #    max_color_pairs     colour pairs allocated (default: 200)
+        #
+
+        self.duration        = kwargs.get("duration",        6 * 3600.0)
+        self.frame_step      = kwargs.get("frame_step",      0.05)
+        self.sample_interval = kwargs.get("sample_interval", 300.0)
+        self.warmup          = kwargs.get("warmup",          600.0)
+        self.window_count    = kwargs.get("windows",         8)
+        self.label_count     = kwargs.get("labels",          40)
+        self.width           = kwargs.get("width",           160)
+        self.height          = kwargs.get("height",          50)
+        self.trace           = kwargs.get("tracemalloc",     False)
+
+        self.max_rss_growth    = kwargs.get("max_rss_growth",    32 * _MIB)
+        self.max_object_growth = kwargs.get("max_object_growth", 0.10)
+        self.max_latency_ratio = kwargs.get("max_latency_ratio", 3.0)
+        self.max_color_pairs   = kwargs.get("max_color_pairs",   200)
+
+        self.rng     = random.Random(kwargs.get("seed", 1))
+        self.clock   = SoakClock(self.frame_step)
+
+        self.samples: List[dict] = []
+        self.baseline = None
+        self.baseline_types = None
+        self.failures: List[str] = []
+
+        self.frame_times = array("d")
+        self.frames      = 0
+
+        self.backend = None
+        self.screen  = None
+        self.wm      = None
+        self.labels: List[StatusLabel] = []
+        self.bars:   List[ProgressBar] = []
+        self.logs:   List[LogView]     = []
+        self.source  = None
+
+    # ---- synthetic dashboard ----------------------------------------------
+
+    def build(self) -> None:
+
+        self.backend = MemoryBackend(self.width, self.height)
+
+        pytlm.set_backend(self.backend)
+        pytlm.set_unicode_borders(True)
+
+        self.screen = HeadlessScreen(self.backend)
+        self.wm     = WindowManager(self.screen)
+
+        devices     = [f"eth{i}" for i in range(self.window_count)]
+        self.source = SyntheticSource(self.clock, self.rng, devices)
+
+        columns = 4
+        width   = self.width  // 2
+        height  = self.label_count // columns + 16
+
+        for index in range(self.window_count) :
+
+            win = Window((index % 3) * (self.width // 4), (index % 4) * 4, width, height,
+                         title=f"soak {index}", name=f"w{index}",
+                         border_style=("single", "rounded", "double", "heavy")[index % 4])
+
+            for n in range(self.label_count) :
+                label = StatusLabel(1 + (n % columns) * 18, 1 + n // columns, 16,
+                                    format=">8.2f", threshold=90, comparison=">=",
+                                    fault_foreground="white", fault_background="red")
+                self.labels.append(win.add_widget(label))
+
+            row = 1 + self.label_count // columns
+
+            self.bars.append(win.add_widget(ProgressBar(1, row, width - 2)))
+
+            box = win.add_widget(Container(1, row + 1, width - 2, 3, border_style="rounded"))
+            box.add_widget(Button(1, 1, 10, text="ok"))
+            box.add_widget(Button(12, 1, 10, text="cancel"))
+
+            device = win.add_widget(NetworkDevice(1, row + 4, min(70, width - 2), 5,
+                                                  device=devices[index], source=self.source,
+                                                  interval=1.0))
+
+            win.add_widget(Graph(1, row + 9, width - 2, 2, model=device.model, key="rx_bytes_rate"))
+
+            self.logs.append(win.add_widget(LogView(1, row + 11, width - 2, 3, max_lines=500)))
+
+            self.wm.add_window(win)
+
+    # ---- one frame --------------------------------------------------------
+
+    def drive(self) -> None:
+
+        rng = self.rng
+
+        # Data: a burst of label updates, now and then a storm.
+        for label in rng.sample(self.labels, min(len(self.labels), rng.choice((5, 5, 5, 200)))) :
+            label.set_value(rng.uniform(0, 100))
+
+        if rng.random() < 0.1 :
+            rng.choice(self.bars).set_value(rng.uniform(0, 100))
+
+        if rng.random() < 0.2 :
+            rng.choice(self.logs).append(f"{self.clock.now:.2f} event {rng.randrange(1 << 30)}\n")
+
+        # Input: keys, clicks (window switches), resizes.
+        if rng.random() < 0.2 :
+            self.screen.push_key(rng.choice(_KEYS))
+
+        if rng.random() < 0.05 :
+            self.screen.push_mouse(rng.randrange(self.backend.width), rng.randrange(self.backend.height),
+                                   curses.BUTTON1_PRESSED)
+
+        if rng.random() < 0.001 :
+            self.screen.resize(rng.randrange(80, 200), rng.randrange(24, 60))
+
+        # Styles: lookups of a bounded set of colours, pairs must not grow.
+        if rng.random() < 0.01 :
+            pytlm.cm(rng.choice(_COLORS), rng.choice(_COLORS))
+
+    def step(self) -> None:
+
+        self.drive()
+
+        start = time.perf_counter()
+        self.wm.run_frame()
+        self.frame_times.append(time.perf_counter() - start)
+
+        self.frames += 1
+        self.clock.advance()
+
+    # ---- samples ----------------------------------------------------------
+
+    def sample(self, elapsed: float) -> dict:
+
+        ordered = sorted(self.frame_times)
+        self.frame_times = array("d")
+
+        gc_stats = gc.get_stats()
+
+        sample = {
+            "time":        round(elapsed, 1),
+            "frames":      self.frames,
+            "frame_p50":   percentile(ordered, 0.50),
+            "frame_p95":   percentile(ordered, 0.95),
+            "frame_p99":   percentile(ordered, 0.99),
+            "frame_max":   ordered[-1] if ordered else 0.0,
+            "rss":         rss_bytes(),
+            "objects":     len(gc.get_objects()),
+            "gc":          [s["collections"] for s in gc_stats],
+            "color_pairs": len(pytlm._color_pairs),
+            "deferred":    self.wm.stats["deferred"],
+        }
+
+        if self.trace :
+            (current, peak) = tracemalloc.get_traced_memory()
+            sample["traced"]      = current
+            sample["traced_peak"] = peak
+            tracemalloc.reset_peak()
+
+        if self.samples :
+            previous = self.samples[-1]
+            frames   = max(1, sample["frames"] - previous["frames"])
+            sample["gc0_per_frame"] = (sample["gc"][0] - previous["gc"][0]) / frames
+
+        self.samples.append(sample)
+
+        return sample
+
+    def check(self, sample: dict) -> List[str]:
+
+        failures = []
+        base     = self.baseline
+
+        if sample["color_pairs"] > self.max_color_pairs :
+            failures.append(f"colour pairs {sample['color_pairs']} > {self.max_color_pairs}")
+
+        if base is None :
+            return failures
+
+        rss = sample["rss"] - base["rss"]
+
+        if base["rss"] and rss > self.max_rss_growth :
+            failures.append(f"RSS grew {rss / _MIB:.1f} MiB > {self.max_rss_growth / _MIB:.1f} MiB")
+
+        growth = sample["objects"] / base["objects"] - 1.0
+
+        if growth > self.max_object_growth :
+            failures.append(f"live objects grew {growth:.1%} > {self.max_object_growth:.1%}")
+
+        if base["frame_p99"] and sample["frame_p99"] > base["frame_p99"] * self.max_latency_ratio :
+            failures.append(f"p99 frame time {sample['frame_p99'] * 1e3:.2f} ms > "
+                            f"{self.max_latency_ratio} x {base['frame_p99'] * 1e3:.2f} ms")
+
+        return failures
+
+    def type_growth(self, top: int = 10) -> list:
+
+        # Types with the most new live objects since the baseline.
+
+        if self.baseline_types is None :
+            return []
+
+        growth = type_counts()
+        growth.subtract(self.baseline_types)
+
+        return [(name, count) for name, count in growth.most_common(top) if count > 0]
+
+    # ---- run --------------------------------------------------------------
+
+    def run(self, report=None) -> bool:
+
+        #
+        # Runs the whole duration (stops at the first failing sample);
+        # report is called with every sample.  Returns True on success.
+        #
+
+        if self.trace :
+            tracemalloc.start()
+
+        try :
+
+            with self.clock :
+
+                self.build()
+
+                start = self.clock.now
+                next_sample = start + self.sample_interval
+
+                while self.clock.now - start < self.duration :
+
+                    self.step()
+
+                    if self.clock.now < next_sample :
+                        continue
+
+                    next_sample += self.sample_interval
+
+                    gc.collect()
+
+                    sample = self.sample(self.clock.now - start)
+
+                    if self.baseline is None and sample["time"] >= self.warmup :
+                        self.baseline = sample
+                        self.baseline_types = type_counts()
+
+                    self.failures = self.check(sample)
+
+                    if report is not None :
+                        report(sample)
+
+                    if self.failures :
+                        break
+
+        finally :
+            if self.wm is not None :
+                self.wm.output.close()
+
+            if self.trace :
+                tracemalloc.stop()
+
+        return not self.failures
+
+# ----------------------------------------------------------------------
+# Command line
+# ----------------------------------------------------------------------
+
+def _report_line(sample: dict) -> str:
+
+    return (f"t={sample['time'] / 3600:6.2f} h  frames={sample['frames']:8d}  "
+            f"p50={sample['frame_p50'] * 1e3:6.3f} ms  p99={sample['frame_p99'] * 1e3:6.3f} ms  "
+            f"max={sample['frame_max'] * 1e3:7.3f} ms  rss={sample['rss'] / _MIB:7.1f} MiB  "
+            f"objects={sample['objects']:8d}  pairs={sample['color_pairs']:3d}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+
+    parser = argparse.ArgumentParser(description="Headless soak test of the event loop")
+    parser.add_argument("--hours",       type=float, default=6.0,  help="simulated hours")
+    parser.add_argument("--step",        type=float, default=0.05, help="simulated seconds per frame")
+    parser.add_argument("--sample",      type=float, default=300,  help="simulated seconds per sample")
+    parser.add_argument("--warmup",      type=float, default=600,  help="simulated seconds before the baseline")
+    parser.add_argument("--windows",     type=int,   default=8)
+    parser.add_argument("--labels",      type=int,   default=40)
+    parser.add_argument("--seed",        type=int,   default=1)
+    parser.add_argument("--tracemalloc", action="store_true")
+    parser.add_argument("--max-rss",     type=float, default=32,   help="MiB of RSS growth")
+    parser.add_argument("--max-objects", type=float, default=0.10, help="relative object growth")
+    parser.add_argument("--max-latency", type=float, default=3.0,  help="p99 frame time ratio")
+    parser.add_argument("--json",        default=None, help="write the samples here (JSON lines)")
+
+    args = parser.parse_args(argv)
+
+    soak = Soak(duration=args.hours * 3600, frame_step=args.step, sample_interval=args.sample,
+                warmup=args.warmup, windows=args.windows, labels=args.labels, seed=args.seed,
+                tracemalloc=args.tracemalloc, max_rss_growth=args.max_rss * _MIB,
+                max_object_growth=args.max_objects, max_latency_ratio=args.max_latency)
+
+    out = open(args.json, "w") if args.json else None
+
+    def report(sample: dict) -> None:
+
+        print(_report_line(sample), flush=True)
+
+        if out is not None :
+            out.write(json.dumps(sample) + "\n")
+
+    try :
+        ok = soak.run(report)
+    finally :
+        if out is not None :
+            out.close()
+
+    if ok :
+        print(f"PASS  {soak.frames} frames")
+        return 0
+
+    for failure in soak.failures :
+        print(f"FAIL  {failure}")
+
+    for name, count in soak.type_growth() :
+        print(f"      +{count:8d} {name}")
+
+    return 1
+
+
+if __name__ == "__main__" :
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import math
+import functools
+
+from bisect import bisect_right
+
+# ----------------------------------------------------------------------
+# Unit prefixes
+# ----------------------------------------------------------------------
+#
+#   base    prefixes
+#   1000    (SI)   " ", K, M, G, T, P, E, Z, Y
+#   1024    (IEC)  "  ", Ki, Mi, Gi, Ti, Pi, Ei, Zi, Yi
+#
+# Prefixes are padded to one width, so "1.00 Kbps" and "1.00  bps" line
+# up.  SI keeps the upper case K already shown by the widgets.
+#
+
+_PREFIXES = {
+    1000: (" ",  "K",  "M",  "G",  "T",  "P",  "E",  "Z",  "Y"),
+    1024: ("  ", "Ki", "Mi", "Gi", "Ti", "Pi", "Ei", "Zi", "Yi"),
+}
+
+# Formatted values kept per format, the cache is dropped when full.
+_CACHE_SIZE = 4096
+
+# ----------------------------------------------------------------------
+# UnitFormat
+# ----------------------------------------------------------------------
+#
+# Scales a value to the largest prefix that keeps it below the base once
+# rounded to precision (999.999 is "1.00 K", not "1000.00  "), found with
+# a bisect over precomputed limits instead of a divide loop.  Values past
+# the last prefix stay on it.  The number always has the same width:
+# the digits of base - 1, the point and the decimals.
+#
+#   rate = UnitFormat("bps")
+#   rate(1234567)          ->  "  1.23 Mbps"
+#   rate.split(1234567)    ->  (1.23, " Mbps")     for a StatusLabel
+#
+
+class UnitFormat:
+
+    def __init__(self, units: str = "", **kwargs) :
+
+        #
+        #  kwargs :
+        #
+        #    base        1000 (SI) or 1024 (IEC) (default: 1000)
+        #    precision   decimals (default: 2)
+        #    multiplier  applied to values first, e.g. 8 for bits (default: 1)
+        #
+
+        self.units      = units
+        self.base       = kwargs.get("base",       1000)
+        self.precision  = kwargs.get("precision",  2)
+        self.multiplier = kwargs.get("multiplier", 1)
+
+        self.prefixes   = _PREFIXES[self.base]
+        self.width      = len(str(self.base - 1)) + (self.precision + 1 if self.precision else 0)
+
+        # Scale i is used from limits[i - 1] on: base ** i, less what rounds up to it.
+        half = 0.5 * 10 ** -self.precision
+
+        self.scales = [float(self.base ** i) for i in range(len(self.prefixes))]
+        self.limits = [(self.base - half) * self.base ** (i - 1) for i in range(1, len(self.prefixes))]
+
+        self.cache  = {}
+
+    def scale(self, value) -> tuple[float, str]:
+
+        # (value at scale, rounded to precision, prefix)
+
+        value = float(value) * self.multiplier
+
+        if not math.isfinite(value) :
+            return (value, self.prefixes[0])
+
+        index = bisect_right(self.limits, abs(value))
+
+        return (round(value / self.scales[index], self.precision), self.prefixes[index])
+
+    def split(self, value) -> tuple[float, str]:
+
+        # (number, " <prefix><units>"), the (value, units) of a Binding.
+
+        key = ("split", value)
+
+        result = self.cache.get(key)
+
+        if result is None :
+
+            (number, prefix) = self.scale(value)
+
+            result = (number, f" {prefix}{self.units}")
+
+            if len(self.cache) >= _CACHE_SIZE :
+                self.cache.clear()
+
+            self.cache[key] = result
+
+        return result
+
+    def __call__(self, value) -> str:
+
+        result = self.cache.get(value)
+
+        if result is None :
+
+            (number, prefix) = self.scale(value)
+
+            result = f"{number:>{self.width}.{self.precision}f} {prefix}{self.units}"
+
+            if len(self.cache) >= _CACHE_SIZE :
+                self.cache.clear()
+
+            self.cache[value] = result
+
+        return result
+
+
+@functools.lru_cache(maxsize=None)
+def unit_format(units: str = "", base: int = 1000, precision: int = 2, multiplier: int = 1) -> UnitFormat:
+
+    # Shared formats, one per combination (and one cache each).
+    return UnitFormat(units, base=base, precision=precision, multiplier=multiplier)
+
+
+def humanize(value, units: str = "", base: int = 1000, precision: int = 2) -> str:
+    return unit_format(units, base, precision)(value)
@@ -0,0 +1,134 @@
+import logging
+import importlib
+import importlib.metadata
+
+from typing import Dict, List, Union
+
+logger = logging.getLogger("WidgetRegistry")
+
+# Entry point group of third party widgets :
+#
+#   [project.entry-points."pytlm.widgets"]
+#   Sparkline = "pytlm_extras.spark:Sparkline"
+#
+ENTRY_POINT_GROUP = "pytlm.widgets"
+
+#
+#  Built in widget types, as "module:class", imported on first use.
+#
+#      type name           target
+#
+
+_BUILTIN = {
+    "Widget":           "pytlm:Widget",
+    "Container":        "pytlm:Container",
+    "Button":           "pytlm:Button",
+    "StatusLabel":      "pytlm:StatusLabel",
+    "ProgressBar":      "pytlm:ProgressBar",
+    "NetworkDevice":    "netdev_widget:NetworkDevice",
+    "CpuUsage":         "proc_widgets:CpuUsage",
+    "MemoryUsage":      "proc_widgets:MemoryUsage",
+    "DiskRate":         "proc_widgets:DiskRate",
+    "InterfaceCounter": "proc_widgets:InterfaceCounter",
+    "NicQueues":        "nic_queue_widget:NicQueues",
+    "LogView":          "logview_widget:LogView",
+    "Graph":            "graph_widget:Graph",
+}
+
+# ----------------------------------------------------------------------
+# WidgetRegistry
+# ----------------------------------------------------------------------
+#
+# Maps type names to widget classes without importing them: a type is a
+# "module:class" path until it is first looked up, so a dashboard only
+# pays for the modules of the widgets it uses (NumPy for a Graph, ...).
+#
+# Installed packages add types through the "pytlm.widgets" entry points.
+# They are only scanned for a name that is not registered otherwise,
+# and at most once; explicit registrations and built in types win over
+# entry points of the same name.
+#
+
+class WidgetRegistry:
+
+    def __init__(self, group: str = ENTRY_POINT_GROUP) :
+
+        self.group      = group
+        self.types: Dict[str, Union[str, type]] = dict(_BUILTIN)
+        self.classes    = {}            # name -> imported class
+        self.discovered = False
+
+    def register(self, name: str, target: Union[str, type]) -> None:
+
+        # target is a class or a "module:class" path (imported on first use).
+
+        self.types[name] = target
+        self.classes.pop(name, None)
+
+    def unregister(self, name: str) -> None:
+
+        self.types.pop(name, None)
+        self.classes.pop(name, None)
+
+    def discover(self) -> None:
+
+        if self.discovered :
+            return
+
+        self.discovered = True
+
+        for entry in importlib.metadata.entry_points(group=self.group) :
+
+            if entry.name in self.types :
+                logger.info("Widget type %s from %s ignored, already registered", entry.name, entry.value)
+                continue
+
+            self.types[entry.name] = entry.value
+
+    def __contains__(self, name: str) -> bool:
+
+        if name not in self.types :
+            self.discover()
+
+        return name in self.types
+
+    def names(self) -> List[str]:
+
+        self.discover()
+
+        return sorted(self.types)
+
+    def get(self, name: str) -> type:
+
+        # The class of a type, imported the first time; KeyError if unknown.
+
+        cls = self.classes.get(name)
+
+        if cls is not None :
+            return cls
+
+        if name not in self :
+            raise KeyError(name)
+
+        target = self.types[name]
+
+        if isinstance(target, str) :
+            (module, _, attr) = target.partition(":")
+            cls = getattr(importlib.import_module(module), attr)
+        else :
+            cls = target
+
+        self.classes[name] = cls
+
+        return cls
+
+# The registry used by dashboards.
+registry = WidgetRegistry()
+
+
+def register_widget(name: str, target: Union[str, type]) -> None:
+    registry.register(name, target)
+
+
+def widget_class(name: str) -> type:
+    return registry.get(name)